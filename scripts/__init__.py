@@ -0,0 +1,6 @@
+"""
+Generator-Skripte (Tests, Playwright-Tests, Doku) mit gemeinsamen Hilfsmodulen.
+
+Die Module importieren sich gegenseitig flach (import ai_cache, ...); Einstieg
+ist cli.py über "python scripts <kommando>" bzw. "python -m scripts <kommando>".
+"""
@@ -0,0 +1,13 @@
+"""Einstieg für "python scripts ..." und "python -m scripts ..." (siehe cli.py)."""
+
+import os
+import sys
+
+# Die Module importieren sich flach (import ai_cache, ...): scripts/ muss auf sys.path liegen
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)
+
+import cli  # noqa: E402
+
+cli.main()
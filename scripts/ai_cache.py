@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+ai_cache.py
+
+Gemeinsamer, inhaltsadressierter Antwort-Cache für alle Azure-OpenAI-/OpenAI-Aufrufe
+der Generator-Skripte.
+
+- Schlüssel: SHA-256 über Endpoint, Deployment/Modell, API-Version, System-Prompt
+  und User-Prompt. Ein byte-identischer Prompt liefert also dieselbe Antwort,
+  ohne dass ein (kostenpflichtiger) Aufruf abgesetzt wird.
+- Ablage: eine JSON-Datei pro Eintrag unter <cache-dir>/<xx>/<hash>.json.
+- Eviction (LRU): Bei jedem Treffer wird die mtime aktualisiert. Beim Start und
+  am Ende eines Laufs werden Einträge entfernt, die länger als --cache-max-age-days
+  nicht benutzt wurden, danach die am längsten unbenutzten, bis die Gesamtgröße
+  unter --cache-max-mb liegt.
+- Unbrauchbare Antworten werden nicht dauerhaft: cached(valid=...) speichert
+  nur Antworten, die valid() bestehen, und verwirft gespeicherte, die es nicht
+  (mehr) tun. Stellt sich eine Antwort erst später als unbrauchbar heraus
+  (z.B. Test übersetzt nicht), entfernt delete(last_key()) den Eintrag.
+
+Flags (über add_cache_arguments in jedem Skript verfügbar):
+- --cache-dir DIR        (Default: $AI_CACHE_DIR oder .ai-cache/responses)
+- --no-cache             Cache komplett deaktivieren
+- --cache-readonly       nur lesen, keine neuen Einträge schreiben (z.B. für Fork-PRs)
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+import telemetry
+
+DEFAULT_CACHE_DIR = ".ai-cache/responses"
+DEFAULT_MAX_MB = 200
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+def make_cache_key(
+    endpoint: str,
+    deployment: str,
+    api_version: str,
+    system_prompt: str,
+    prompt: str,
+) -> str:
+    """Stabiler Hash über alle Eingaben, die die Antwort beeinflussen."""
+    h = hashlib.sha256()
+    for part in (endpoint.rstrip("/"), deployment, api_version, system_prompt, prompt):
+        data = part.encode("utf-8")
+        # Länge voranstellen, damit Feldgrenzen eindeutig sind
+        h.update(str(len(data)).encode("ascii") + b":")
+        h.update(data)
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """Dateibasierter LRU-Cache für Modellantworten (thread-safe)."""
+
+    def __init__(
+        self,
+        cache_dir: pathlib.Path,
+        enabled: bool = True,
+        readonly: bool = False,
+        max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+        max_age_seconds: float = DEFAULT_MAX_AGE_DAYS * 86400,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.readonly = readonly
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _path_for(self, key: str) -> pathlib.Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        path = self._path_for(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if not self.readonly:
+            try:
+                os.utime(path, None)  # LRU: "zuletzt benutzt" aktualisieren
+            except OSError:
+                pass
+        with self._lock:
+            self.hits += 1
+        return data.get("content")
+
+    def contains(self, key: str) -> bool:
+        """Ob eine Antwort vorliegt – ohne Zähler und ohne LRU-Zeitstempel (für --dry-run)."""
+        return self.enabled and self._path_for(key).is_file()
+
+    def put(self, key: str, content: str, meta: Optional[dict] = None) -> None:
+        if not self.enabled or self.readonly:
+            return
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"created": time.time(), "meta": meta or {}, "content": content}
+        fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def delete(self, key: str) -> bool:
+        """Entfernt einen Eintrag (z.B. eine Antwort, die sich als unbrauchbar erwiesen hat)."""
+        if not self.enabled or self.readonly:
+            return False
+        try:
+            self._path_for(key).unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def last_key(self) -> Optional[str]:
+        """Schlüssel des letzten cached()-Aufrufs in diesem Thread (für ein späteres delete())."""
+        return getattr(self._local, "key", None)
+
+    def last_deployment(self) -> Optional[str]:
+        """Deployment, das die Antwort des letzten cached()-Aufrufs in diesem Thread geliefert hat."""
+        return getattr(self._local, "deployment", None)
+
+    def evict(self) -> int:
+        """Entfernt zu alte Einträge und dann LRU-Einträge bis zur Größengrenze."""
+        if not self.enabled or self.readonly or not self.cache_dir.exists():
+            return 0
+
+        now = time.time()
+        entries: List[Tuple[float, int, pathlib.Path]] = []
+        removed = 0
+        for path in self.cache_dir.rglob("*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if now - st.st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+                removed += 1
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def cached(
+        self,
+        endpoint: str,
+        deployment: str,
+        api_version: str,
+        system_prompt: str,
+        prompt: str,
+        compute: Callable[[], str],
+        label: str = "",
+        valid: Optional[Callable[[str], bool]] = None,
+    ) -> str:
+        """
+        Liefert die gecachte Antwort oder ruft compute() auf und speichert das Ergebnis.
+        Beides läuft in einem Telemetrie-Span (label, Cache-Treffer ja/nein).
+        Mit valid wird nur eine Antwort gespeichert bzw. wiederverwendet, die valid() besteht.
+        Hat ein anderes Deployment geantwortet (--hedge-deployment, steht dann in
+        span.deployment), wird die Antwort unter dessen Schlüssel gespeichert;
+        last_key()/last_deployment() liefern Schlüssel und Deployment der Antwort.
+        """
+        key = make_cache_key(endpoint, deployment, api_version, system_prompt, prompt)
+        self._local.key = key
+        self._local.deployment = deployment
+        with telemetry.get_telemetry().call(label or key[:12]) as span:
+            span.deployment = deployment
+            hit = self.get(key)
+            if hit is not None and (valid is None or valid(hit)):
+                span.cache = "hit"
+                return hit
+            if hit is not None:
+                # früher gespeicherte, unbrauchbare Antwort: verwerfen und neu fragen
+                self.delete(key)
+                with self._lock:
+                    self.hits -= 1
+                    self.misses += 1
+            span.cache = "miss" if self.enabled else "off"
+            content = compute()
+            answered = span.deployment or deployment
+            if answered != deployment:
+                key = make_cache_key(endpoint, answered, api_version, system_prompt, prompt)
+                self._local.key = key
+                self._local.deployment = answered
+            if valid is None or valid(content):
+                self.put(key, content, meta={"deployment": answered, "api_version": api_version})
+            return content
+
+    def summary(self) -> str:
+        if not self.enabled:
+            return "[INFO] Antwort-Cache deaktiviert."
+        mode = " (readonly)" if self.readonly else ""
+        return f"[INFO] Antwort-Cache{mode}: {self.hits} Treffer, {self.misses} Aufrufe ({self.cache_dir})"
+
+
+# ---------------------------------------------------------
+# Prozessweite Konfiguration für die Skripte
+# ---------------------------------------------------------
+_cache = ResponseCache(pathlib.Path(os.environ.get("AI_CACHE_DIR", DEFAULT_CACHE_DIR)), enabled=False)
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("Antwort-Cache")
+    group.add_argument(
+        "--cache-dir",
+        default=os.environ.get("AI_CACHE_DIR", DEFAULT_CACHE_DIR),
+        help=f"Verzeichnis für gecachte Modellantworten (Default: $AI_CACHE_DIR oder {DEFAULT_CACHE_DIR})",
+    )
+    group.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Antwort-Cache deaktivieren (jeder Prompt geht ans Modell)",
+    )
+    group.add_argument(
+        "--cache-readonly",
+        action="store_true",
+        help="Cache nur lesen, keine neuen Einträge schreiben",
+    )
+    group.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_MB,
+        help=f"Maximale Cache-Größe in MB (Default: {DEFAULT_MAX_MB})",
+    )
+    group.add_argument(
+        "--cache-max-age-days",
+        type=float,
+        default=DEFAULT_MAX_AGE_DAYS,
+        help=f"Einträge, die so lange nicht benutzt wurden, werden entfernt (Default: {DEFAULT_MAX_AGE_DAYS})",
+    )
+
+
+def configure_from_args(args: argparse.Namespace) -> ResponseCache:
+    """Initialisiert den prozessweiten Cache aus den CLI-Argumenten."""
+    global _cache
+    _cache = ResponseCache(
+        pathlib.Path(args.cache_dir),
+        enabled=not args.no_cache,
+        readonly=args.cache_readonly,
+        max_bytes=args.cache_max_mb * 1024 * 1024,
+        max_age_seconds=args.cache_max_age_days * 86400,
+    )
+    _cache.evict()
+    atexit.register(_finish, _cache)
+    return _cache
+
+
+def _finish(cache: ResponseCache) -> None:
+    cache.evict()
+    print(cache.summary())
+
+
+def get_cache() -> ResponseCache:
+    return _cache
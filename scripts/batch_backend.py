@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+batch_backend.py
+
+Batch-Modus für die Massen-Generierung (z.B. nächtliche Neugenerierung aller Tests).
+
+Statt tausender interaktiver Aufrufe wird eine JSONL-Datei mit einer Zeile pro
+Prompt (stabile custom_id) als EIN Batch-Job eingereicht und das Ergebnis
+abgeholt, sobald der Job fertig ist. Batch-Deployments sind deutlich günstiger
+und haben eigene, höhere Kontingente.
+
+Das Einreichen/Abfragen steckt hinter der Schnittstelle BatchBackend:
+- AzureBatchBackend: Azure OpenAI Batch API (Datei-Upload, /batches, Ergebnisdatei)
+- LocalBatchBackend: dateibasierter Ersatz für Tests und Trockenläufe. Der Job
+  liegt als <dir>/<batch_id>/input.jsonl; fertig ist er, sobald jemand
+  <dir>/<batch_id>/output.jsonl im Format der Batch-API danebenlegt.
+
+Zeilenformat (Eingabe):
+  {"custom_id": "...", "method": "POST", "url": "/chat/completions",
+   "body": {"model": "<deployment>", "messages": [...]}}
+Zeilenformat (Ausgabe):
+  {"custom_id": "...", "response": {"status_code": 200, "body": {"choices": [...]}},
+   "error": null}
+"""
+
+import abc
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import llm_transport
+
+BATCH_API_VERSION = "2024-10-21"
+DEFAULT_BATCH_FILE = "target/ai-batch/requests.jsonl"
+DEFAULT_POLL_INTERVAL = 60.0
+DEFAULT_BATCH_TIMEOUT_HOURS = 24.0
+
+FINAL_STATES = ("completed", "failed", "expired", "cancelled")
+
+
+@dataclass
+class BatchRequest:
+    custom_id: str
+    system_prompt: str
+    prompt: str
+
+
+@dataclass
+class BatchResult:
+    custom_id: str
+    content: Optional[str] = None
+    error: Optional[str] = None
+
+
+def write_requests_file(path: pathlib.Path, requests_: List[BatchRequest], deployment: str) -> str:
+    """Schreibt die JSONL-Eingabedatei (sortiert nach custom_id) und liefert ihren SHA-256."""
+    lines = []
+    for req in sorted(requests_, key=lambda r: r.custom_id):
+        lines.append(
+            json.dumps(
+                {
+                    "custom_id": req.custom_id,
+                    "method": "POST",
+                    "url": "/chat/completions",
+                    "body": {
+                        "model": deployment,
+                        "messages": [
+                            {"role": "system", "content": req.system_prompt},
+                            {"role": "user", "content": req.prompt},
+                        ],
+                    },
+                },
+                ensure_ascii=False,
+                sort_keys=True,
+            )
+        )
+    text = "\n".join(lines) + "\n"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def parse_output_lines(lines: Iterable[str]) -> Dict[str, BatchResult]:
+    """Liest Ergebniszeilen (Ausgabe- oder Fehlerdatei der Batch-API)."""
+    results: Dict[str, BatchResult] = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            continue
+        custom_id = item.get("custom_id") or ""
+        response = item.get("response") or {}
+        body = response.get("body") or {}
+        error = item.get("error")
+        if error:
+            message = error.get("message") if isinstance(error, dict) else str(error)
+            results[custom_id] = BatchResult(custom_id, error=message)
+        elif int(response.get("status_code") or 0) >= 400:
+            message = (body.get("error") or {}).get("message") or json.dumps(body)[:500]
+            results[custom_id] = BatchResult(custom_id, error=f"HTTP {response.get('status_code')}: {message}")
+        else:
+            try:
+                content = body["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                results[custom_id] = BatchResult(custom_id, error="Antwort ohne choices[0].message.content")
+                continue
+            results[custom_id] = BatchResult(custom_id, content=content)
+    return results
+
+
+class BatchBackend(abc.ABC):
+    """Schnittstelle: Job einreichen, Status abfragen, Ergebnisse abholen."""
+
+    name = "batch"
+
+    @abc.abstractmethod
+    def submit(self, requests_file: pathlib.Path) -> str:
+        """Reicht die JSONL-Datei ein und liefert die Batch-ID."""
+
+    @abc.abstractmethod
+    def status(self, batch_id: str) -> str:
+        """validating | in_progress | finalizing | completed | failed | expired | cancelled ..."""
+
+    @abc.abstractmethod
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        """Ergebnisse eines abgeschlossenen Jobs, nach custom_id."""
+
+
+class AzureBatchBackend(BatchBackend):
+    name = "azure"
+
+    def __init__(self, endpoint: str, api_key: str, api_version: str = BATCH_API_VERSION) -> None:
+        self.endpoint = endpoint.rstrip("/")
+        self.api_key = api_key
+        self.api_version = api_version
+        self._batches: Dict[str, dict] = {}
+
+    def _url(self, path: str) -> str:
+        return f"{self.endpoint}/openai/{path}?api-version={self.api_version}"
+
+    def _call(self, method: str, path: str, **kwargs):
+        headers = {"api-key": self.api_key}
+        if "json_body" in kwargs:
+            headers["Content-Type"] = "application/json"
+            resp = llm_transport.get_transport().post_json(self._url(path), headers, kwargs["json_body"], read_timeout=120)
+        else:
+            resp = llm_transport.get_transport().request(method, self._url(path), headers, read_timeout=300, **kwargs)
+        if resp.status_code >= 400:
+            raise RuntimeError(f"Azure Batch-API Fehler {resp.status_code} bei {method} {path}: {resp.text}")
+        return resp
+
+    def submit(self, requests_file: pathlib.Path) -> str:
+        upload = self._call(
+            "POST",
+            "files",
+            data={"purpose": "batch"},
+            files={"file": (requests_file.name, requests_file.read_bytes(), "application/jsonl")},
+        ).json()
+        batch = self._call(
+            "POST",
+            "batches",
+            json_body={
+                "input_file_id": upload["id"],
+                "endpoint": "/chat/completions",
+                "completion_window": "24h",
+            },
+        ).json()
+        return batch["id"]
+
+    def status(self, batch_id: str) -> str:
+        batch = self._call("GET", f"batches/{batch_id}").json()
+        self._batches[batch_id] = batch
+        counts = batch.get("request_counts") or {}
+        if counts:
+            print(
+                f"[INFO] Batch {batch_id}: {batch.get('status')} "
+                f"({counts.get('completed', 0)}/{counts.get('total', 0)} fertig, {counts.get('failed', 0)} Fehler)"
+            )
+        return batch.get("status") or "unknown"
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        batch = self._batches.get(batch_id) or self._call("GET", f"batches/{batch_id}").json()
+        results: Dict[str, BatchResult] = {}
+        for key in ("error_file_id", "output_file_id"):
+            file_id = batch.get(key)
+            if not file_id:
+                continue
+            text = self._call("GET", f"files/{file_id}/content").text
+            results.update(parse_output_lines(text.splitlines()))
+        return results
+
+
+class LocalBatchBackend(BatchBackend):
+    name = "local"
+
+    def __init__(self, directory: pathlib.Path) -> None:
+        self.directory = directory
+
+    def submit(self, requests_file: pathlib.Path) -> str:
+        batch_id = f"local-{uuid.uuid4().hex[:12]}"
+        job_dir = self.directory / batch_id
+        job_dir.mkdir(parents=True, exist_ok=True)
+        (job_dir / "input.jsonl").write_bytes(requests_file.read_bytes())
+        print(f"[INFO] Lokaler Batch angelegt – Ergebnis wird erwartet unter {job_dir / 'output.jsonl'}")
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        job_dir = self.directory / batch_id
+        if not job_dir.exists():
+            return "failed"
+        return "completed" if (job_dir / "output.jsonl").exists() else "in_progress"
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        path = self.directory / batch_id / "output.jsonl"
+        return parse_output_lines(path.read_text(encoding="utf-8").splitlines())
+
+
+def run_batch(
+    backend: BatchBackend,
+    requests_file: pathlib.Path,
+    input_sha256: str,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    timeout_hours: float = DEFAULT_BATCH_TIMEOUT_HOURS,
+) -> Dict[str, BatchResult]:
+    """
+    Reicht requests_file ein (oder setzt einen laufenden Job mit identischer Eingabe
+    fort, siehe <requests_file>.state.json) und wartet auf das Ergebnis.
+    """
+    state_path = requests_file.with_name(requests_file.name + ".state.json")
+    batch_id = None
+    try:
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        if state.get("input_sha256") == input_sha256 and state.get("backend") == backend.name:
+            batch_id = state.get("batch_id")
+            print(f"[INFO] Setze laufenden Batch {batch_id} fort (Eingabe unverändert).")
+    except (OSError, ValueError):
+        pass
+
+    if batch_id is None:
+        batch_id = backend.submit(requests_file)
+        state_path.write_text(
+            json.dumps({"backend": backend.name, "batch_id": batch_id, "input_sha256": input_sha256}, indent=2) + "\n",
+            encoding="utf-8",
+        )
+        print(f"[INFO] Batch {batch_id} eingereicht ({requests_file}).")
+
+    deadline = time.monotonic() + timeout_hours * 3600
+    last_status = None
+    while True:
+        status = backend.status(batch_id)
+        if status != last_status:
+            print(f"[INFO] Batch {batch_id}: Status {status}")
+            last_status = status
+        if status in FINAL_STATES:
+            break
+        if time.monotonic() >= deadline:
+            raise RuntimeError(
+                f"Batch {batch_id} nach {timeout_hours:g}h nicht fertig – später mit derselben Eingabe fortsetzen."
+            )
+        time.sleep(poll_interval)
+
+    results = backend.results(batch_id)
+    state_path.unlink(missing_ok=True)
+    if status != "completed" and not results:
+        raise RuntimeError(f"Batch {batch_id} endete mit Status {status}.")
+    return results
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+
+def add_batch_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("Batch-Modus")
+    group.add_argument(
+        "--batch",
+        action="store_true",
+        help="Alle Prompts als einen Batch-Job einreichen statt interaktiv aufzurufen",
+    )
+    group.add_argument(
+        "--batch-backend",
+        choices=("azure", "local"),
+        default="azure",
+        help="azure = Azure OpenAI Batch API, local = dateibasierter Ersatz (Default: azure)",
+    )
+    group.add_argument(
+        "--batch-file",
+        default=DEFAULT_BATCH_FILE,
+        help=f"JSONL-Eingabedatei des Batch-Jobs (Default: {DEFAULT_BATCH_FILE})",
+    )
+    group.add_argument(
+        "--batch-deployment",
+        default=os.environ.get("AZURE_OPENAI_BATCH_DEPLOYMENT") or None,
+        help="Batch-Deployment (Default: $AZURE_OPENAI_BATCH_DEPLOYMENT oder $AZURE_OPENAI_DEPLOYMENT)",
+    )
+    group.add_argument(
+        "--batch-poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help=f"Sekunden zwischen zwei Statusabfragen (Default: {DEFAULT_POLL_INTERVAL:g})",
+    )
+    group.add_argument(
+        "--batch-timeout-hours",
+        type=float,
+        default=DEFAULT_BATCH_TIMEOUT_HOURS,
+        help=f"Maximale Wartezeit auf den Job (Default: {DEFAULT_BATCH_TIMEOUT_HOURS:g})",
+    )
+
+
+def backend_from_args(args: argparse.Namespace) -> BatchBackend:
+    if args.batch_backend == "local":
+        return LocalBatchBackend(pathlib.Path(args.batch_file).parent / "local")
+    endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT", "")
+    api_key = os.environ.get("AZURE_OPENAI_API_KEY", "")
+    if not endpoint or not api_key:
+        raise SystemExit("Für --batch-backend azure müssen AZURE_OPENAI_ENDPOINT und AZURE_OPENAI_API_KEY gesetzt sein.")
+    return AzureBatchBackend(endpoint, api_key)
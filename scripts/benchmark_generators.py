@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+benchmark_generators.py
+
+End-to-End-Benchmark der Generator-Skripte gegen den lokalen Mock-Server
+(mock_openai_server.py) – reproduzierbar und ohne Azure-Zugang.
+
+Für jede Größe (Default: 10, 100, 1000 Controller) wird ein synthetisches
+Spring-Boot-Projekt erzeugt und jedes Szenario als eigener Prozess gestartet:
+
+- tests            generate_tests_with_azure_openai.py (--jobs)
+- tests-hedge      wie tests, mit --hedge (sinnvoll mit --straggler-rate, z.B. 0.05)
+- tests-batch      generate_tests_with_azure_openai.py --batch (Batch-API des Mocks)
+- ui               generate_ui_tests_with_azure_openai.py
+- docs             generate_docs_with_azure_openai.py
+- docs-map-reduce  generate_docs_with_azure_openai.py --map-reduce (--jobs)
+- cli-dry-run      python scripts tests --dry-run (Startzeit des CLI, keine Aufrufe)
+- all              python scripts all (orchestrator.py: tests + ui + docs-map-reduce in einem
+                   Prozess; zum Vergleich mit der Summe der drei Einzelszenarien)
+- tests-openai     generate_tests_openai.py   (nur mit installiertem openai-SDK)
+- tests-openai2    generate_tests_openai2.py  (nur mit installiertem openai-SDK)
+
+Gemessen werden Wall-Time, Anzahl Aufrufe und Bytes (aus den Zählern des
+Mock-Servers), der Anteil vom (simulierten) Anbieter-Prompt-Cache abgedeckter
+Prompt-Tokens sowie der Spitzen-RSS des Skript-Prozesses. Caches und Java-Index
+sind abgeschaltet, gemessen wird also immer ein kalter Lauf.
+
+Das Ergebnis landet als JSON in --output (Default: target/benchmarks/generators.json).
+Mit --baseline ALT.json werden Wall-Time und RSS verglichen; liegt ein Wert mehr
+als --max-regression über der Baseline, endet das Skript mit Exit-Code 1.
+
+Aufruf:
+    python scripts/benchmark_generators.py --sizes 10,100 --latency normal:50:20
+    python scripts/benchmark_generators.py --sizes 100 --scenarios tests,tests-hedge --straggler-rate 0.05
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List
+
+SCRIPTS_DIR = pathlib.Path(__file__).resolve().parent
+REPO_ROOT = SCRIPTS_DIR.parent
+PACKAGE_DIR = "src/main/java/com/example/hackathon2025"
+TEMPLATES_DIR = "src/main/resources/templates"
+DEFAULT_OUTPUT = "target/benchmarks/generators.json"
+ALL_SCENARIOS = (
+    "tests", "tests-hedge", "tests-batch", "ui", "docs", "docs-map-reduce", "cli-dry-run", "all",
+    "tests-openai", "tests-openai2",
+)
+SDK_SCENARIOS = ("tests-openai", "tests-openai2")
+# Inkrementelle Stores der Generatoren – vor jedem Szenario entfernt (kalter Lauf)
+GENERATED_STORES = ("tests/.ai-ui-units.json", "docs/.ai-summaries.json")
+
+
+# ---------- Synthetisches Projekt ----------
+
+CONTROLLER_TEMPLATE = """package com.example.hackathon2025;
+
+import org.springframework.web.bind.annotation.GetMapping;
+import org.springframework.web.bind.annotation.PostMapping;
+import org.springframework.web.bind.annotation.RequestMapping;
+import org.springframework.web.bind.annotation.RequestParam;
+import org.springframework.web.bind.annotation.RestController;
+import java.util.Map;
+
+@RestController
+@RequestMapping("/api/bench{i}")
+public class Bench{i}RestController {{
+
+    @GetMapping("/hello")
+    public Map<String, String> hello(@RequestParam(value = "name", defaultValue = "Gast") String name) {{
+        return Map.of("message", "Hello " + name + " from controller {i}");
+    }}
+
+    @PostMapping("/sum")
+    public Map<String, Object> sum(@RequestParam("a") long a, @RequestParam(value = "b", defaultValue = "0") long b) {{
+        if (a < 0 || b < 0) {{
+            return Map.of("error", "Nur positive Zahlen erlaubt.");
+        }}
+        return Map.of("a", a, "b", b, "sum", a + b);
+    }}
+}}
+"""
+
+APPLICATION = """package com.example.hackathon2025;
+
+import org.springframework.boot.SpringApplication;
+import org.springframework.boot.autoconfigure.SpringBootApplication;
+
+@SpringBootApplication
+public class Hackathon2025Application {
+    public static void main(String[] args) {
+        SpringApplication.run(Hackathon2025Application.class, args);
+    }
+}
+"""
+
+INDEX_HTML = """<!DOCTYPE html>
+<html xmlns:th="http://www.thymeleaf.org">
+<head><title>Hackathon 2025</title></head>
+<body>
+<h1>Hackathon 2025 Demo</h1>
+<button onclick="callApi()">Test REST</button>
+<p id="apiResult"></p>
+<script>
+async function callApi() {
+  const json = await (await fetch('/api/bench0/hello')).json();
+  document.getElementById('apiResult').innerText = JSON.stringify(json);
+}
+</script>
+</body>
+</html>
+"""
+
+
+def create_synthetic_repo(root: pathlib.Path, controllers: int) -> None:
+    package_dir = root / PACKAGE_DIR
+    package_dir.mkdir(parents=True, exist_ok=True)
+    (package_dir / "Hackathon2025Application.java").write_text(APPLICATION, encoding="utf-8")
+    for i in range(controllers):
+        (package_dir / f"Bench{i}RestController.java").write_text(CONTROLLER_TEMPLATE.format(i=i), encoding="utf-8")
+    templates = root / TEMPLATES_DIR
+    templates.mkdir(parents=True, exist_ok=True)
+    (templates / "index.html").write_text(INDEX_HTML, encoding="utf-8")
+    for i in range(max(1, controllers // 50)):
+        (templates / f"page{i}.html").write_text(
+            f"<html><head><title>Page {i}</title></head><body><h1>Page {i}</h1></body></html>\n",
+            encoding="utf-8",
+        )
+    (root / "docs").mkdir(exist_ok=True)
+    (root / "tests").mkdir(exist_ok=True)
+
+
+# ---------- Mock-Server ----------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _http(method: str, url: str) -> dict:
+    req = urllib.request.Request(url, method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def start_mock(args: argparse.Namespace, log_dir: pathlib.Path):
+    port = _free_port()
+    cmd = [
+        sys.executable,
+        str(SCRIPTS_DIR / "mock_openai_server.py"),
+        "--port", str(port),
+        "--latency", args.latency,
+        "--error-429-rate", str(args.error_429_rate),
+        "--error-5xx-rate", str(args.error_5xx_rate),
+        "--straggler-rate", str(args.straggler_rate),
+        "--straggler-ms", str(args.straggler_ms),
+        "--retry-after", "0.05",
+        "--seed", "42",
+    ]
+    log = (log_dir / "mock-server.log").open("w", encoding="utf-8")
+    proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            _http("GET", url + "/__stats")
+            return proc, url
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit("Mock-Server ist nicht gestartet (siehe mock-server.log).")
+
+
+# ---------- Szenarien ----------
+
+def scenario_command(name: str, repo: pathlib.Path, work: pathlib.Path, jobs: int) -> List[str]:
+    py = sys.executable
+    common = ["--no-cache", "--no-java-index"]
+    if name == "tests":
+        return [py, str(SCRIPTS_DIR / "generate_tests_with_azure_openai.py"),
+                "--source-dir", "src/main/java", "--test-dir", str(work / "tests-out"),
+                "--jobs", str(jobs), *common]
+    if name == "tests-hedge":
+        # wie "tests", Nachzügler (--straggler-rate) werden ab dem p95 der Latenzen dupliziert
+        return [py, str(SCRIPTS_DIR / "generate_tests_with_azure_openai.py"),
+                "--source-dir", "src/main/java", "--test-dir", str(work / "tests-hedge-out"),
+                "--jobs", str(jobs), "--hedge", "--hedge-min-delay", "0", *common]
+    if name == "tests-batch":
+        return [py, str(SCRIPTS_DIR / "generate_tests_with_azure_openai.py"),
+                "--source-dir", "src/main/java", "--test-dir", str(work / "tests-batch-out"),
+                "--batch", "--batch-file", str(work / "batch" / "requests.jsonl"),
+                "--batch-poll-interval", "0.2", *common]
+    if name == "ui":
+        return [py, str(SCRIPTS_DIR / "generate_ui_tests_with_azure_openai.py"), "--repo-root", str(repo), *common]
+    if name == "docs":
+        return [py, str(SCRIPTS_DIR / "generate_docs_with_azure_openai.py"), "--repo-root", str(repo), *common]
+    if name == "docs-map-reduce":
+        return [py, str(SCRIPTS_DIR / "generate_docs_with_azure_openai.py"), "--repo-root", str(repo),
+                "--map-reduce", "--jobs", str(jobs), *common]
+    if name == "cli-dry-run":
+        return [py, str(SCRIPTS_DIR), "tests", "--source-dir", "src/main/java",
+                "--test-dir", str(work / "dry-run-out"), "--dry-run", *common]
+    if name == "all":
+        return [py, str(SCRIPTS_DIR), "all", "--repo-root", str(repo),
+                "--test-dir", str(work / "all-out"), "--jobs", str(jobs), *common]
+    if name == "tests-openai":
+        return [py, str(SCRIPTS_DIR / "generate_tests_openai.py"), "--no-cache"]
+    if name == "tests-openai2":
+        return [py, str(SCRIPTS_DIR / "generate_tests_openai2.py"), "--no-cache"]
+    raise ValueError(name)
+
+
+def run_scenario(
+    name: str,
+    size: int,
+    repo: pathlib.Path,
+    work: pathlib.Path,
+    mock_url: str,
+    jobs: int,
+    log_dir: pathlib.Path,
+) -> Dict[str, object]:
+    env = dict(os.environ)
+    env.update(
+        {
+            "AZURE_OPENAI_ENDPOINT": mock_url,
+            "AZURE_OPENAI_API_KEY": "benchmark",
+            "AZURE_OPENAI_DEPLOYMENT": "mock",
+            "OPENAI_API_KEY": "benchmark",
+            "OPENAI_BASE_URL": mock_url + "/v1",
+            "PYTHONUNBUFFERED": "1",
+        }
+    )
+    env.pop("GITHUB_EVENT_PATH", None)
+    _http("POST", mock_url + "/__reset")
+    for store in GENERATED_STORES:
+        (repo / store).unlink(missing_ok=True)
+
+    cmd = scenario_command(name, repo, work, jobs)
+    log_path = log_dir / f"{name}-{size}.log"
+    with log_path.open("w", encoding="utf-8") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=str(repo), env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, rusage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    stats = _http("GET", mock_url + "/__stats")
+
+    # ru_maxrss: Linux in KiB, macOS in Bytes
+    peak_rss = rusage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return {
+        "scenario": name,
+        "controllers": size,
+        "exit_code": proc.returncode,
+        "wall_s": round(wall, 3),
+        "calls": stats["requests"],
+        "calls_by_status": stats["by_status"],
+        "bytes_sent": stats["bytes_in"],
+        "bytes_received": stats["bytes_out"],
+        "prompt_tokens": stats["prompt_tokens"],
+        "cached_tokens": stats.get("cached_tokens", 0),
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 1),
+        "log": str(log_path),
+    }
+
+
+# ---------- Vergleich ----------
+
+def compare_with_baseline(results: List[dict], baseline_path: pathlib.Path, max_regression: float) -> List[str]:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    old = {(r["scenario"], r["controllers"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        ref = old.get((r["scenario"], r["controllers"]))
+        if not ref or r.get("skipped") or ref.get("skipped"):
+            continue
+        for metric in ("wall_s", "peak_rss_mb", "calls", "bytes_sent"):
+            before, after = ref.get(metric), r.get(metric)
+            if not before or after is None:
+                continue
+            if after > before * (1 + max_regression):
+                regressions.append(
+                    f"{r['scenario']} ({r['controllers']} Controller): {metric} {before} -> {after} "
+                    f"(+{(after / before - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "-C", str(REPO_ROOT), "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _sdk_available() -> bool:
+    try:
+        import openai  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _cached_share(result: dict) -> str:
+    """Anteil der Prompt-Tokens, die der (simulierte) Anbieter-Cache abgedeckt hat."""
+    prompt = result.get("prompt_tokens") or 0
+    return f"{100.0 * (result.get('cached_tokens') or 0) / prompt:.0f}%" if prompt else "-"
+
+
+def print_table(results: List[dict]) -> None:
+    print(f"{'Szenario':<17} {'Ctrl':>5} {'Wall [s]':>9} {'Calls':>6} {'Gesendet':>10} {'Empfangen':>10} {'Cached':>8} {'RSS [MB]':>9}  Exit")
+    for r in results:
+        if r.get("skipped"):
+            print(f"{r['scenario']:<17} {r['controllers']:>5}  übersprungen: {r['skipped']}")
+            continue
+        print(
+            f"{r['scenario']:<17} {r['controllers']:>5} {r['wall_s']:>9.2f} {r['calls']:>6} "
+            f"{r['bytes_sent']:>10} {r['bytes_received']:>10} {_cached_share(r):>8} {r['peak_rss_mb']:>9.1f}  {r['exit_code']}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark der Generator-Skripte gegen den lokalen Mock-Server.")
+    parser.add_argument("--sizes", default="10,100,1000", help="Anzahl Controller je synthetischem Projekt (Default: 10,100,1000)")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(ALL_SCENARIOS),
+        help=f"Kommagetrennte Auswahl aus: {', '.join(ALL_SCENARIOS)}",
+    )
+    parser.add_argument("--jobs", type=int, default=8, help="--jobs für die parallelen Szenarien (Default: 8)")
+    parser.add_argument("--latency", default="fixed:20", help="Latenz des Mock-Servers (siehe mock_openai_server.py)")
+    parser.add_argument("--error-429-rate", type=float, default=0.0)
+    parser.add_argument("--error-5xx-rate", type=float, default=0.0)
+    parser.add_argument("--straggler-rate", type=float, default=0.0, help="Anteil der Nachzügler im Mock-Server (für tests-hedge)")
+    parser.add_argument("--straggler-ms", type=float, default=2000.0, help="Zusatzlatenz der Nachzügler in ms (Default: 2000)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"Ergebnisdatei (Default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--baseline", default=None, help="Frühere Ergebnisdatei zum Vergleich")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Erlaubte Verschlechterung ggü. Baseline (Default: 0.2 = 20%%)")
+    parser.add_argument("--keep", action="store_true", help="Synthetische Projekte nicht löschen")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(ALL_SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unbekannte Szenarien: {', '.join(sorted(unknown))}")
+
+    output = pathlib.Path(args.output).resolve()
+    log_dir = output.parent / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    sdk = _sdk_available()
+
+    mock, mock_url = start_mock(args, log_dir)
+    results: List[dict] = []
+    base = pathlib.Path(tempfile.mkdtemp(prefix="ai-bench-"))
+    try:
+        for size in sizes:
+            repo = base / f"repo-{size}"
+            create_synthetic_repo(repo, size)
+            for name in scenarios:
+                if name in SDK_SCENARIOS and not sdk:
+                    results.append({"scenario": name, "controllers": size, "skipped": "openai-SDK nicht installiert"})
+                    continue
+                work = base / f"work-{size}-{name}"
+                work.mkdir(parents=True, exist_ok=True)
+                print(f"[INFO] {name} mit {size} Controllern ...", flush=True)
+                results.append(run_scenario(name, size, repo, work, mock_url, args.jobs, log_dir))
+    finally:
+        mock.terminate()
+        mock.wait(timeout=10)
+        if not args.keep:
+            shutil.rmtree(base, ignore_errors=True)
+        else:
+            print(f"[INFO] Synthetische Projekte bleiben erhalten: {base}")
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "jobs": args.jobs,
+            "latency": args.latency,
+            "error_429_rate": args.error_429_rate,
+            "error_5xx_rate": args.error_5xx_rate,
+        },
+        "results": results,
+    }
+    output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print_table(results)
+    print(f"[OK] Ergebnisse geschrieben: {output}")
+
+    failed = [r for r in results if r.get("exit_code")]
+    for r in failed:
+        print(f"[WARN] {r['scenario']} ({r['controllers']} Controller) endete mit Exit-Code {r['exit_code']}, siehe {r['log']}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, pathlib.Path(args.baseline), args.max_regression)
+        for line in regressions:
+            print(f"[WARN] Regression: {line}")
+        if regressions:
+            sys.exit(1)
+        print("[OK] Keine Regression gegenüber der Baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+cli.py
+
+Gemeinsamer Einstieg für alle Generatoren (Unterkommandos statt einzelner Skripte):
+
+    python scripts tests --source-dir src/main/java --test-dir src/test/java --jobs 4
+    python scripts tests --backend openai            # generate_tests_openai.py (openai-SDK)
+    python scripts tests --backend azure-responses   # generate_tests_openai2.py (Responses API)
+    python scripts ui-tests --jobs 4
+    python scripts docs --map-reduce
+    python scripts all --jobs 6                      # alles in einem Prozess (orchestrator.py)
+    python -m scripts ...                            # gleichwertig, aus dem Repo-Root
+
+- Importiert wird nur das Modul des gewählten Unterkommandos bzw. Backends;
+  openai-SDK, requests/httpx und tiktoken werden erst geladen, wenn sie
+  tatsächlich gebraucht werden (nicht bei --help oder --dry-run).
+- Alle übrigen Argumente gehen unverändert an das Modul ("tests --help" zeigt sie).
+- Die Startzeit (ab hier bis die Argumente geparst sind) erscheint in der
+  Telemetrie als Phase "startup"; --dry-run und Läufe mit vollem Cache-Treffer
+  bestehen damit fast nur aus Startzeit (siehe Szenario "cli-dry-run" in
+  benchmark_generators.py).
+
+Die bisherigen Skripte bleiben direkt aufrufbar (python scripts/<skript>.py).
+"""
+
+import time
+
+_STARTED = time.monotonic()
+
+import argparse  # noqa: E402
+import importlib  # noqa: E402
+import pathlib  # noqa: E402
+import sys  # noqa: E402
+from typing import List, Optional  # noqa: E402
+
+# Unterkommando -> Backend -> Modul (das erste Backend ist der Default)
+COMMANDS = {
+    "tests": {
+        "azure": "generate_tests_with_azure_openai",
+        "openai": "generate_tests_openai",
+        "azure-responses": "generate_tests_openai2",
+    },
+    "ui-tests": {"azure": "generate_ui_tests_with_azure_openai"},
+    "docs": {"azure": "generate_docs_with_azure_openai"},
+    "all": {"azure": "orchestrator"},
+}
+
+USAGE = """\
+Aufruf: python scripts <kommando> [--backend BACKEND] [optionen ...]
+
+Kommandos:
+  tests      JUnit-5-Tests erzeugen (--backend azure | openai | azure-responses, Default: azure)
+  ui-tests   Playwright-Tests erzeugen
+  docs       Architektur-Doku erzeugen
+  all        alles zusammen in einem Prozess (gemeinsame Queue, Verbindungspool und Rate-Limit)
+
+"python scripts <kommando> --help" zeigt die Optionen des Kommandos.
+"""
+
+
+def resolve(command: str, argv: List[str]) -> tuple:
+    """(Modulname, restliche Argumente) für ein Kommando; --backend wird hier verbraucht."""
+    backends = COMMANDS[command]
+    parser = argparse.ArgumentParser(prog=f"scripts {command}", add_help=False)
+    parser.add_argument("--backend", choices=sorted(backends), default=next(iter(backends)))
+    args, rest = parser.parse_known_args(argv)
+    return backends[args.backend], rest
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print(USAGE, end="")
+        return
+    command = argv.pop(0)
+    if command not in COMMANDS:
+        raise SystemExit(f"Unbekanntes Kommando: {command}\n\n{USAGE}")
+
+    module_name, rest = resolve(command, argv)
+
+    import telemetry
+
+    telemetry.mark_process_start(_STARTED)
+    # Das Modul parst sys.argv selbst; argv[0] bestimmt u.a. den Namen der Telemetrie-Datei
+    sys.argv = [str(pathlib.Path(__file__).with_name(f"{module_name}.py")), *rest]
+    importlib.import_module(module_name).main()
+
+
+if __name__ == "__main__":
+    main()
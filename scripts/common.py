@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+common.py
+
+Gemeinsame Hilfen der Generator-Skripte (vorher in jedem Skript dupliziert):
+
+- azure_config(): Endpoint, Key und Deployment aus der Umgebung – erst beim
+  Aufruf gelesen, nicht beim Import (Import und --dry-run gehen ohne Azure-Zugang).
+- azure_chat(): Chat-Completion über den gemeinsamen Transport, Antwort-Cache und
+  (falls --stream aktiv) das Streaming aus llm_stream.py; optional an ein
+  anderes Deployment (Modell-Routing, siehe model_router.py); mit --hedge wird
+  ein Nachzügler dupliziert (llm_hedge.py).
+- strip_code_fences(), read_file(), write_text_atomic().
+- import_openai(): importiert das openai-SDK erst, wenn ein SDK-Backend es braucht.
+
+Das Modul zieht selbst keine schweren Abhängigkeiten (requests/httpx/openai) nach;
+die lädt llm_transport.py bzw. import_openai() erst bei Bedarf.
+"""
+
+import os
+import pathlib
+import re
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+
+import ai_cache
+import llm_hedge
+import llm_stream
+import llm_transport
+import rate_limit
+import telemetry
+
+
+@dataclass(frozen=True)
+class AzureConfig:
+    endpoint: str
+    api_key: str
+    deployment: str
+
+    def chat_url(self, api_version: str, deployment: Optional[str] = None) -> str:
+        return (
+            f"{self.endpoint}/openai/deployments/{deployment or self.deployment}"
+            f"/chat/completions?api-version={api_version}"
+        )
+
+
+def azure_config() -> AzureConfig:
+    """Liest AZURE_OPENAI_ENDPOINT/_API_KEY/_DEPLOYMENT; RuntimeError, falls etwas fehlt."""
+    config = AzureConfig(
+        endpoint=os.environ.get("AZURE_OPENAI_ENDPOINT", "").rstrip("/"),
+        api_key=os.environ.get("AZURE_OPENAI_API_KEY", ""),
+        deployment=os.environ.get("AZURE_OPENAI_DEPLOYMENT", ""),
+    )
+    if not config.endpoint or not config.api_key or not config.deployment:
+        raise RuntimeError(
+            "Azure OpenAI Konfiguration fehlt: AZURE_OPENAI_ENDPOINT / AZURE_OPENAI_API_KEY / AZURE_OPENAI_DEPLOYMENT"
+        )
+    return config
+
+
+def azure_chat(
+    prompt: str,
+    system_prompt: str,
+    api_version: str,
+    label: str = "",
+    read_timeout: float = 90,
+    check: Optional[llm_stream.StreamCheck] = None,
+    partial_path: Optional[pathlib.Path] = None,
+    deployment: Optional[str] = None,
+    valid: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """
+    Chat-Completion (gecacht). Mit --stream wird die Antwort gestreamt, nach
+    partial_path mitgeschrieben und von check() früh geprüft. deployment
+    überschreibt AZURE_OPENAI_DEPLOYMENT (gehört mit zum Cache-Schlüssel).
+    valid(text) prüft die fertige Antwort: nur gültige werden gecacht (und gewinnen
+    mit --hedge); check() (falls angegeben) muss sie ebenfalls bestehen.
+    """
+    config = azure_config()
+    deployment = deployment or config.deployment
+    headers = {
+        "Content-Type": "application/json",
+        "api-key": config.api_key,
+    }
+    body = {
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+        # KEIN max_tokens, KEINE temperature -> kompatibel mit neueren Azure-Modellen
+    }
+
+    def _attempt(target: str, cancel: Optional[threading.Event]) -> str:
+        if cancel is not None and cancel.is_set():
+            raise llm_hedge.Cancelled(f"{label}: nicht mehr gesendet (Duplikat war schneller)")
+        url = config.chat_url(api_version, target)
+        streamer = llm_stream.get_streamer()
+        if streamer.enabled:
+            # parallele Versuche schreiben nicht in dieselbe .partial-Datei
+            partial = partial_path if cancel is None else None
+            return streamer.complete(url, headers, body, read_timeout, label, check, partial, cancel).text
+        resp = llm_transport.get_transport().post_json(url, headers, body, read_timeout=read_timeout)
+        if resp.status_code >= 400:
+            raise RuntimeError(f"Azure OpenAI Fehler {resp.status_code}: {resp.text}")
+        data = resp.json()
+        telemetry.get_telemetry().debug_response(label, data)
+        return data["choices"][0]["message"]["content"]
+
+    def _valid(text: str) -> bool:
+        if not text.strip() or (check is not None and check(text, True) is not None):
+            return False
+        return valid is None or valid(text)
+
+    def _request() -> str:
+        return llm_hedge.get_hedger().run(
+            _attempt, deployment, label, rate_limit.estimate_tokens(system_prompt + prompt), _valid
+        )
+
+    return ai_cache.get_cache().cached(
+        config.endpoint, deployment, api_version, system_prompt, prompt, _request, label, _valid
+    )
+
+
+def import_openai() -> Any:
+    """Das openai-SDK – erst importiert, wenn ein SDK-Backend tatsächlich läuft."""
+    try:
+        import openai
+    except ImportError:
+        raise SystemExit("Das openai-SDK ist nicht installiert (pip install openai).")
+    return openai
+
+
+def strip_code_fences(text: str, languages: Sequence[str] = ("java",)) -> str:
+    """
+    Inhalt des ersten ```<sprache> ...``` bzw. ``` ...``` Codeblocks, sonst der
+    ganze Text (jeweils ohne umgebenden Whitespace).
+    """
+    langs = "|".join(re.escape(lang) for lang in languages)
+    match = re.search(rf"```(?:{langs})?\s*(.*?)```", text, re.DOTALL)
+    if match:
+        return match.group(1).strip()
+    return text.strip()
+
+
+def read_file(path: pathlib.Path) -> str:
+    if not path.exists():
+        print(f"[WARN] Datei nicht gefunden: {path}")
+        return ""
+    return path.read_text(encoding="utf-8")
+
+
+def write_text_atomic(path: pathlib.Path, text: str) -> None:
+    """
+    Schreibt eine Datei atomar (temporäre Datei + os.replace), damit parallel
+    laufende Worker nie halb geschriebene Dateien hinterlassen.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
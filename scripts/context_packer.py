@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+context_packer.py
+
+Token-basierter Kontext-Packer für große Prompts (z.B. Architektur-Doku).
+
+- Tokens werden mit einem lokalen Tokenizer gezählt (tiktoken, falls installiert;
+  sonst Schätzung mit ca. 4 Zeichen pro Token). Nach use_estimate() (--dry-run)
+  wird tiktoken gar nicht erst importiert (get_encoding lädt ggf. Dateien nach).
+- Dateien werden nach Wichtigkeit sortiert: Controller und annotierte
+  Einstiegspunkte zuerst, normale Klassen und Templates danach,
+  Bootstrap-Klassen (@SpringBootApplication / *Application) zuletzt.
+- Das Budget wird der Reihe nach gefüllt. Passt eine Datei nicht vollständig,
+  wird sie auf ihre Signaturen reduziert (Annotationen, Klassen, Felder,
+  Methodenköpfe – keine Methodenrümpfe), statt mitten in einer Methode
+  abgeschnitten zu werden. Passt auch das nicht, wird sie verworfen.
+- PackResult.report() fasst zusammen, wie viele Tokens gesendet bzw. verworfen wurden.
+- Items dürfen statt "code" ein SourceFile-Handle ("file", siehe source_files.py)
+  tragen; der Inhalt wird dann erst beim Packen gelesen und nur für eingepackte
+  Dateien behalten.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+_ENCODER = None
+_ENCODER_NAME: Optional[str] = None
+
+ENTRY_POINT_ANNOTATIONS = (
+    "@Service",
+    "@Component",
+    "@Configuration",
+    "@Repository",
+    "@Entity",
+    "@Scheduled",
+    "@EventListener",
+    "@ControllerAdvice",
+    "@RestControllerAdvice",
+)
+
+
+def _load_encoder() -> None:
+    global _ENCODER, _ENCODER_NAME
+    if _ENCODER_NAME is not None:
+        return
+    try:
+        import tiktoken
+
+        for name in ("o200k_base", "cl100k_base"):
+            try:
+                _ENCODER = tiktoken.get_encoding(name)
+                _ENCODER_NAME = f"tiktoken/{name}"
+                return
+            except Exception:
+                continue
+    except ImportError:
+        pass
+    _ENCODER_NAME = "Schätzung (4 Zeichen/Token)"
+
+
+def use_estimate() -> None:
+    """Nur noch schätzen, tiktoken nicht laden."""
+    global _ENCODER, _ENCODER_NAME
+    _ENCODER = None
+    _ENCODER_NAME = "Schätzung (4 Zeichen/Token)"
+
+
+def tokenizer_name() -> str:
+    _load_encoder()
+    return _ENCODER_NAME or ""
+
+
+def count_tokens(text: str) -> int:
+    _load_encoder()
+    if _ENCODER is not None:
+        return len(_ENCODER.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4) if text else 0
+
+
+def item_code(item: Dict[str, str]) -> str:
+    """Inhalt eines Items: bereits gelesener "code" oder frisch vom Handle "file"."""
+    code = item.get("code")
+    if code is not None:
+        return code
+    handle = item.get("file")
+    return handle.read() if handle is not None else ""
+
+
+# ---------- Wichtigkeit ----------
+
+def is_bootstrap(item: Dict[str, str], code: Optional[str] = None) -> bool:
+    record = item.get("record")  # JavaFileRecord aus java_index, falls vorhanden
+    if record is not None:
+        return record.is_bootstrap
+    stem = item["name"].rsplit(".", 1)[0]
+    return stem.endswith("Application") or "@SpringBootApplication" in (item_code(item) if code is None else code)
+
+
+def importance(item: Dict[str, str], code: Optional[str] = None) -> int:
+    """
+    Höher = wichtiger. Controller > annotierte Einstiegspunkte > Templates > Rest > Bootstrap.
+    code: bereits gelesener Inhalt (sonst wird er bei Bedarf mit item_code() gelesen).
+    """
+    if item.get("kind") == "template":
+        return 60 + (5 if item["name"].lower() == "index.html" else 0)
+    if is_bootstrap(item, code):
+        return 10
+    record = item.get("record")
+    if record is not None and record.is_controller:
+        return 100 + min(20, len(record.endpoints))
+    code = item_code(item) if code is None else code
+    if "@RestController" in code or "@Controller" in code:
+        return 100 + min(20, len(re.findall(r"@(?:Get|Post|Put|Delete|Patch|Request)Mapping", code)))
+    if any(a in code for a in ENTRY_POINT_ANNOTATIONS):
+        return 70
+    return 40
+
+
+# ---------- Degradierung ----------
+
+def java_signatures(code: str) -> str:
+    """
+    Reduziert Java-Code auf seine Struktur: package, Annotationen, Typ-Deklarationen,
+    Felder (mehrzeilige Initialisierer gekürzt) und Methodenköpfe mit leerem Rumpf.
+    """
+    out: List[str] = []
+    depth = 0
+    paren = 0
+    for raw in code.splitlines():
+        line = raw.rstrip()
+        stripped = line.strip()
+        start_depth, start_paren = depth, paren
+
+        # Zeichenketten/Kommentare grob entfernen, damit Klammern darin nicht zählen
+        scan = re.sub(r'"(?:\\.|[^"\\])*"', '""', stripped)
+        scan = re.sub(r"//.*$", "", scan)
+        depth += scan.count("{") - scan.count("}")
+        paren += scan.count("(") - scan.count(")")
+
+        if not stripped or stripped.startswith("import ") or stripped.startswith("//"):
+            continue
+        if start_depth >= 2 or start_paren > 0:
+            continue  # Methodenrumpf oder Fortsetzung eines mehrzeiligen Ausdrucks
+        if start_depth == 1 and depth >= 2:
+            # Methodenkopf (oder innere Klasse) – Rumpf weglassen
+            head = line[: line.rfind("{")].rstrip() if "{" in line else line
+            out.append(f"{head} {{ ... }}")
+            continue
+        if start_depth == 1 and paren > 0:
+            out.append(f"{line} ... );")  # mehrzeiliger Feld-Initialisierer
+            continue
+        out.append(line)
+    return "\n".join(out)
+
+
+def html_outline(html: str) -> str:
+    """Entfernt Skript-/Style-Inhalte und Leerzeilen aus einem Template."""
+    html = re.sub(r"(<script[^>]*>).*?(</script>)", r"\1 ... \2", html, flags=re.DOTALL | re.IGNORECASE)
+    html = re.sub(r"(<style[^>]*>).*?(</style>)", r"\1 ... \2", html, flags=re.DOTALL | re.IGNORECASE)
+    return "\n".join(line.rstrip() for line in html.splitlines() if line.strip())
+
+
+def degrade(item: Dict[str, str], code: Optional[str] = None) -> str:
+    code = item_code(item) if code is None else code
+    if item.get("kind") == "template":
+        return html_outline(code)
+    return java_signatures(code)
+
+
+# ---------- Packen ----------
+
+@dataclass
+class PackedItem:
+    item: Dict[str, str]
+    code: str
+    mode: str  # "full" | "signatures" | "dropped"
+    tokens: int
+    full_tokens: int
+
+
+@dataclass
+class PackResult:
+    budget: int
+    items: List[PackedItem] = field(default_factory=list)
+
+    def included(self, kind: str) -> List[Dict[str, str]]:
+        """Eingepackte Dateien einer Art in Originalreihenfolge, Code ggf. degradiert."""
+        return [
+            dict(p.item, code=p.code, mode=p.mode)
+            for p in self.items
+            if p.mode != "dropped" and p.item.get("kind") == kind
+        ]
+
+    @property
+    def sent_tokens(self) -> int:
+        return sum(p.tokens for p in self.items if p.mode != "dropped")
+
+    @property
+    def dropped_tokens(self) -> int:
+        return sum(p.full_tokens - (p.tokens if p.mode != "dropped" else 0) for p in self.items)
+
+    def report(self) -> str:
+        full = sum(1 for p in self.items if p.mode == "full")
+        sig = sum(1 for p in self.items if p.mode == "signatures")
+        dropped = [p.item["path"] for p in self.items if p.mode == "dropped"]
+        lines = [
+            f"[INFO] Prompt-Kontext: {self.sent_tokens} von {self.budget} Tokens gesendet "
+            f"({full} Datei(en) vollständig, {sig} als Signaturen), "
+            f"{self.dropped_tokens} Tokens weggelassen ({len(dropped)} Datei(en) verworfen) "
+            f"– Tokenizer: {tokenizer_name()}"
+        ]
+        for path in dropped:
+            lines.append(f"[WARN] Nicht im Prompt (Budget erschöpft): {path}")
+        return "\n".join(lines)
+
+
+def pack_context(
+    items: List[Dict[str, str]],
+    budget: int,
+    render: Callable[[Dict[str, str], str], str],
+) -> PackResult:
+    """
+    Füllt das Token-Budget nach Wichtigkeit. render(item, code) liefert den Text,
+    der für eine Datei tatsächlich im Prompt landet (inkl. Überschrift/Fences),
+    damit auch dieser Overhead mitgezählt wird; bei reduzierten Dateien ist
+    item["mode"] == "signatures". Jede Datei wird genau einmal gelesen.
+    """
+    result = PackResult(budget=budget)
+    codes = {idx: item_code(it) for idx, it in enumerate(items)}
+    order: List[Tuple[int, int]] = sorted(
+        ((-importance(it, codes[idx]), idx) for idx, it in enumerate(items))
+    )
+    packed: Dict[int, PackedItem] = {}
+    remaining = budget
+    for _, idx in order:
+        item = items[idx]
+        code = codes.pop(idx)  # verworfene Dateien nicht bis zum Ende behalten
+        full_tokens = count_tokens(render(item, code))
+        if full_tokens <= remaining:
+            packed[idx] = PackedItem(item, code, "full", full_tokens, full_tokens)
+            remaining -= full_tokens
+            continue
+        reduced = degrade(item, code)
+        reduced_tokens = count_tokens(render(dict(item, mode="signatures"), reduced))
+        if reduced_tokens <= remaining:
+            packed[idx] = PackedItem(item, reduced, "signatures", reduced_tokens, full_tokens)
+            remaining -= reduced_tokens
+            continue
+        packed[idx] = PackedItem(item, "", "dropped", 0, full_tokens)
+
+    result.items = [packed[i] for i in range(len(items))]
+    return result
@@ -7,6 +7,24 @@ als Markdown-Datei (docs/architecture.md).
 
 Strategie:
 - Versucht zuerst, eine Doku via Azure OpenAI zu erzeugen.
+- Der Quelltext-Kontext wird token-basiert gepackt (--token-budget, siehe
+  context_packer.py): Controller zuerst, Bootstrap-Klassen zuletzt, große
+  Dateien notfalls nur als Signaturen statt mitten im Code abgeschnitten.
+- Mit --map-reduce wird jede Datei einzeln (parallel) zu einer kompakten
+  JSON-Zusammenfassung verdichtet (gecacht über den Inhalts-Hash in
+  docs/.ai-summaries.json); die eigentliche Doku entsteht dann in einem Aufruf
+  über diese Zusammenfassungen statt über den gesamten Quelltext. Die Prompts
+  beginnen mit einem festen Präfix, Pfad und Code der Datei stehen am Ende
+  (Prompt-Caching beim Anbieter).
+- Mit --map-reduce --shard i/N übernimmt ein Lauf nur seinen (nach Dateigröße
+  balancierten) Teil des Map-Schritts und legt ein Teilergebnis ab; nach
+  "sharding.py merge" erzeugt ein Lauf ohne --shard die Doku (siehe sharding.py).
+- Mit --dry-run werden nur die nötigen Aufrufe und Prompt-Größen ausgegeben.
+- Mit --stream wird die Antwort gestreamt (docs/architecture.md.partial wächst
+  mit) und abgebrochen, sobald sie klar unbrauchbar ist (z.B. Java-Code statt
+  Markdown oder keine Überschrift in den ersten --stream-check-tokens Tokens).
+- Aufrufe (Latenz, Tokens, Cache) und Phasen werden als JSON Lines nach
+  target/ai-telemetry/ geschrieben (siehe telemetry.py).
 - Falls die Antwort offensichtlich unbrauchbar ist (z.B. nur ein Java-Snippet,
   sehr kurz, keine Markdown-Überschriften), wird automatisch auf einen
   deterministischen Fallback-Generator zurückgegriffen, der aus dem Code
@@ -22,112 +40,179 @@ Erwartet (für den Azure-Teil) Umgebungsvariablen:
 - AZURE_OPENAI_DEPLOYMENT
 """
 
+import argparse
 import os
 import pathlib
 import textwrap
 import json
 import re
-from typing import List, Dict
-
-import requests
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import ai_cache
+import common
+import context_packer
+import java_index
+import llm_hedge
+import llm_stream
+import llm_transport
+import model_router
+import rate_limit
+import sharding
+import source_files
+import telemetry
 
 API_VERSION = "2024-02-15-preview"  # ggf. anpassen
 
+# Token-Budget für den gesamten Prompt (Anweisungen + Quelltext-Kontext)
+DEFAULT_TOKEN_BUDGET = 60000
+
+# Map-Reduce: zwischengespeicherte Datei-Zusammenfassungen (wird mit docs/ committet)
+SUMMARY_STORE_NAME = ".ai-summaries.json"
+SUMMARY_STORE_VERSION = 1
+
+DOC_SYSTEM_PROMPT = (
+    "You are a senior software architect. "
+    "You create clear, structured, multi-section technical and architectural documentation "
+    "for Java/Spring Boot web applications with REST APIs and HTML/Thymeleaf UIs. "
+    "You always write a complete Markdown document with headings and narrative text, "
+    "not just a short code snippet. "
+    "You do NOT invent features that are not visible in the code. "
+    "If something is unclear, you clearly mark it as an assumption."
+)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You are a senior software architect. "
+    "You summarize single source files of a Java/Spring Boot web application "
+    "into compact, factual JSON. You never invent anything that is not visible in the file."
+)
+
+# Fester Präfix zuerst (für alle Dateien byte-identisch -> Prompt-Caching beim
+# Anbieter), Pfad und Code der Datei am Ende. Der Präfix wird nicht formatiert.
+SUMMARY_PROMPT_PREFIX = textwrap.dedent("""
+    Summarize the file at the end of this message for an architecture overview.
+
+    Reply with ONLY one JSON object (no Markdown, no explanations) with these keys:
+    - "path": the file path as given
+    - "role": one of "rest-controller", "mvc-controller", "bootstrap", "service", "config",
+      "model", "class", "template"
+    - "purpose": 1-2 sentences
+    - "endpoints": list of {"method": ..., "path": ..., "params": [...]} (empty if none)
+    - "dependencies": list of referenced project classes or templates
+    - "ui": for templates: headings, buttons, element ids and endpoints called via JavaScript
+    - "notes": list of short, notable facts (validation, error handling, hard-coded data)
+
+    Keep the whole object below 200 words.
+    """)
 
-# ---------- Hilfsfunktionen: Dateien einlesen ----------
+SUMMARY_PROMPT_TEMPLATE = textwrap.dedent("""
+    File: {path} ({kind})
+    ```{lang}
+    {code}
+    ```
+    """)
 
-def read_file(path: pathlib.Path) -> str:
-    if not path.exists():
-        return ""
-    try:
-        return path.read_text(encoding="utf-8")
-    except Exception:
-        return ""
 
+# ---------- Hilfsfunktionen: Dateien einlesen ----------
 
-def collect_java_files(base_dir: pathlib.Path) -> List[Dict[str, str]]:
-    result: List[Dict[str, str]] = []
-    if not base_dir.exists():
-        return result
-    for path in base_dir.rglob("*.java"):
-        code = read_file(path)
-        if not code.strip():
+def collect_java_files(
+    base_dir: pathlib.Path,
+    files: Optional[Iterable[source_files.SourceFile]] = None,
+) -> Iterator[Dict]:
+    """
+    Java-Dateien als leichtgewichtige Items (Name, Pfad, SourceFile-Handle, Index-Record).
+    Der Inhalt wird erst beim Packen bzw. Zusammenfassen gelesen (context_packer.item_code).
+    files: bereits gefundene Handles unterhalb von base_dir (z.B. vom Orchestrator).
+    """
+    if files is None:
+        files = source_files.iter_source_files(base_dir, (".java",))
+    for f in files:
+        if f.is_blank():
             continue
-        result.append(
-            {
-                "name": path.name,
-                "path": str(path.relative_to(base_dir.parent)),
-                "code": code,
-            }
-        )
-    return result
+        yield {
+            "name": f.name,
+            "path": str(f.path.relative_to(base_dir.parent)),
+            "file": f,
+            "record": java_index.get_index().get(f.path),
+        }
 
 
-def collect_templates(templates_dir: pathlib.Path) -> List[Dict[str, str]]:
-    result: List[Dict[str, str]] = []
-    if not templates_dir.exists():
-        return result
-    for path in templates_dir.rglob("*.html"):
-        code = read_file(path)
-        if not code.strip():
+def collect_templates(templates_dir: pathlib.Path) -> Iterator[Dict]:
+    for f in source_files.iter_source_files(templates_dir, (".html",)):
+        if f.is_blank():
             continue
-        result.append(
-            {
-                "name": path.name,
-                "path": str(path.relative_to(templates_dir.parent)),
-                "code": code,
-            }
-        )
-    return result
+        yield {
+            "name": f.name,
+            "path": str(f.path.relative_to(templates_dir.parent)),
+            "file": f,
+        }
 
 
 # ---------- Azure OpenAI Aufruf ----------
 
-def call_azure_openai(prompt: str) -> str:
-    endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT", "").rstrip("/")
-    api_key = os.environ.get("AZURE_OPENAI_API_KEY", "")
-    deployment = os.environ.get("AZURE_OPENAI_DEPLOYMENT", "")
-
-    if not endpoint or not api_key or not deployment:
-        raise RuntimeError("Azure OpenAI Umgebungsvariablen sind nicht gesetzt.")
-
-    url = f"{endpoint}/openai/deployments/{deployment}/chat/completions?api-version={API_VERSION}"
-
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": api_key,
-    }
-
-    system_prompt = (
-        "You are a senior software architect. "
-        "You create clear, structured, multi-section technical and architectural documentation "
-        "for Java/Spring Boot web applications with REST APIs and HTML/Thymeleaf UIs. "
-        "You always write a complete Markdown document with headings and narrative text, "
-        "not just a short code snippet. "
-        "You do NOT invent features that are not visible in the code. "
-        "If something is unclear, you clearly mark it as an assumption."
+def call_azure_openai(
+    prompt: str,
+    system_prompt: str = DOC_SYSTEM_PROMPT,
+    check: Optional[llm_stream.StreamCheck] = None,
+    partial_path: Optional[pathlib.Path] = None,
+    label: str = "",
+    deployment: Optional[str] = None,
+    valid: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """
+    Chat-Completion über den gemeinsamen Transport (gecacht). Mit --stream wird die
+    Antwort gestreamt, nach partial_path mitgeschrieben und von check() früh geprüft;
+    gecacht wird nur, was check() und valid() besteht.
+    """
+    label = label or (partial_path.name if partial_path is not None else "Zusammenfassung")
+    return common.azure_chat(
+        prompt,
+        system_prompt,
+        API_VERSION,
+        label,
+        180,
+        check=check,
+        partial_path=partial_path,
+        deployment=deployment,
+        valid=valid,
     )
 
-    body = {
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": prompt},
-        ]
-    }
 
-    resp = requests.post(url, headers=headers, data=json.dumps(body), timeout=180)
-    if resp.status_code >= 400:
-        raise RuntimeError(f"Azure OpenAI Fehler {resp.status_code}: {resp.text}")
-    data = resp.json()
-    return data["choices"][0]["message"]["content"]
+def generate_doc(prompt: str, partial_path: pathlib.Path) -> str:
+    """
+    Doku-Aufruf mit Modell-Routing: großer Prompt -> große Stufe. Sieht die Antwort
+    nach unvollständiger Doku aus (oder bricht der Stream sie früh ab), wird die
+    nächsthöhere Stufe gefragt; leer, wenn auch die höchste nichts Brauchbares liefert.
+    """
+    router = model_router.get_router()
+    label = partial_path.name
+    route = router.route(model_router.RouteInput(context_packer.count_tokens(prompt)), label)
+    while True:
+        try:
+            completion = call_azure_openai(
+                prompt,
+                check=early_doc_rejection,
+                partial_path=partial_path,
+                deployment=route.deployment or None,
+                valid=lambda text: not looks_like_bad_doc(strip_markdown_fences(text)),
+            )
+            md, problem = accept_doc(completion), "unvollständige Doku"
+        except llm_stream.StreamRejected as e:
+            if not router.enabled:
+                raise
+            md, problem = "", e.reason
+        if md:
+            return md
+        route = router.escalate(route, problem, label)
+        if route is None:
+            print("[WARN] Keine brauchbare Doku vom Modell – Fallback wird verwendet.")
+            return ""
 
 
 def strip_markdown_fences(text: str) -> str:
     # Falls das Modell ```markdown ...``` drum herum legt
-    match = re.search(r"```(?:markdown)?\s*(.*?)```", text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    return text.strip()
+    return common.strip_code_fences(text, ("markdown",))
 
 
 # ---------- Qualitätscheck für die AI-Antwort ----------
@@ -159,32 +244,44 @@ def looks_like_bad_doc(md: str) -> bool:
     return False
 
 
-# ---------- Prompt für Azure ----------
+def early_doc_rejection(text: str, window_reached: bool) -> Optional[str]:
+    """
+    Frühe Variante von looks_like_bad_doc für den Streaming-Modus: bewertet den
+    bisher empfangenen Anfang der Antwort. Rückgabe ist der Abbruchgrund oder None.
+    """
+    head = re.sub(r"^\s*```(?:markdown|md)?[ \t]*\n", "", text)
+    if re.match(r"\s*```java\b", text) or re.match(r"\s*(?:package|import)\s+[\w.*]+\s*;", head):
+        return "Antwort beginnt mit Java-Code statt Markdown"
+    if re.match(r"\s*(?:public\s+)?(?:class|interface)\s+\w+", head):
+        return "Antwort beginnt mit Java-Code statt Markdown"
+    if window_reached and not re.search(r"^#{1,6}\s+\S", head, re.MULTILINE):
+        return f"keine Markdown-Überschrift in den ersten {llm_stream.get_streamer().check_tokens} Tokens"
+    return None
 
-def shorten_code(code: str, max_lines: int = 200) -> str:
-    lines = code.splitlines()
-    if len(lines) <= max_lines:
-        return code
-    return "\n".join(lines[:max_lines]) + "\n// ... truncated ..."
 
+# ---------- Prompt für Azure ----------
 
-def build_prompt(java_files, templates) -> str:
-    java_snippets = []
-    for jf in java_files:
-        java_snippets.append(
-            f"File: {jf['path']}\n```java\n{shorten_code(jf['code'])}\n```"
-        )
+def render_snippet(item: Dict[str, str], code: str) -> str:
+    """Ein Quelltext-Block im Prompt. Auf Signaturen reduzierte Dateien werden markiert."""
+    note = ""
+    if item.get("mode") == "signatures":
+        note = " (structure only – bodies omitted to fit the context budget)"
+    if item.get("kind") == "template":
+        return f"Template: {item['path']}{note}\n```html\n{code}\n```"
+    return f"File: {item['path']}{note}\n```java\n{code}\n```"
 
-    template_snippets = []
-    for t in templates:
-        template_snippets.append(
-            f"Template: {t['path']}\n```html\n{shorten_code(t['code'], max_lines=120)}\n```"
-        )
 
-    java_block = "\n\n".join(java_snippets)
-    tmpl_block = "\n\n".join(template_snippets)
+def pack_sources(java_files, templates, token_budget: int) -> context_packer.PackResult:
+    """
+    Verteilt das Token-Budget (abzüglich der festen Anweisungen) auf die Quelldateien:
+    wichtige Dateien vollständig, große ggf. nur als Signaturen, Rest wird verworfen.
+    """
+    instructions_tokens = context_packer.count_tokens(build_prompt([], []))
+    items = [dict(jf, kind="java") for jf in java_files] + [dict(t, kind="template") for t in templates]
+    return context_packer.pack_context(items, max(0, token_budget - instructions_tokens), render_snippet)
+
 
-    return textwrap.dedent(f"""
+DOC_REQUIREMENTS = textwrap.dedent("""
     Please create a **comprehensive technical and architectural documentation** in **Markdown**
     for the following Java/Spring Boot demo project called `hackathon2025`.
 
@@ -212,7 +309,27 @@ def build_prompt(java_files, templates) -> str:
     5. Testing Strategy
     6. CI/CD and AI-Assisted Workflows
     7. Limitations and Next Steps
+    """)
+
+DOC_CLOSING = textwrap.dedent("""
+    Now produce the full Markdown content for `docs/architecture.md`.
+    Do NOT wrap the whole document in a single code block.
+    """)
+
+
+def build_prompt(java_files, templates) -> str:
+    java_snippets = []
+    for jf in java_files:
+        java_snippets.append(render_snippet(dict(jf, kind="java"), jf["code"]))
+
+    template_snippets = []
+    for t in templates:
+        template_snippets.append(render_snippet(dict(t, kind="template"), t["code"]))
+
+    java_block = "\n\n".join(java_snippets)
+    tmpl_block = "\n\n".join(template_snippets)
 
+    context = textwrap.dedent("""
     ### Source Code Context
 
     Below you find the relevant Java files and HTML templates.
@@ -221,47 +338,205 @@ def build_prompt(java_files, templates) -> str:
 
     #### Java files
 
-    {java_block}
+    """) + java_block + "\n\n#### HTML templates\n\n" + tmpl_block + "\n"
 
-    #### HTML templates
+    return DOC_REQUIREMENTS + context + DOC_CLOSING
 
-    {tmpl_block}
 
-    Now produce the full Markdown content for `docs/architecture.md`.
-    Do NOT wrap the whole document in a single code block.
-    """)
+def build_reduce_prompt(summaries: List[Dict]) -> str:
+    """Reduce-Schritt: die Doku wird nur noch aus den kompakten Datei-Zusammenfassungen erzeugt."""
+    context = textwrap.dedent("""
+    ### Component Summaries
 
+    Below you find structured summaries of every Java file and HTML template of the project,
+    generated directly from the source code. Use them as the **factual basis** for your
+    documentation. Do not invent components, endpoints or pages that are not listed.
 
-# ---------- Fallback-Doku ohne Azure ----------
+    ```json
+    """) + json.dumps(summaries, indent=1, ensure_ascii=False) + "\n```\n"
 
-def extract_package_name(java_code: str) -> str:
-    m = re.search(r"^\s*package\s+([a-zA-Z0-9_.]+)\s*;", java_code, re.MULTILINE)
-    return m.group(1) if m else ""
+    return DOC_REQUIREMENTS + context + DOC_CLOSING
 
 
-def extract_class_name(code: str, fallback: str) -> str:
-    m = re.search(r"class\s+([A-Za-z0-9_]+)", code)
-    if m:
-        return m.group(1)
-    return fallback
+# ---------- Map-Reduce: Zusammenfassungen pro Datei ----------
 
+def summary_prompt(item: Dict[str, str]) -> str:
+    is_template = item.get("kind") == "template"
+    return SUMMARY_PROMPT_PREFIX + SUMMARY_PROMPT_TEMPLATE.format(
+        kind="HTML template" if is_template else "Java",
+        path=item["path"],
+        lang="html" if is_template else "java",
+        code=context_packer.item_code(item),
+    )
 
-def extract_endpoints(java_code: str) -> List[Dict[str, str]]:
-    endpoints = []
 
-    def add_matches(http_method: str, pattern: str):
-        for m in re.finditer(pattern, java_code):
-            path = m.group(1)
-            endpoints.append({"method": http_method, "path": path})
+SUMMARY_PROMPT_SHA256 = hashlib.sha256(
+    (SUMMARY_SYSTEM_PROMPT + "\n" + SUMMARY_PROMPT_PREFIX + SUMMARY_PROMPT_TEMPLATE).encode("utf-8")
+).hexdigest()
 
-    # Simple Heuristik für @GetMapping, @PostMapping, @RequestMapping
-    add_matches("GET", r"@GetMapping\(\s*\"([^\"]+)\"\s*\)")
-    add_matches("POST", r"@PostMapping\(\s*\"([^\"]+)\"\s*\)")
-    add_matches("REQUEST", r"@RequestMapping\(\s*\"([^\"]+)\"\s*\)")
 
-    return endpoints
+def parse_summary(text: str, item: Dict[str, str]) -> Dict:
+    """Liest das JSON-Objekt aus der Antwort; bei kaputtem JSON bleibt der Text erhalten."""
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match:
+        try:
+            data = json.loads(match.group(0))
+            if isinstance(data, dict):
+                data["path"] = item["path"]
+                return data
+        except ValueError:
+            pass
+    return {"path": item["path"], "summary": text.strip()[:2000]}
+
+
+def load_summary_store(path: pathlib.Path) -> Dict[str, Dict]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != SUMMARY_STORE_VERSION:
+        return {}
+    return dict(data.get("entries") or {})
+
+
+def save_summary_store(path: pathlib.Path, entries: Dict[str, Dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {"version": SUMMARY_STORE_VERSION, "entries": {k: entries[k] for k in sorted(entries)}}
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
 
 
+def plan_summaries(
+    items: List[Dict[str, str]],
+    old_entries: Dict[str, Dict],
+) -> Tuple[Dict[str, Dict], List[Dict[str, str]]]:
+    """
+    Wiederverwendbare Store-Einträge und die neu zusammenzufassenden Items (mit
+    source_sha256 und der Modell-Stufe "route"). Eine Zusammenfassung bleibt gültig,
+    solange sie von der gerouteten oder einer höheren Stufe stammt.
+    """
+    router = model_router.get_router()
+    reused: Dict[str, Dict] = {}
+    todo: List[Dict[str, str]] = []
+    for item in items:
+        # Inhalt nur zum Hashen lesen; für den Aufruf wird er später erneut gelesen
+        code = context_packer.item_code(item)
+        source_sha256 = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        features = model_router.RouteInput.from_record(context_packer.count_tokens(code), item.get("record"))
+        route = router.route(features, item["path"], record=False)
+        entry = old_entries.get(item["path"])
+        if (
+            entry
+            and entry.get("source_sha256") == source_sha256
+            and entry.get("prompt_sha256") == SUMMARY_PROMPT_SHA256
+            and router.accepts(route, entry.get("deployment", ""))
+        ):
+            reused[item["path"]] = entry
+        else:
+            todo.append(dict(item, source_sha256=source_sha256, route=route))
+
+    print(f"[INFO] Map-Schritt: {len(reused)} Zusammenfassung(en) wiederverwendet, {len(todo)} neu.")
+    return reused, todo
+
+
+def map_summaries(
+    items: List[Dict[str, str]],
+    store_path: pathlib.Path,
+    jobs: int,
+) -> Tuple[List[Dict], Dict[str, Dict]]:
+    """
+    Map-Schritt: fasst jede Datei einzeln (parallel) zusammen. Zusammenfassungen werden
+    über den Inhalts-Hash wiederverwendet, d.h. nur geänderte Dateien kosten einen Aufruf.
+    Rückgabe: Zusammenfassungen (sortiert) und die Store-Einträge der übergebenen
+    Dateien – Einträge nicht mehr vorhandener Dateien fehlen darin, der Aufrufer speichert.
+    """
+    entries, todo = plan_summaries(items, load_summary_store(store_path))
+    summaries: Dict[str, Dict] = {path: entry["summary"] for path, entry in entries.items()}
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {pool.submit(summarize_item, item): item for item in todo}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                summary, error = future.result(), None
+            except Exception as e:
+                summary, error = None, e
+            apply_summary_result(item, summary, error, summaries, entries)
+
+    return ordered_summaries(items, summaries), entries
+
+
+def summarize_item(item: Dict[str, str]) -> Dict:
+    """Ein Map-Aufruf: Zusammenfassung einer Datei (auf der Modell-Stufe aus plan_summaries)."""
+    tel = telemetry.get_telemetry()
+    with tel.phase("prompt", item["path"]):
+        prompt = summary_prompt(item)
+    route = item["route"]
+    model_router.get_router().record(route, item["path"])
+    completion = call_azure_openai(
+        prompt, system_prompt=SUMMARY_SYSTEM_PROMPT, label=item["path"], deployment=route.deployment or None
+    )
+    # mit --hedge kann ein anderes Deployment geantwortet haben
+    item["deployment"] = ai_cache.get_cache().last_deployment() or ""
+    with tel.phase("postprocess", item["path"]):
+        return parse_summary(completion, item)
+
+
+def apply_summary_result(
+    item: Dict[str, str],
+    summary: Optional[Dict],
+    error: Optional[BaseException],
+    summaries: Dict[str, Dict],
+    entries: Dict[str, Dict],
+) -> None:
+    """Übernimmt eine Zusammenfassung; bei Fehler gehen nur die Signaturen in den Reduce-Schritt."""
+    if error is not None:
+        # Nicht speichern – beim nächsten Lauf wird es erneut versucht
+        print(f"[WARN] Zusammenfassung für {item['path']} fehlgeschlagen ({error}), nutze Signaturen.")
+        summaries[item["path"]] = {"path": item["path"], "structure": context_packer.degrade(item)}
+        return
+    summaries[item["path"]] = summary
+    entries[item["path"]] = {
+        "source_sha256": item["source_sha256"],
+        "prompt_sha256": SUMMARY_PROMPT_SHA256,
+        "deployment": item.get("deployment")
+        or item["route"].deployment
+        or os.environ.get("AZURE_OPENAI_DEPLOYMENT", ""),
+        "summary": summary,
+    }
+
+
+def ordered_summaries(items: List[Dict[str, str]], summaries: Dict[str, Dict]) -> List[Dict]:
+    # Deterministische Reihenfolge: wichtigste Dateien zuerst, dann nach Pfad
+    ordered = sorted(items, key=lambda it: (-context_packer.importance(it), it["path"]))
+    return [summaries[it["path"]] for it in ordered]
+
+
+def item_weight(item: Dict) -> int:
+    handle = item.get("file")
+    return handle.size if handle is not None else len(item.get("code") or "")
+
+
+def run_map_shard(items: List[Dict], store_path: pathlib.Path, args: argparse.Namespace) -> None:
+    """--shard: nur den eigenen Teil des Map-Schritts ausführen und als Teilergebnis ablegen."""
+    mine = sharding.partition(items, args.shard, weight=item_weight, key=lambda it: it["path"])
+    print(f"[INFO] Shard {args.shard.label}: {len(mine)} von {len(items)} Datei(en) für den Map-Schritt.")
+    before = load_summary_store(store_path)
+    _, entries = map_summaries(mine, store_path, args.jobs)
+    changed, _ = sharding.diff_entries(before, entries)
+    sharding.write_partial(
+        pathlib.Path(args.shard_dir),
+        "docs",
+        args.shard,
+        store_path,
+        SUMMARY_STORE_VERSION,
+        changed,
+        items=len(mine),
+        weight=sum(item_weight(it) for it in mine),
+    )
+
+
+# ---------- Fallback-Doku ohne Azure ----------
+
 def extract_h1_from_template(html: str) -> str:
     m = re.search(r"<h1[^>]*>(.*?)</h1>", html, re.IGNORECASE | re.DOTALL)
     if not m:
@@ -275,25 +550,26 @@ def build_fallback_doc(java_files, templates) -> str:
     # Controller & Endpoints sammeln
     controllers = []
     for jf in java_files:
-        code = jf["code"]
-        if "@RestController" in code or "@Controller" in code:
-            pkg = extract_package_name(code)
-            cls = extract_class_name(code, jf["name"].replace(".java", ""))
-            endpoints = extract_endpoints(code)
+        record = jf.get("record")
+        if record is None:
+            continue
+        for cls in record.classes:
+            if not cls.is_controller:
+                continue
             controllers.append(
                 {
-                    "package": pkg,
-                    "class": cls,
+                    "package": record.package,
+                    "class": cls.name,
                     "path": jf["path"],
-                    "endpoints": endpoints,
-                    "rest": "@RestController" in code,
+                    "endpoints": cls.endpoints,
+                    "rest": cls.is_rest_controller,
                 }
             )
 
     # Templates sammeln
     template_infos = []
     for t in templates:
-        h1 = extract_h1_from_template(t["code"])
+        h1 = extract_h1_from_template(context_packer.item_code(t))
         template_infos.append(
             {
                 "name": t["name"],
@@ -352,11 +628,14 @@ def build_fallback_doc(java_files, templates) -> str:
             if c["endpoints"]:
                 lines.append("  - Endpoints:")
                 for ep in c["endpoints"]:
+                    params = ", ".join(
+                        f"{p.name}={p.default}" if p.default is not None else p.name for p in ep.params
+                    )
                     lines.append(
-                        f"    - `{ep['method']}` `{ep['path']}`"
+                        f"    - `{ep.http_method}` `{ep.path}`" + (f" (params: {params})" if params else "")
                     )
             else:
-                lines.append("  - Endpoints: (no @GetMapping/@PostMapping/@RequestMapping with string literal found)")
+                lines.append("  - Endpoints: (no request mappings found)")
         lines.append("")
     else:
         lines.append(
@@ -498,34 +777,126 @@ def extract_pr_info_from_event() -> Dict[str, str]:
 
 # ---------- main ----------
 
+def report_dry_run(java_files: List[Dict], templates: List[Dict], repo_root: pathlib.Path, args: argparse.Namespace) -> None:
+    """--dry-run: Anzahl der Aufrufe und Prompt-Größe, ohne Aufruf und ohne Schreiben."""
+    if not os.environ.get("AZURE_OPENAI_ENDPOINT"):
+        print("[INFO] Dry-Run: Azure OpenAI ist nicht konfiguriert – es würde nur der Fallback erzeugt (kein Aufruf).")
+        return
+    if args.map_reduce:
+        items = [dict(jf, kind="java") for jf in java_files] + [dict(t, kind="template") for t in templates]
+        store = load_summary_store(repo_root / "docs" / SUMMARY_STORE_NAME)
+        _, todo = plan_summaries(items, store)
+        for item in todo:
+            print(f"  - {item['path']} [{item['route'].tier}]")
+        tokens = sum(context_packer.count_tokens(summary_prompt(item)) for item in todo)
+        print(f"[INFO] Dry-Run: {len(todo)} Map-Aufruf(e) (~{tokens} Prompt-Tokens) + 1 Reduce-Aufruf.")
+        return
+    packed = pack_sources(java_files, templates, args.token_budget)
+    print(packed.report())
+    prompt = build_prompt(packed.included("java"), packed.included("template"))
+    print(f"[INFO] Dry-Run: 1 Aufruf, ~{context_packer.count_tokens(prompt)} Prompt-Tokens.")
+
+
 def main() -> None:
-    repo_root = pathlib.Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(
+        description="Erzeugt docs/architecture.md mittels Azure OpenAI (mit deterministischem Fallback)."
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=DEFAULT_TOKEN_BUDGET,
+        help=f"Maximale Prompt-Größe in Tokens (Default: {DEFAULT_TOKEN_BUDGET})",
+    )
+    parser.add_argument(
+        "--map-reduce",
+        action="store_true",
+        help="Jede Datei einzeln (gecacht) zusammenfassen und die Doku nur aus den Zusammenfassungen erzeugen",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help="Parallele Aufrufe im Map-Schritt (Default: 4)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Nur anzeigen, welche Aufrufe nötig wären (keine Modellaufrufe, nichts wird geschrieben)",
+    )
+    parser.add_argument(
+        "--repo-root",
+        default=str(pathlib.Path(__file__).resolve().parents[1]),
+        help="Wurzel des Projekts (Default: eine Ebene über scripts/, z.B. für Benchmarks abweichend)",
+    )
+    ai_cache.add_cache_arguments(parser)
+    java_index.add_index_arguments(parser)
+    llm_transport.add_transport_arguments(parser)
+    llm_stream.add_stream_arguments(parser)
+    rate_limit.add_rate_limit_arguments(parser)
+    model_router.add_routing_arguments(parser)
+    llm_hedge.add_hedge_arguments(parser)
+    telemetry.add_telemetry_arguments(parser)
+    sharding.add_shard_arguments(parser)
+    args = parser.parse_args()
+    if args.shard is not None and not args.map_reduce:
+        parser.error("--shard verteilt den Map-Schritt und setzt --map-reduce voraus")
+    tel = telemetry.configure_from_args(args, export=not args.dry_run)
+    ai_cache.configure_from_args(args)
+    java_index.configure_from_args(args, save=not args.dry_run)
+    if args.dry_run:
+        context_packer.use_estimate()  # kein tiktoken-Import/-Download
+    llm_transport.configure_from_args(args)
+    llm_stream.configure_from_args(args)
+    rate_limit.configure_from_args(args, max_concurrency=args.jobs)
+    model_router.configure_from_args(args)
+    llm_hedge.configure_from_args(args)
+
+    repo_root = pathlib.Path(args.repo_root).resolve()
 
     java_src_dir = repo_root / "src/main/java/com/example/hackathon2025"
     templates_dir = repo_root / "src/main/resources/templates"
 
-    java_files = collect_java_files(java_src_dir)
-    templates = collect_templates(templates_dir)
+    with tel.phase("scan"):
+        # nur Handles – der Quelltext wird erst beim Packen/Zusammenfassen gelesen
+        java_files = list(collect_java_files(java_src_dir))
+        templates = list(collect_templates(templates_dir))
 
     if not java_files:
         print(f"[WARN] Keine Java-Dateien unter {java_src_dir} gefunden.")
     if not templates:
         print(f"[WARN] Keine HTML-Templates unter {templates_dir} gefunden.")
 
+    if args.dry_run:
+        report_dry_run(java_files, templates, repo_root, args)
+        return
+
+    if args.shard is not None:
+        # Reduce und Doku übernimmt ein Lauf ohne --shard nach "sharding.py merge"
+        items = [dict(jf, kind="java") for jf in java_files] + [dict(t, kind="template") for t in templates]
+        run_map_shard(items, repo_root / "docs" / SUMMARY_STORE_NAME, args)
+        return
+
     # 1) Versuchen, Azure OpenAI zu verwenden
     md = ""
     used_fallback = False
     if os.environ.get("AZURE_OPENAI_ENDPOINT"):
         try:
-            prompt = build_prompt(java_files, templates)
-            print("[INFO] Rufe Azure OpenAI zur Generierung der Architektur-Dokumentation auf ...")
-            completion = call_azure_openai(prompt)
-            md_candidate = strip_markdown_fences(completion)
-            if looks_like_bad_doc(md_candidate):
-                print("[WARN] Azure OpenAI Antwort sieht nach unvollständiger Doku aus – Fallback wird verwendet.")
-                used_fallback = True
+            if args.map_reduce:
+                items = [dict(jf, kind="java") for jf in java_files] + [dict(t, kind="template") for t in templates]
+                store_path = repo_root / "docs" / SUMMARY_STORE_NAME
+                summaries, entries = map_summaries(items, store_path, args.jobs)
+                save_summary_store(store_path, entries)
+                with tel.phase("prompt", "reduce"):
+                    prompt = build_reduce_prompt(summaries)
+                print(f"[INFO] Reduce-Prompt: {len(prompt)} Zeichen (~{context_packer.count_tokens(prompt)} Tokens).")
             else:
-                md = md_candidate
+                with tel.phase("prompt"):
+                    packed = pack_sources(java_files, templates, args.token_budget)
+                    prompt = build_prompt(packed.included("java"), packed.included("template"))
+                print(packed.report())
+            print("[INFO] Rufe Azure OpenAI zur Generierung der Architektur-Dokumentation auf ...")
+            md = generate_doc(prompt, repo_root / "docs" / "architecture.md.partial")
+            used_fallback = not md
         except Exception as e:
             print(f"[WARN] Azure OpenAI konnte nicht verwendet werden: {e}")
             used_fallback = True
@@ -535,8 +906,25 @@ def main() -> None:
 
     # 2) Fallback, falls nötig
     if used_fallback:
-        md = build_fallback_doc(java_files, templates)
+        with tel.phase("postprocess", "fallback"):
+            md = build_fallback_doc(java_files, templates)
+
+    write_architecture_doc(repo_root, md)
+
+
+def accept_doc(completion: str) -> str:
+    """Die Doku aus der Antwort – leer, wenn sie unvollständig aussieht (dann greift der Fallback)."""
+    with telemetry.get_telemetry().phase("postprocess"):
+        md = strip_markdown_fences(completion)
+        bad = looks_like_bad_doc(md)
+    if bad:
+        print("[WARN] Azure OpenAI Antwort sieht nach unvollständiger Doku aus.")
+        return ""
+    return md
+
 
+def write_architecture_doc(repo_root: pathlib.Path, md: str) -> None:
+    """Schreibt docs/architecture.md mit Hinweis-Header und (falls vorhanden) Jira-/PR-Bezug."""
     # 3) Jira-Key + PR-Infos holen
     jira_key = extract_jira_key_from_branch()
     pr_info = extract_pr_info_from_event()
@@ -572,7 +960,8 @@ def main() -> None:
     )
 
     content = header + md.rstrip() + "\n" + footer_section + "\n"
-    target_path.write_text(content, encoding="utf-8")
+    with telemetry.get_telemetry().phase("write"):
+        target_path.write_text(content, encoding="utf-8")
     print(f"[OK] Architektur-Dokumentation geschrieben: {target_path}")
 
 
@@ -1,15 +1,26 @@
 # -*- coding: utf-8 -*-
+import argparse
 import os
 import glob
-import textwrap
-
-from openai import OpenAI
-
-# Der Client liest OPENAI_API_KEY automatisch aus der Umgebung
-client = OpenAI()
-
-SOURCE_PATTERN = "src/main/java/**/*.java"
+import pathlib
+
+import ai_cache
+import common
+import git_changes
+import llm_transport
+import rate_limit
+import telemetry
+
+# Der Client liest OPENAI_API_KEY automatisch aus der Umgebung.
+# Er wird in main() erzeugt (erst dort wird das openai-SDK importiert),
+# damit er den gemeinsamen HTTP-Transport nutzt.
+client = None
+
+SOURCE_ROOT = "src/main/java"
+SOURCE_PATTERN = SOURCE_ROOT + "/**/*.java"
 TEST_ROOT = "src/test/java"
+MODEL = "gpt-4.1-mini"
+SYSTEM_PROMPT = "Du erzeugst saubere, kompakte JUnit-5-Tests in Java."
 
 PROMPT_TEMPLATE = (
     "Erstelle JUnit 5 Tests fuer die folgende Java-Klasse.\n\n"
@@ -24,39 +35,43 @@ PROMPT_TEMPLATE = (
 
 
 def generate_test_for_file(java_file: str):
-    with open(java_file, "r", encoding="utf-8") as f:
-        source_code = f.read()
+    tel = telemetry.get_telemetry()
+    with tel.phase("scan", java_file):
+        with open(java_file, "r", encoding="utf-8") as f:
+            source_code = f.read()
 
-    prompt = PROMPT_TEMPLATE.format(source_code=source_code)
+    with tel.phase("prompt", java_file):
+        prompt = PROMPT_TEMPLATE.format(source_code=source_code)
 
     print(f"Generating tests for: {java_file}")
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": "Du erzeugst saubere, kompakte JUnit-5-Tests in Java.",
-            },
-            {
-                "role": "user",
-                "content": prompt,
-            },
-        ],
-        temperature=0.2,
-    )
-
-    content = response.choices[0].message.content
+    def _send():
+        return client.chat.completions.create(
+            model=MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": SYSTEM_PROMPT,
+                },
+                {
+                    "role": "user",
+                    "content": prompt,
+                },
+            ],
+            temperature=0.2,
+        )
+
+    def _request() -> str:
+        estimated = rate_limit.estimate_tokens(SYSTEM_PROMPT + prompt) + rate_limit.DEFAULT_COMPLETION_TOKENS
+        response = rate_limit.get_limiter().call(_send, estimated)
+        telemetry.get_telemetry().debug_response(java_file, response)
+        return response.choices[0].message.content
+
+    content = ai_cache.get_cache().cached(str(client.base_url), MODEL, "", SYSTEM_PROMPT, prompt, _request, java_file)
 
     # Falls der Code in ```java ... ```-Blocks kommt, extrahieren
-    if "```" in content:
-        parts = content.split("```")
-        for i, p in enumerate(parts):
-            if p.strip().startswith("java"):
-                # naechster Block ist der eigentliche Code
-                if i + 1 < len(parts):
-                    content = parts[i + 1].strip()
-                break
+    with tel.phase("postprocess", java_file):
+        content = common.strip_code_fences(content)
 
     # Zielpfad: src/test/java/<package>/<ClassName>Test.java
     rel_path = os.path.relpath(java_file, "src/main/java")
@@ -68,14 +83,55 @@ def generate_test_for_file(java_file: str):
     os.makedirs(out_dir, exist_ok=True)
     out_file = os.path.join(out_dir, test_name + ".java")
 
-    with open(out_file, "w", encoding="utf-8") as f:
-        f.write(content.strip() + "\n")
+    with tel.phase("write", java_file):
+        with open(out_file, "w", encoding="utf-8") as f:
+            f.write(content.strip() + "\n")
 
     print(f"Test written: {out_file}")
 
 
+def select_source_files(since, delete_orphans: bool):
+    if not since:
+        return glob.glob(SOURCE_PATTERN, recursive=True)
+
+    source_dir = pathlib.Path(SOURCE_ROOT)
+    test_dir = pathlib.Path(TEST_ROOT)
+    changes = git_changes.changed_java_files(since, source_dir)
+    git_changes.move_renamed_tests(changes, source_dir, test_dir)
+    if delete_orphans:
+        git_changes.delete_orphaned_tests(changes, source_dir, test_dir)
+    return [os.path.relpath(p) for p in git_changes.generation_targets(changes)]
+
+
 def main():
-    files = glob.glob(SOURCE_PATTERN, recursive=True)
+    parser = argparse.ArgumentParser(description="Erzeugt JUnit-5-Tests mittels OpenAI.")
+    parser.add_argument(
+        "--since",
+        default=None,
+        metavar="REF",
+        help="Nur seit merge-base(REF, HEAD) geaenderte Java-Dateien verarbeiten (z.B. origin/main)",
+    )
+    parser.add_argument(
+        "--delete-orphans",
+        action="store_true",
+        help="Mit --since: Tests geloeschter Klassen entfernen",
+    )
+    ai_cache.add_cache_arguments(parser)
+    llm_transport.add_transport_arguments(parser)
+    rate_limit.add_rate_limit_arguments(parser)
+    telemetry.add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    telemetry.configure_from_args(args)
+    ai_cache.configure_from_args(args)
+    transport = llm_transport.configure_from_args(args)
+    rate_limit.configure_from_args(args)
+
+    global client
+    # Retries uebernimmt rate_limit (Retry-After, Backoff, Budgets), nicht das SDK
+    client = common.import_openai().OpenAI(http_client=transport.sdk_http_client(), max_retries=0)
+
+    with telemetry.get_telemetry().phase("scan"):
+        files = select_source_files(args.since, args.delete_orphans)
     if not files:
         print("No Java source files found.")
         return
@@ -1,31 +1,44 @@
 # -*- coding: utf-8 -*-
+import argparse
 import os
 import glob
-import re
-from openai import AzureOpenAI
-
-# Konfiguration aus Umgebungsvariablen
-endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-api_key = os.getenv("AZURE_OPENAI_API_KEY")
-deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")  # Deployment-Name aus Azure
-
-if not endpoint or not api_key or not deployment:
-    raise SystemExit(
-        "Azure OpenAI Konfiguration fehlt: "
-        "AZURE_OPENAI_ENDPOINT / AZURE_OPENAI_API_KEY / AZURE_OPENAI_DEPLOYMENT"
+import pathlib
+
+import ai_cache
+import common
+import git_changes
+import llm_hedge
+import llm_transport
+import model_router
+import rate_limit
+import telemetry
+
+API_VERSION = "2025-04-01-preview"  # aus deiner Endpoint-URL
+
+# Konfiguration (aus Umgebungsvariablen) und Client werden erst in main() erzeugt:
+# Import und --help funktionieren damit ohne Azure-Zugang und ohne openai-SDK.
+config = None
+client = None
+
+
+def build_client(transport: llm_transport.Transport, config: common.AzureConfig):
+    # WICHTIG:
+    # AZURE_OPENAI_ENDPOINT in den Secrets OHNE api-version:
+    # z.B. https://swc-eh-oai-openai-1.openai.azure.com/
+    return common.import_openai().AzureOpenAI(
+        azure_endpoint=config.endpoint,
+        api_key=config.api_key,
+        api_version=API_VERSION,
+        http_client=transport.sdk_http_client(),
+        # Retries uebernimmt rate_limit (Retry-After, Backoff, Budgets), nicht das SDK
+        max_retries=0,
     )
 
-# WICHTIG:
-# AZURE_OPENAI_ENDPOINT in den Secrets OHNE api-version:
-# z.B. https://swc-eh-oai-openai-1.openai.azure.com/
-client = AzureOpenAI(
-    azure_endpoint=endpoint,
-    api_key=api_key,
-    api_version="2025-04-01-preview",  # aus deiner Endpoint-URL
-)
 
-SOURCE_PATTERN = "src/main/java/**/*.java"
+SOURCE_ROOT = "src/main/java"
+SOURCE_PATTERN = SOURCE_ROOT + "/**/*.java"
 TEST_ROOT = "src/test/java"
+SYSTEM_PROMPT = "Du erzeugst saubere, kompakte JUnit-5-Tests in Java."
 
 PROMPT_TEMPLATE = (
     "Erstelle JUnit 5 Tests fuer die folgende Java-Klasse.\n\n"
@@ -88,16 +101,7 @@ def clean_java_code(content: str) -> str:
     if not content:
         return ""
 
-    # Falls in ```java ... ``` eingebettet
-    if "```" in content:
-        parts = content.split("```")
-        for i, p in enumerate(parts):
-            if p.strip().startswith("java"):
-                if i + 1 < len(parts):
-                    content = parts[i + 1]
-                break
-
-    cleaned = content.strip()
+    cleaned = common.strip_code_fences(content)
 
     # ganz grober Sanity-Check: muss zumindest "class" enthalten
     if "class " not in cleaned:
@@ -106,39 +110,71 @@ def clean_java_code(content: str) -> str:
     return cleaned
 
 
+def request_tests(prompt: str, deployment: str, label: str) -> str:
+    """Ein (gecachter) Responses-API-Aufruf an das angegebene Deployment (mit --hedge ggf. dupliziert)."""
+    prompt_tokens = rate_limit.estimate_tokens(SYSTEM_PROMPT + prompt)
+
+    def _attempt(target: str, cancel) -> str:
+        if cancel is not None and cancel.is_set():
+            raise llm_hedge.Cancelled(f"{label}: nicht mehr gesendet (Duplikat war schneller)")
+
+        def _send():
+            return client.responses.create(
+                model=target,
+                input=[
+                    {
+                        "role": "system",
+                        "content": SYSTEM_PROMPT,
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt,
+                    },
+                ],
+            )
+
+        resp = rate_limit.get_limiter().call(_send, prompt_tokens + rate_limit.DEFAULT_COMPLETION_TOKENS)
+        # Rohantwort nur stichprobenartig und gekuerzt (--debug-responses)
+        telemetry.get_telemetry().debug_response(label, resp)
+        return extract_text_from_response(resp)
+
+    def _request() -> str:
+        return llm_hedge.get_hedger().run(
+            _attempt, deployment, label, prompt_tokens, lambda text: bool(clean_java_code(text))
+        )
+
+    return ai_cache.get_cache().cached(config.endpoint, deployment, API_VERSION, SYSTEM_PROMPT, prompt, _request, label)
+
+
 def generate_test_for_file(java_file: str):
     # Optional: bestimmte Klassen skippen, z.B. Application-Klasse
     if java_file.endswith("Application.java"):
         print(f"Skippe Application-Klasse: {java_file}")
         return
 
-    with open(java_file, "r", encoding="utf-8") as f:
-        source_code = f.read()
+    tel = telemetry.get_telemetry()
+    with tel.phase("scan", java_file):
+        with open(java_file, "r", encoding="utf-8") as f:
+            source_code = f.read()
 
-    prompt = PROMPT_TEMPLATE.format(source_code=source_code)
+    with tel.phase("prompt", java_file):
+        prompt = PROMPT_TEMPLATE.format(source_code=source_code)
 
     print(f"Generating tests for: {java_file}")
 
-    resp = client.responses.create(
-        model=deployment,
-        input=[
-            {
-                "role": "system",
-                "content": "Du erzeugst saubere, kompakte JUnit-5-Tests in Java.",
-            },
-            {
-                "role": "user",
-                "content": prompt,
-            },
-        ],
-    )
-
-    print("==== RAW AZURE RESPONSE ====")
-    print(repr(resp))
-    print("==== END RAW AZURE RESPONSE ====")
-
-    raw = extract_text_from_response(resp)
-    code = clean_java_code(raw)
+    # Kleine Klassen an die kleine Modell-Stufe; ohne Java-Klasse in der Antwort eine Stufe hoeher
+    router = model_router.get_router()
+    route = router.route(model_router.RouteInput(rate_limit.estimate_tokens(source_code)), java_file)
+    while True:
+        deployment = route.deployment or config.deployment
+        raw = request_tests(prompt, deployment, java_file)
+        with tel.phase("postprocess", java_file):
+            code = clean_java_code(raw)
+        if code:
+            break
+        route = router.escalate(route, "keine Java-Klasse in der Antwort", java_file)
+        if route is None:
+            break
 
     if not code:
         print("Keine gueltige Java-Klasse im Response gefunden, ueberspringe Datei.")
@@ -153,14 +189,61 @@ def generate_test_for_file(java_file: str):
     os.makedirs(out_dir, exist_ok=True)
     out_file = os.path.join(out_dir, test_name + ".java")
 
-    with open(out_file, "w", encoding="utf-8") as f:
-        f.write(code + "\n")
+    with tel.phase("write", java_file):
+        with open(out_file, "w", encoding="utf-8") as f:
+            f.write(code + "\n")
 
     print(f"Test written: {out_file}")
 
 
+def select_source_files(since, delete_orphans: bool):
+    if not since:
+        return glob.glob(SOURCE_PATTERN, recursive=True)
+
+    source_dir = pathlib.Path(SOURCE_ROOT)
+    test_dir = pathlib.Path(TEST_ROOT)
+    changes = git_changes.changed_java_files(since, source_dir)
+    git_changes.move_renamed_tests(changes, source_dir, test_dir)
+    if delete_orphans:
+        git_changes.delete_orphaned_tests(changes, source_dir, test_dir)
+    return [os.path.relpath(p) for p in git_changes.generation_targets(changes)]
+
+
 def main():
-    files = glob.glob(SOURCE_PATTERN, recursive=True)
+    parser = argparse.ArgumentParser(description="Erzeugt JUnit-5-Tests mittels Azure OpenAI (Responses API).")
+    parser.add_argument(
+        "--since",
+        default=None,
+        metavar="REF",
+        help="Nur seit merge-base(REF, HEAD) geaenderte Java-Dateien verarbeiten (z.B. origin/main)",
+    )
+    parser.add_argument(
+        "--delete-orphans",
+        action="store_true",
+        help="Mit --since: Tests geloeschter Klassen entfernen",
+    )
+    ai_cache.add_cache_arguments(parser)
+    llm_transport.add_transport_arguments(parser)
+    rate_limit.add_rate_limit_arguments(parser)
+    model_router.add_routing_arguments(parser)
+    llm_hedge.add_hedge_arguments(parser)
+    telemetry.add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    telemetry.configure_from_args(args)
+    ai_cache.configure_from_args(args)
+    rate_limit.configure_from_args(args)
+    model_router.configure_from_args(args)
+    llm_hedge.configure_from_args(args)
+
+    global client, config
+    try:
+        config = common.azure_config()
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    client = build_client(llm_transport.configure_from_args(args), config)
+
+    with telemetry.get_telemetry().phase("scan"):
+        files = select_source_files(args.since, args.delete_orphans)
     if not files:
         print("No Java source files found.")
         return
@@ -4,8 +4,16 @@ generate_tests_with_azure_openai.py
 
 Erzeugt oder aktualisiert JUnit-5-Tests für Java-Klassen mittels Azure OpenAI.
 
-- Läuft über ALLE .java-Dateien unterhalb von src/main/java (kein git diff).
+- Läuft standardmäßig über ALLE .java-Dateien unterhalb von src/main/java.
+- Mit --since REF (z.B. origin/main) nur über die seit merge-base(REF, HEAD)
+  geänderten, neuen oder umbenannten Dateien. Tests umbenannter Klassen werden
+  mitverschoben, mit --delete-orphans werden generierte Tests gelöschter Klassen entfernt.
+- Ein Manifest (Default: <test-dir>/.ai-generation.json) merkt sich pro Quelldatei
+  Quell-Hash, Prompt-Template (+Hash), Deployment und Hash des geschriebenen Tests.
+  Nur Einträge mit geänderten Eingaben werden neu generiert (--force: alle).
 - Für Bootstrap-Klassen (z.B. mit @SpringBootApplication oder *Application) werden KEINE Tests erzeugt.
+- Package, Klassenname und Bootstrap-Erkennung kommen aus dem persistenten
+  Java-Index (java_index.py); unveränderte Dateien werden nicht erneut geparst.
 - Für Spring MVC Controller wird empfohlen, im Test direkt den Controller zu instanziieren
   und org.springframework.ui.ExtendedModelMap als Model-Implementierung zu verwenden.
 
@@ -14,192 +22,914 @@ Erwartet folgende Umgebungsvariablen:
 - AZURE_OPENAI_API_KEY
 - AZURE_OPENAI_DEPLOYMENT     (Name des Deployments, z.B. gpt-4o, o3-mini, ...)
 
-Aufruf (z.B. im GitHub Workflow):
-    python scripts/generate_tests_with_azure_openai.py \
+Aufruf (z.B. im GitHub Workflow, über das gemeinsame CLI, siehe cli.py):
+    python scripts tests \
         --source-dir src/main/java \
-        --test-dir src/test/java
+        --test-dir src/test/java \
+        --jobs 4
+
+Mit --stream werden die Antworten gestreamt (der Test wächst als <Test>.java.partial
+mit) und abgebrochen, wenn nach --stream-check-tokens Tokens kein Java-Code erkennbar ist.
+
+Mit --batch werden alle Prompts als EIN Batch-Job eingereicht (JSONL unter
+target/ai-batch/requests.jsonl, custom_id = Pfad der Quelldatei), der Status
+abgefragt und die Ergebnisse danach auf die <Klasse>Test.java-Dateien verteilt.
+Siehe batch_backend.py (Azure Batch API bzw. --batch-backend local).
+
+Mit --jobs N laufen bis zu N Azure-Aufrufe parallel. Die längsten Prompts werden
+zuerst gestartet, die Ergebnisse pro Datei werden am Ende sortiert ausgegeben.
+
+Kleine Klassen (Quelltext höchstens ein Viertel von --pack-tokens) werden zu
+Sammelanfragen mit bis zu --pack-tokens Tokens Quelltext bzw. --pack-max-classes
+Klassen gepackt: Regeln und Beispiele gehen nur einmal über die Leitung, die
+Antwort enthält je Klasse einen markierten Abschnitt und wird wieder auf die
+einzelnen <Klasse>Test.java aufgeteilt. Fehlende oder kaputte Abschnitte werden
+einzeln nachgefordert. --pack-tokens 0 schaltet das Packen ab.
+
+Mit --verify werden anschließend nur die in diesem Lauf geschriebenen Tests
+übersetzt (ein javac-Aufruf gegen target/classes und den gecachten
+Test-Classpath) und im JUnit Console Launcher ausgeführt – statt eines kompletten
+`mvn clean verify`. Fehlerhafte Tests werden einzeln gemeldet oder mit
+--verify-on-failure revert zurückgenommen (siehe test_verify.py). Vorher
+bekommt das Modell für jeden fehlerhaften Test bis zu --repair-rounds Mal den
+Testcode plus Compiler-/Testmeldungen zur Korrektur (parallel, nur fehlerhafte Dateien).
+
+Mit --dry-run werden nur Zieldateien, Anzahl der Modellaufrufe (inkl. Sammelanfragen
+und Treffern im Antwort-Cache) und geschätzte Prompt-Tokens ausgegeben – ohne
+Modellaufruf, ohne Schreiben und ohne Azure-Umgebungsvariablen.
+
+Mit --shard i/N wird nur der i-te von N (nach Quelltextgröße balancierten) Teilen
+bearbeitet; das Teilergebnis des Manifests landet unter target/ai-shards/ und wird
+mit "python scripts/sharding.py merge" zusammengeführt (siehe sharding.py).
+
+Latenz, Tokens, Retries und Cache-Treffer pro Aufruf sowie die Dauer der Phasen
+landen in target/ai-telemetry/generate_tests_with_azure_openai.jsonl (siehe telemetry.py).
 """
 
 import os
 import pathlib
 import textwrap
-import json
 import re
 import argparse
-from typing import Optional, Tuple, List
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
 
-import requests
+import ai_cache
+import batch_backend
+import common
+import context_packer
+import git_changes
+import java_index
+import llm_hedge
+import llm_stream
+import llm_transport
+import model_router
+import rate_limit
+import sharding
+import source_files
+import telemetry
+import test_verify
+from common import read_file, strip_code_fences, write_text_atomic
+from generation_manifest import MANIFEST_VERSION, GenerationManifest, sha256_text
 
 API_VERSION = "2024-02-15-preview"  # ggf. an deine Azure-OpenAI-Ressource anpassen
 
+DEFAULT_MANIFEST_NAME = ".ai-generation.json"
+DEFAULT_REPAIR_ROUNDS = 2
+DEFAULT_PACK_TOKENS = 2000
+DEFAULT_PACK_MAX_CLASSES = 8
 
-# ---------------------------------------------------------
-# Hilfsfunktionen
-# ---------------------------------------------------------
-def read_file(path: pathlib.Path) -> str:
-    if not path.exists():
-        print(f"[WARN] Datei nicht gefunden: {path}")
-        return ""
-    return path.read_text(encoding="utf-8")
+SYSTEM_PROMPT = (
+    "You are a senior Java developer and test engineer. "
+    "Generate high-quality, compilable JUnit 5 test classes. "
+    "Focus on meaningful edge cases, null handling, and business rules. "
+    "Do NOT change production code; only produce test code. "
+    "Use JUnit 5 (org.junit.jupiter.api.*) and, when appropriate, Mockito. "
+    "Prefer plain unit tests without starting heavy frameworks when possible. "
+    "For Spring MVC controllers, DO NOT load a Spring context; "
+    "instantiate the controller directly and use simple Model implementations "
+    "like org.springframework.ui.ExtendedModelMap when a method expects "
+    "org.springframework.ui.Model."
+)
 
+# Prompt-Aufbau für das Prefix-Caching des Anbieters (Azure OpenAI/OpenAI cachen
+# identische Präfixe ab 1024 Tokens): System-Prompt, Regeln und Beispiele bilden
+# einen byte-stabilen Präfix, die Angaben zur Datei kommen ganz ans Ende.
+TEST_PROMPT_PREFIX = textwrap.dedent("""
+    Erzeuge zu der Java-Klasse am Ende dieser Nachricht eine passende JUnit-5-Testklasse.
+    Das Projekt ist ein Spring Boot / Java-Projekt. Anforderungen:
 
-def extract_package_and_class(java_source: str) -> Tuple[Optional[str], Optional[str]]:
-    """Extrahiert package-Name und Klassenname aus Java-Quelltext."""
-    package_match = re.search(r"package\s+([a-zA-Z0-9_.]+)\s*;", java_source)
-    class_match = re.search(r"(public\s+)?class\s+([A-Za-z0-9_]+)", java_source)
-    package_name = package_match.group(1) if package_match else None
-    class_name = class_match.group(2) if class_match else None
-    return package_name, class_name
+    Allgemein:
+    - Nutze JUnit 5 (`org.junit.jupiter.api.*`).
+    - Erzeuge sinnvolle Testmethoden für öffentliche Methoden:
+      - Normalfall
+      - Edge Cases
+      - Fehlerfälle, soweit ersichtlich.
+    - Verwende nach Bedarf Mockito (`org.mockito.*`) zum Mocking.
+    - Stelle sicher, dass der Testcode kompilierbar ist und typische Importe enthält.
+    - Verändere NICHT den Produktionscode; erzeuge nur Testcode.
 
+    Speziell für Spring MVC Controller:
+    - Falls Methoden ein Argument vom Typ `org.springframework.ui.Model` haben:
+      - verwende im Test `Model model = new org.springframework.ui.ExtendedModelMap();`
+      - rufe die Methode direkt auf, z.B.:
+          `String viewName = controller.index(model);`
+    - Verwende NICHT `ModelMap`, wenn die Methode `Model` erwartet.
+    - Starte keinen Spring ApplicationContext im Test,
+      verwende KEINE Annotationen wie `@SpringBootTest`, `@WebMvcTest` oder `@ExtendWith(SpringExtension.class)`,
+      außer es ist absolut notwendig (bitte eher vermeiden).
+    - Instanziere den Controller direkt mit `new <ClassName>()` oder mit einfachen Konstruktor-Parametern.
 
-def is_bootstrap_class(java_source: str, class_name: Optional[str]) -> bool:
-    """
-    Erkenne typische Bootstrap-Klassen, für die wir KEINE Tests generieren wollen.
+    Package / Struktur:
+    - Nutze die gleiche package-Deklaration wie die Quellklasse.
+    - Die Testklasse soll unter dem entsprechenden Pfad in src/test/java liegen
+      (das übernimmt das Skript bereits durch den Pfad).
 
-    Heuristik:
-    - Klasse enthält @SpringBootApplication
-    - oder Klassenname endet auf 'Application'
-    """
-    if not class_name:
-        return False
-    if "@SpringBootApplication" in java_source:
-        return True
-    if class_name.endswith("Application"):
-        return True
-    return False
+    Gib NUR den Java-Code der Testklasse zurück (keine Erklärungen, keine Kommentare außerhalb von Java).
 
+    Zwei Beispiele für Stil und Aufbau (nicht übernehmen, nur als Orientierung):
 
-# ---------------------------------------------------------
-# Azure OpenAI Aufruf
-# ---------------------------------------------------------
-def call_azure_openai(prompt: str) -> str:
-    endpoint = os.environ["AZURE_OPENAI_ENDPOINT"].rstrip("/")
-    api_key = os.environ["AZURE_OPENAI_API_KEY"]
-    deployment = os.environ["AZURE_OPENAI_DEPLOYMENT"]
+    Beispiel 1 – Quell-Code:
+    ---
+    package com.example.demo;
 
-    url = f"{endpoint}/openai/deployments/{deployment}/chat/completions?api-version={API_VERSION}"
+    import org.springframework.stereotype.Controller;
+    import org.springframework.ui.Model;
+    import org.springframework.web.bind.annotation.GetMapping;
+    import org.springframework.web.bind.annotation.RequestParam;
 
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": api_key,
+    @Controller
+    public class GreetingController {
+        @GetMapping("/greeting")
+        public String greeting(@RequestParam(defaultValue = "World") String name, Model model) {
+            if (name.isBlank()) {
+                throw new IllegalArgumentException("name must not be blank");
+            }
+            model.addAttribute("name", name);
+            return "greeting";
+        }
     }
+    ---
+    Beispiel 1 – Testklasse:
+    ---
+    package com.example.demo;
+
+    import org.junit.jupiter.api.BeforeEach;
+    import org.junit.jupiter.api.Test;
+    import org.springframework.ui.ExtendedModelMap;
+    import org.springframework.ui.Model;
+
+    import static org.junit.jupiter.api.Assertions.*;
+
+    class GreetingControllerTest {
+
+        private GreetingController controller;
+
+        @BeforeEach
+        void setUp() {
+            controller = new GreetingController();
+        }
 
-    system_prompt = (
-        "You are a senior Java developer and test engineer. "
-        "Generate high-quality, compilable JUnit 5 test classes. "
-        "Focus on meaningful edge cases, null handling, and business rules. "
-        "Do NOT change production code; only produce test code. "
-        "Use JUnit 5 (org.junit.jupiter.api.*) and, when appropriate, Mockito. "
-        "Prefer plain unit tests without starting heavy frameworks when possible. "
-        "For Spring MVC controllers, DO NOT load a Spring context; "
-        "instantiate the controller directly and use simple Model implementations "
-        "like org.springframework.ui.ExtendedModelMap when a method expects "
-        "org.springframework.ui.Model."
-    )
-
-    body = {
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": prompt},
-        ]
-        # KEIN max_tokens, KEINE temperature -> kompatibel mit neueren Azure-Modellen
+        @Test
+        void greetingReturnsViewNameAndAddsName() {
+            Model model = new ExtendedModelMap();
+            assertEquals("greeting", controller.greeting("Alice", model));
+            assertEquals("Alice", model.getAttribute("name"));
+        }
+
+        @Test
+        void greetingRejectsBlankName() {
+            Model model = new ExtendedModelMap();
+            assertThrows(IllegalArgumentException.class, () -> controller.greeting("  ", model));
+        }
     }
+    ---
 
-    resp = requests.post(url, headers=headers, data=json.dumps(body), timeout=90)
-    if resp.status_code >= 400:
-        raise RuntimeError(f"Azure OpenAI Fehler {resp.status_code}: {resp.text}")
-    data = resp.json()
-    return data["choices"][0]["message"]["content"]
+    Beispiel 2 – Quell-Code:
+    ---
+    package com.example.demo;
 
+    import org.springframework.web.bind.annotation.GetMapping;
+    import org.springframework.web.bind.annotation.RequestParam;
+    import org.springframework.web.bind.annotation.RestController;
+    import java.util.Map;
 
-def strip_code_fences(text: str) -> str:
-    """
-    Entfernt ```java ...``` oder ``` ...``` Codeblöcke, falls vorhanden,
-    und gibt nur den reinen Java-Code zurück.
-    """
-    match = re.search(r"```(?:java)?\s*(.*?)```", text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    return text.strip()
+    @RestController
+    public class StatusRestController {
+        @GetMapping("/api/status")
+        public Map<String, Object> status(@RequestParam(value = "verbose", defaultValue = "false") boolean verbose) {
+            return verbose ? Map.of("status", "UP", "checks", 3) : Map.of("status", "UP");
+        }
+    }
+    ---
+    Beispiel 2 – Testklasse:
+    ---
+    package com.example.demo;
+
+    import org.junit.jupiter.api.Test;
+    import java.util.Map;
+
+    import static org.junit.jupiter.api.Assertions.*;
+
+    class StatusRestControllerTest {
+
+        private final StatusRestController controller = new StatusRestController();
+
+        @Test
+        void statusReturnsUpWithoutDetails() {
+            Map<String, Object> result = controller.status(false);
+            assertEquals("UP", result.get("status"));
+            assertFalse(result.containsKey("checks"));
+        }
+
+        @Test
+        void verboseStatusContainsChecks() {
+            Map<String, Object> result = controller.status(true);
+            assertEquals("UP", result.get("status"));
+            assertEquals(3, result.get("checks"));
+        }
+    }
+    ---
+
+    Jetzt die zu testende Klasse.
+    """)
+
+TEST_PROMPT_TEMPLATE = textwrap.dedent("""
+    Quell-Datei (Pfad): {source_file}
+    Quell-Code:
+    ---
+    {java_source}
+    ---
+    """)
+
+# Sammelanfrage: gleicher Präfix, danach mehrere Klassen mit je einem Abschnitts-Schlüssel
+PACK_PROMPT_TEMPLATE = textwrap.dedent("""
+    Abweichend davon folgen hier MEHRERE Klassen ({count}). Erzeuge für JEDE Klasse
+    eine eigene, vollständige Testklasse.
+
+    Antwortformat: für jede Klasse genau ein Abschnitt, kein Text dazwischen:
+    ===== BEGIN <Abschnitt> =====
+    <Java-Code der Testklasse>
+    ===== END <Abschnitt> =====
+
+    Abschnitte: {keys}
+    """)
+
+PACK_CLASS_TEMPLATE = "\nAbschnitt: {key}" + TEST_PROMPT_TEMPLATE
+
+PACK_SECTION_RE = re.compile(r"^=+ ?BEGIN (\S+) ?=+[ \t]*\n(.*?)^=+ ?END \1 ?=+[ \t]*$", re.MULTILINE | re.DOTALL)
+
+REPAIR_PROMPT_PREFIX = textwrap.dedent("""
+    Die JUnit-5-Testklasse am Ende dieser Nachricht ist fehlerhaft.
+    Korrigiere sie so, dass sie kompiliert und die Tests bestehen.
+
+    Vorgaben:
+    - Behebe genau die gemeldeten Fehler; behalte funktionierende Tests bei.
+    - Entferne Tests, deren Erwartung sich ohne den Produktionscode nicht klären lässt,
+      statt sie zu raten.
+    - Verändere NICHT den Produktionscode; gib nur Testcode zurück.
+    - Behalte package-Deklaration und Klassennamen bei.
+    - Gib NUR den vollständigen, korrigierten Java-Code der Testklasse zurück (keine Erklärungen).
+    """)
+
+REPAIR_PROMPT_TEMPLATE = textwrap.dedent("""
+    Fehlerart: {stage}
+
+    Meldungen:
+    ---
+    {diagnostics}
+    ---
+
+    Testklasse ({test_file}):
+    ---
+    {test_code}
+    ---
+    """)
+
+# Name + Hash des Templates landen im Manifest. Ändert sich das Template (oder der
+# System-Prompt), werden genau die Einträge neu erzeugt, die dieses Template nutzen.
+TEST_PROMPT_TEMPLATE_NAME = "junit-class"
+TEST_PROMPT_TEMPLATE_SHA256 = sha256_text(SYSTEM_PROMPT + "\n" + TEST_PROMPT_PREFIX + TEST_PROMPT_TEMPLATE)
+
+
+# ---------------------------------------------------------
+# Azure OpenAI Aufruf
+# ---------------------------------------------------------
+def call_azure_openai(
+    prompt: str,
+    label: str = "",
+    partial_path: Optional[pathlib.Path] = None,
+    deployment: Optional[str] = None,
+    valid: Optional[Callable[[str], bool]] = None,
+) -> str:
+    return common.azure_chat(
+        prompt,
+        SYSTEM_PROMPT,
+        API_VERSION,
+        label,
+        90,
+        check=early_test_rejection,
+        partial_path=partial_path,
+        deployment=deployment,
+        valid=valid,
+    )
+
+
+def early_test_rejection(text: str, window_reached: bool) -> Optional[str]:
+    """Streaming-Prüfung: nach --stream-check-tokens Tokens muss Java-Testcode erkennbar sein."""
+    if not window_reached:
+        return None
+    if re.search(r"^\s*(?:package|import)\s+[\w.*]+\s*;", text, re.MULTILINE):
+        return None
+    if re.search(r"\bclass\s+\w+\s*\{|@Test\b", text):
+        return None
+    return f"kein Java-Code in den ersten {llm_stream.get_streamer().check_tokens} Tokens"
 
 
 # ---------------------------------------------------------
 # Testgenerierung für eine Datei
 # ---------------------------------------------------------
-def generate_test_for_file(
+@dataclass
+class TestJob:
+    """Ein vorbereiteter Generierungsauftrag für genau eine Quelldatei."""
+
+    source_file: pathlib.Path
+    target_path: pathlib.Path
+    package_name: Optional[str]
+    prompt: str
+    manifest_key: str = ""
+    source_sha256: str = ""
+    manifest: Optional[GenerationManifest] = None
+    # Inhalt der Testdatei vor diesem Lauf (None = neu), für --verify-on-failure revert
+    previous_code: Optional[str] = None
+    # Größe des Quelltexts in Tokens (entscheidet, ob die Klasse gepackt wird)
+    source_tokens: int = 0
+    # Modell-Stufe (model_router.py); nach einer Eskalation die tatsächlich genutzte
+    route: Optional[model_router.Route] = None
+    # Cache-Schlüssel der Antworten, aus denen der geschriebene Test stammt
+    cache_keys: List[str] = field(default_factory=list)
+
+    @property
+    def test_class_name(self) -> str:
+        name = self.target_path.stem
+        return f"{self.package_name}.{name}" if self.package_name else name
+
+
+# Schützt Schreibzugriffe, falls zwei Jobs (theoretisch) dasselbe Ziel haben.
+_WRITE_LOCK = threading.Lock()
+# In diesem Lauf geschriebene Tests (für --verify)
+_GENERATED: List[TestJob] = []
+# Mit --shard: die diesem Shard zugeteilten Quelldateien (für das Teilergebnis)
+_ASSIGNED: List[pathlib.Path] = []
+
+
+def build_test_prompt(source_file: pathlib.Path, java_source: str) -> str:
+    return TEST_PROMPT_PREFIX + TEST_PROMPT_TEMPLATE.format(source_file=source_file, java_source=java_source)
+
+
+def prepare_test_job(
     source_file: pathlib.Path,
     source_dir: pathlib.Path,
-    test_dir: pathlib.Path
-) -> None:
-    java_source = read_file(source_file)
+    test_dir: pathlib.Path,
+    manifest: Optional[GenerationManifest] = None,
+    force: bool = False,
+) -> Optional[TestJob]:
+    """
+    Liest die Quelldatei, prüft, ob Tests erzeugt werden sollen, und baut den Prompt.
+    Gibt None zurück, wenn die Datei übersprungen wird – auch dann, wenn laut
+    Manifest Quelle, Template und Deployment seit dem letzten Lauf unverändert sind.
+    """
+    tel = telemetry.get_telemetry()
+    with tel.phase("scan", source_file.name):
+        java_source = read_file(source_file)
+        record = java_index.get_index().get(source_file, java_source) if java_source.strip() else None
     if not java_source.strip():
         print(f"[WARN] Leere Datei oder nicht lesbar: {source_file}")
-        return
+        return None
 
-    package_name, class_name = extract_package_and_class(java_source)
-    if not class_name:
+    primary = record.primary_class if record is not None else None
+    if primary is None:
         print(f"[WARN] Keine Klasse in {source_file} erkannt, überspringe.")
-        return
+        return None
+    package_name, class_name = record.package or None, primary.name
 
     # Bootstrap-Klassen (z. B. Hackathon2025Application) überspringen
-    if is_bootstrap_class(java_source, class_name):
+    if record.is_bootstrap:
         print(f"[INFO] Bootstrap-Klasse erkannt ({class_name}), keine Tests generiert.")
-        return
+        return None
 
     # Pfad relativ zum source_dir abbilden
     rel = source_file.relative_to(source_dir)
     test_rel = rel.with_name(f"{class_name}Test.java")
-    target_path = test_dir / test_rel
-    target_path.parent.mkdir(parents=True, exist_ok=True)
 
-    prompt = textwrap.dedent(f"""
-    Hier ist eine Java-Klasse aus einem Spring Boot / Java-Projekt.
-    Erzeuge eine passende JUnit-5-Testklasse. Anforderungen:
+    manifest_key = rel.as_posix()
+    source_sha256 = sha256_text(java_source)
+    source_tokens = context_packer.count_tokens(java_source)
+    router = model_router.get_router()
+    route = router.route(model_router.RouteInput.from_record(source_tokens, record), source_file.name, record=False)
+    # Ein Test einer höheren Stufe (z.B. nach Eskalation) bleibt gültig
+    if manifest is not None and not force and manifest.is_fresh(
+        manifest_key,
+        source_sha256,
+        TEST_PROMPT_TEMPLATE_NAME,
+        TEST_PROMPT_TEMPLATE_SHA256,
+        router.accepted_deployments(route),
+    ):
+        if manifest.output_changed(manifest_key):
+            print(f"[INFO] Unverändert seit letzter Generierung, Test manuell angepasst – bleibt erhalten: {source_file}")
+        else:
+            print(f"[INFO] Unverändert seit letzter Generierung, überspringe: {source_file}")
+        return None
 
-    Allgemein:
-    - Nutze JUnit 5 (`org.junit.jupiter.api.*`).
-    - Erzeuge sinnvolle Testmethoden für öffentliche Methoden:
-      - Normalfall
-      - Edge Cases
-      - Fehlerfälle, soweit ersichtlich.
-    - Verwende nach Bedarf Mockito (`org.mockito.*`) zum Mocking.
-    - Stelle sicher, dass der Testcode kompilierbar ist und typische Importe enthält.
-    - Verändere NICHT den Produktionscode; erzeuge nur Testcode.
+    with tel.phase("prompt", source_file.name):
+        prompt = build_test_prompt(source_file, java_source)
+    return TestJob(
+        source_file=source_file,
+        target_path=test_dir / test_rel,
+        package_name=package_name,
+        prompt=prompt,
+        manifest_key=manifest_key,
+        source_sha256=source_sha256,
+        manifest=manifest,
+        source_tokens=source_tokens,
+        route=route,
+    )
 
-    Speziell für Spring MVC Controller:
-    - Falls Methoden ein Argument vom Typ `org.springframework.ui.Model` haben:
-      - verwende im Test `Model model = new org.springframework.ui.ExtendedModelMap();`
-      - rufe die Methode direkt auf, z.B.:
-          `String viewName = controller.index(model);`
-    - Verwende NICHT `ModelMap`, wenn die Methode `Model` erwartet.
-    - Starte keinen Spring ApplicationContext im Test,
-      verwende KEINE Annotationen wie `@SpringBootTest`, `@WebMvcTest` oder `@ExtendWith(SpringExtension.class)`,
-      außer es ist absolut notwendig (bitte eher vermeiden).
-    - Instanziere den Controller direkt mit `new <ClassName>()` oder mit einfachen Konstruktor-Parametern.
 
-    Package / Struktur:
-    - Nutze die gleiche package-Deklaration wie die Quellklasse.
-    - Die Testklasse soll unter dem entsprechenden Pfad in src/test/java liegen
-      (das übernimmt das Skript bereits durch den Pfad).
+def _deployment(route: Optional[model_router.Route]) -> str:
+    return (route.deployment if route is not None else "") or os.environ.get("AZURE_OPENAI_DEPLOYMENT", "")
 
-    Quell-Datei (Pfad): {source_file}
-    Quell-Code:
-    ---
-    {java_source}
-    ---
-    Gib NUR den Java-Code der Testklasse zurück (keine Erklärungen, keine Kommentare außerhalb von Java).
-    """)
 
+def _answered_by(route: Optional[model_router.Route]) -> str:
+    """Deployment, das die letzte Antwort in diesem Thread geliefert hat (mit --hedge ggf. das Duplikat)."""
+    return ai_cache.get_cache().last_deployment() or _deployment(route)
+
+
+def run_test_job(job: TestJob, route: Optional[model_router.Route] = None) -> str:
+    """
+    Ruft Azure OpenAI für einen Job auf, schreibt den Test und liefert die Ergebniszeile.
+    Ist die Antwort kein brauchbarer Test, wird (falls vorhanden) die nächstgrößere
+    Modell-Stufe gefragt. route überschreibt die Stufe des Jobs (der Aufrufer hat
+    die Entscheidung dann schon protokolliert, z.B. als Eskalation).
+    """
+    router = model_router.get_router()
+    label = job.source_file.name
+    if route is None and job.route is not None:
+        router.record(job.route, label)
+    route = route or job.route
+    while True:
+        completion = call_azure_openai(
+            job.prompt,
+            label=label,
+            partial_path=job.target_path.with_name(job.target_path.name + ".partial"),
+            deployment=route.deployment if route is not None else None,
+            valid=lambda text: validate_test_section(job, text) is None,
+        )
+        job.cache_keys.append(ai_cache.get_cache().last_key())
+        problem = validate_test_section(job, completion)
+        higher = router.escalate(route, problem, label) if problem is not None and route is not None else None
+        if higher is None:
+            break
+        route = higher
+    job.route = route
+    return write_generated_test(job, completion, _answered_by(route))
+
+
+def write_generated_test(job: TestJob, completion: str, deployment: str) -> str:
+    """Schreibt die Modellantwort als Testklasse (inkl. package-Korrektur) und trägt sie ins Manifest ein."""
+    tel = telemetry.get_telemetry()
+    with tel.phase("postprocess", job.source_file.name):
+        test_code = strip_code_fences(completion)
+
+        # Sicherstellen, dass package-Deklaration vorhanden ist
+        if job.package_name and f"package {job.package_name}" not in test_code:
+            test_code = f"package {job.package_name};\n\n{test_code}"
+
+    with tel.phase("write", job.source_file.name):
+        with _WRITE_LOCK:
+            if job not in _GENERATED:
+                job.previous_code = job.target_path.read_text(encoding="utf-8") if job.target_path.exists() else None
+                _GENERATED.append(job)
+            write_text_atomic(job.target_path, test_code)
+        if job.manifest is not None:
+            job.manifest.record(
+                job.manifest_key,
+                job.source_sha256,
+                TEST_PROMPT_TEMPLATE_NAME,
+                TEST_PROMPT_TEMPLATE_SHA256,
+                deployment,
+                job.target_path,
+                test_code,
+            )
+    return f"[OK] Test geschrieben: {job.target_path}"
+
+
+def generate_test_for_file(
+    source_file: pathlib.Path,
+    source_dir: pathlib.Path,
+    test_dir: pathlib.Path,
+    manifest: Optional[GenerationManifest] = None,
+    force: bool = False,
+) -> None:
+    job = prepare_test_job(source_file, source_dir, test_dir, manifest, force)
+    if job is None:
+        return
     print(f"[INFO] Rufe Azure OpenAI für Tests zu {source_file} auf...")
-    completion = call_azure_openai(prompt)
-    test_code = strip_code_fences(completion)
+    print(run_test_job(job))
+
+
+@dataclass
+class PackedJob:
+    """Sammelanfrage für mehrere kleine Klassen; Schlüssel der Abschnitte = manifest_key."""
+
+    jobs: List[TestJob]
+    prompt: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.jobs[0].source_file.name} (+{len(self.jobs) - 1})"
+
+
+def build_packed_prompt(jobs: Sequence[TestJob], sources: Dict[str, str]) -> str:
+    keys = [job.manifest_key for job in jobs]
+    parts = [TEST_PROMPT_PREFIX, PACK_PROMPT_TEMPLATE.format(count=len(jobs), keys=", ".join(keys))]
+    for job in jobs:
+        parts.append(PACK_CLASS_TEMPLATE.format(key=job.manifest_key, source_file=job.source_file, java_source=sources[job.manifest_key]))
+    return "".join(parts)
+
+
+def pack_jobs(jobs: List[TestJob], budget: int, max_classes: int) -> Tuple[List[PackedJob], List[TestJob]]:
+    """
+    Fasst kleine Klassen (höchstens budget/4 Tokens) nach Pfad sortiert zu Gruppen mit
+    zusammen höchstens budget Tokens und max_classes Klassen zusammen. Die Gruppierung
+    ist deterministisch, damit Sammelanfragen im Antwort-Cache wiedergefunden werden.
+    Rückgabe: Sammelanfragen und die weiterhin einzeln zu erzeugenden Jobs.
+    """
+    if budget <= 0 or max_classes < 2:
+        return [], list(jobs)
+    limit = budget // 4
+    singles = [job for job in jobs if job.source_tokens > limit]
+    small = sorted((job for job in jobs if job.source_tokens <= limit), key=lambda j: j.manifest_key)
+
+    groups: List[List[TestJob]] = []
+    tokens = 0
+    for job in small:
+        if not groups or tokens + job.source_tokens > budget or len(groups[-1]) >= max_classes:
+            groups.append([])
+            tokens = 0
+        groups[-1].append(job)
+        tokens += job.source_tokens
+
+    packed: List[PackedJob] = []
+    for group in groups:
+        if len(group) == 1:
+            singles.append(group[0])
+            continue
+        sources = {job.manifest_key: read_file(job.source_file) for job in group}
+        packed.append(PackedJob(group, build_packed_prompt(group, sources)))
+    return packed, singles
+
+
+def split_packed_reply(completion: str) -> Dict[str, str]:
+    """Abschnitte der Sammelantwort je Schlüssel; Abschnitte ohne END-Marker fehlen."""
+    return {m.group(1): m.group(2) for m in PACK_SECTION_RE.finditer(completion)}
+
+
+def validate_test_section(job: TestJob, code: str) -> Optional[str]:
+    """Grobe Prüfung eines Abschnitts; liefert den Grund, falls er unbrauchbar ist."""
+    code = strip_code_fences(code)
+    if not code:
+        return "Abschnitt leer"
+    if not re.search(rf"\bclass\s+{re.escape(job.target_path.stem)}\b", code):
+        return f"keine Klasse {job.target_path.stem}"
+    if "@Test" not in code:
+        return "keine @Test-Methode"
+    if code.count("{") != code.count("}"):
+        return "unvollständig (Klammern passen nicht)"
+    return None
+
+
+def run_packed_job(packed: PackedJob) -> Dict[pathlib.Path, str]:
+    """
+    Eine Sammelanfrage: Antwort in Abschnitte zerlegen, jeden Abschnitt prüfen und
+    schreiben; nur fehlende/kaputte Klassen werden einzeln nachgefordert – auf der
+    nächsthöheren Modell-Stufe, falls es eine gibt.
+    """
+    router = model_router.get_router()
+    route = packed_route(packed)
+    if route is not None:
+        router.record(route, packed.label)
+    deployment = _deployment(route)
+
+    def _complete(completion: str) -> bool:
+        sections = split_packed_reply(completion)
+        return all(
+            job.manifest_key in sections and validate_test_section(job, sections[job.manifest_key]) is None
+            for job in packed.jobs
+        )
+
+    try:
+        sections = split_packed_reply(
+            call_azure_openai(
+                packed.prompt,
+                label=packed.label,
+                deployment=route.deployment if route is not None else None,
+                valid=_complete,
+            )
+        )
+        deployment = _answered_by(route)
+    except Exception as e:
+        print(f"[WARN] Sammelanfrage {packed.label} fehlgeschlagen ({e}), erzeuge die Klassen einzeln.")
+        sections = {}
+
+    results: Dict[pathlib.Path, str] = {}
+    retry: List[TestJob] = []
+    for job in packed.jobs:
+        code = sections.get(job.manifest_key)
+        problem = "Abschnitt fehlt" if code is None else validate_test_section(job, code)
+        if problem is not None:
+            if sections:
+                print(f"[WARN] {job.source_file.name}: {problem} – wird einzeln nachgefordert.")
+            retry.append(job)
+            continue
+        job.cache_keys.append(ai_cache.get_cache().last_key())
+        results[job.source_file] = write_generated_test(job, code, deployment)
+
+    for job in retry:
+        single = None
+        if route is not None:
+            single = router.escalate(route, "Abschnitt unbrauchbar", job.source_file.name) or route
+        try:
+            results[job.source_file] = run_test_job(job, single)
+        except Exception as e:
+            results[job.source_file] = f"[ERROR] Fehler beim Generieren von Tests für {job.source_file}: {e}"
+    return results
 
-    # Sicherstellen, dass package-Deklaration vorhanden ist
-    if package_name and f"package {package_name}" not in test_code:
-        test_code = f"package {package_name};\n\n{test_code}"
 
-    target_path.write_text(test_code, encoding="utf-8")
-    print(f"[OK] Test geschrieben: {target_path}")
+def packed_route(packed: PackedJob) -> Optional[model_router.Route]:
+    """Die stärkste Stufe der enthaltenen Klassen (None ohne Routing-Information)."""
+    routes = [job.route for job in packed.jobs if job.route is not None]
+    return model_router.get_router().highest(routes) if routes else None
+
+
+def run_jobs_parallel(jobs: List[TestJob], max_workers: int, packed: Sequence[PackedJob] = ()) -> None:
+    """
+    Führt die Jobs und Sammelanfragen in einem Thread-Pool aus (höchstens max_workers
+    Aufrufe gleichzeitig).
+
+    - Längste Prompts zuerst (verkürzt die Gesamtlaufzeit, da der "Nachzügler"
+      nicht erst am Ende gestartet wird).
+    - Die Ergebnisse werden gesammelt und anschließend in stabiler Reihenfolge
+      (sortiert nach Quelldatei) ausgegeben.
+    """
+    work: List[Union[TestJob, PackedJob]] = [*packed, *jobs]
+    ordered = sorted(work, key=lambda w: (-len(w.prompt), str(_work_jobs(w)[0].source_file)))
+    results = {}
+
+    detail = f" (davon {len(packed)} Sammelanfrage(n) für {sum(len(p.jobs) for p in packed)} Klassen)" if packed else ""
+    print(f"[INFO] Starte {len(ordered)} Azure-OpenAI-Aufrufe{detail} mit bis zu {max_workers} parallelen Workern...")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run_work_item, w): w for w in ordered}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                results.update(work_results(item, future.result()))
+            except Exception as e:
+                results.update(work_results(item, error=e))
+
+    for source_file in sorted(results):
+        print(results[source_file])
+
+
+def _work_jobs(item: Union[TestJob, PackedJob]) -> List[TestJob]:
+    return item.jobs if isinstance(item, PackedJob) else [item]
+
+
+def run_work_item(item: Union[TestJob, PackedJob]):
+    return run_packed_job(item) if isinstance(item, PackedJob) else run_test_job(item)
+
+
+def work_results(
+    item: Union[TestJob, PackedJob],
+    result=None,
+    error: Optional[BaseException] = None,
+) -> Dict[pathlib.Path, str]:
+    """Ergebniszeile je Quelldatei für einen Job bzw. eine Sammelanfrage (auch im Fehlerfall)."""
+    if error is not None:
+        return {
+            job.source_file: f"[ERROR] Fehler beim Generieren von Tests für {job.source_file}: {error}"
+            for job in _work_jobs(item)
+        }
+    return dict(result) if isinstance(item, PackedJob) else {item.source_file: result}
+
+
+def run_jobs_batch(jobs: List[TestJob], args: argparse.Namespace) -> None:
+    """
+    Reicht alle Jobs als einen Batch-Job ein (custom_id = Pfad der Quelldatei relativ
+    zu --source-dir) und verteilt die Ergebnisse danach auf die Testdateien.
+    Prompts, deren Antwort schon im Cache liegt, werden nicht eingereicht. Antworten
+    ohne brauchbaren Test (validate_test_section) werden wie Batch-Fehler behandelt:
+    nicht gecacht, nicht geschrieben, nicht ins Manifest. Im Manifest steht die Default-Stufe, für die der Batch einspringt – sonst
+    gälten die Tests beim nächsten Lauf (mit oder ohne --batch) nie als aktuell.
+    """
+    endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT", "").rstrip("/")
+    deployment = args.batch_deployment or os.environ.get("AZURE_OPENAI_DEPLOYMENT", "")
+    recorded = os.environ.get("AZURE_OPENAI_DEPLOYMENT", "") or deployment
+    cache = ai_cache.get_cache()
+
+    pending: List[TestJob] = []
+    for job in jobs:
+        key = ai_cache.make_cache_key(endpoint, deployment, API_VERSION, SYSTEM_PROMPT, job.prompt)
+        cached = cache.get(key)
+        if cached is not None and validate_test_section(job, cached) is None:
+            job.cache_keys.append(key)
+            print(write_generated_test(job, cached, recorded))
+        else:
+            if cached is not None:
+                cache.delete(key)  # früher gespeicherte, unbrauchbare Antwort
+            pending.append(job)
+    if not pending:
+        print("[INFO] Alle Antworten lagen bereits im Cache – kein Batch nötig.")
+        return
+
+    requests_file = pathlib.Path(args.batch_file).resolve()
+    input_sha256 = batch_backend.write_requests_file(
+        requests_file,
+        [batch_backend.BatchRequest(job.manifest_key, SYSTEM_PROMPT, job.prompt) for job in pending],
+        deployment,
+    )
+    print(f"[INFO] {len(pending)} Prompt(s) für Deployment {deployment} nach {requests_file} geschrieben.")
+
+    with telemetry.get_telemetry().phase("network", "batch"):
+        results = batch_backend.run_batch(
+            batch_backend.backend_from_args(args),
+            requests_file,
+            input_sha256,
+            poll_interval=args.batch_poll_interval,
+            timeout_hours=args.batch_timeout_hours,
+        )
+
+    for job in sorted(pending, key=lambda j: str(j.source_file)):
+        result = results.get(job.manifest_key)
+        if result is None:
+            print(f"[ERROR] Keine Batch-Antwort für {job.source_file}")
+            continue
+        if result.error is not None:
+            print(f"[ERROR] Batch-Fehler für {job.source_file}: {result.error}")
+            continue
+        problem = validate_test_section(job, result.content)
+        if problem is not None:
+            print(f"[ERROR] Batch-Antwort für {job.source_file} unbrauchbar: {problem}")
+            continue
+        key = ai_cache.make_cache_key(endpoint, deployment, API_VERSION, SYSTEM_PROMPT, job.prompt)
+        cache.put(key, result.content, meta={"deployment": deployment, "api_version": API_VERSION, "batch": True})
+        job.cache_keys.append(key)
+        try:
+            print(write_generated_test(job, result.content, recorded))
+        except Exception as e:
+            print(f"[ERROR] Fehler beim Schreiben des Tests für {job.source_file}: {e}")
+
+
+def revert_test(job: TestJob) -> None:
+    """Stellt den Stand vor diesem Lauf wieder her und vergisst Manifest-Eintrag und Antworten."""
+    forget_replies(job)
+    with _WRITE_LOCK:
+        if job.previous_code is None:
+            job.target_path.unlink(missing_ok=True)
+        else:
+            write_text_atomic(job.target_path, job.previous_code)
+    if job.manifest is not None:
+        job.manifest.remove(job.manifest_key)
+
+
+def forget_replies(job: TestJob) -> None:
+    """Entfernt die Antworten eines fehlerhaften Tests aus dem Cache (sonst kämen sie beim nächsten Lauf wieder)."""
+    cache = ai_cache.get_cache()
+    for key in job.cache_keys:
+        cache.delete(key)
+    job.cache_keys.clear()
+
+
+def repair_test(job: TestJob, outcome: test_verify.VerifyOutcome) -> str:
+    """Schickt nur den fehlerhaften Test und seine Meldungen ans Modell und schreibt die Korrektur."""
+    stage = "Compilerfehler" if outcome.stage == "compile" else "fehlschlagende Tests"
+    prompt = REPAIR_PROMPT_PREFIX + REPAIR_PROMPT_TEMPLATE.format(
+        stage=stage,
+        diagnostics=outcome.diagnostics,
+        test_file=job.target_path.name,
+        test_code=job.target_path.read_text(encoding="utf-8"),
+    )
+    label = f"{job.target_path.name} (Reparatur)"
+    # Hat die bisherige Stufe einen fehlerhaften Test geliefert, repariert die nächsthöhere
+    route = job.route
+    if route is not None:
+        route = model_router.get_router().escalate(route, stage, label) or route
+        job.route = route
+    completion = call_azure_openai(
+        prompt,
+        label=label,
+        partial_path=job.target_path.with_name(job.target_path.name + ".partial"),
+        deployment=route.deployment if route is not None else None,
+        valid=lambda text: validate_test_section(job, text) is None,
+    )
+    job.cache_keys.append(ai_cache.get_cache().last_key())
+    return write_generated_test(job, completion, _answered_by(route))
+
+
+def repair_failed_tests(
+    jobs: dict,
+    outcomes: List[test_verify.VerifyOutcome],
+    verifier: test_verify.TestVerifier,
+    rounds: int,
+    max_workers: int,
+) -> Tuple[List[test_verify.VerifyOutcome], Optional[str]]:
+    """
+    Reparaturschleife: fehlerhafte Tests werden parallel korrigiert und danach nur diese
+    erneut geprüft – höchstens rounds Runden. Liefert die aktualisierten Ergebnisse und,
+    falls eine erneute Prüfung nicht lief (javac/mvn-Timeout o.ä.), den Grund; die
+    Tests dieser Runde gelten dann weiter als fehlerhaft.
+    """
+    error: Optional[str] = None
+    by_path = {o.path.resolve(): o for o in outcomes}
+    for round_no in range(1, rounds + 1):
+        failing = [o for o in by_path.values() if not o.ok]
+        if not failing:
+            break
+        print(f"[INFO] Reparaturrunde {round_no}/{rounds}: {len(failing)} Test(s) ...")
+        for outcome in failing:
+            forget_replies(jobs[outcome.path.resolve()])
+        repaired: List[test_verify.VerifyTarget] = []
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = {pool.submit(repair_test, jobs[o.path.resolve()], o): o for o in failing}
+            for future in as_completed(futures):
+                outcome = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"[WARN] Reparatur von {outcome.path.name} fehlgeschlagen: {e}")
+                    continue
+                repaired.append(test_verify.VerifyTarget(outcome.path, outcome.class_name))
+        if not repaired:
+            break
+        try:
+            with telemetry.get_telemetry().phase("verify", f"Reparaturrunde {round_no}"):
+                for outcome in verifier.verify(repaired):
+                    by_path[outcome.path.resolve()] = outcome
+        except RuntimeError as e:
+            error = str(e)
+            print(f"[WARN] Reparaturrunde {round_no}: Verifikation nicht möglich ({e}), breche Reparatur ab.")
+            break
+        fixed = sum(1 for t in repaired if by_path[t.path.resolve()].ok)
+        print(f"[INFO] Reparaturrunde {round_no}: {fixed} von {len(repaired)} Test(s) behoben.")
+    return sorted(by_path.values(), key=lambda o: str(o.path)), error
+
+
+def verify_generated_tests(args: argparse.Namespace, test_dir: pathlib.Path) -> int:
+    """
+    Übersetzt und startet nur die in diesem Lauf geschriebenen Tests, repariert
+    fehlerhafte (--repair-rounds) und meldet bzw. verwirft den Rest.
+    Gibt die Anzahl fehlerhafter Tests zurück, die NICHT zurückgenommen wurden.
+    Lässt sich nicht (fertig) verifizieren, endet der Lauf mit SystemExit – nach
+    Meldung bzw. Rücknahme der bis dahin fehlerhaften Tests.
+    """
+    jobs = {job.target_path.resolve(): job for job in _GENERATED}
+    if not jobs:
+        print("[INFO] Verifikation: keine neu geschriebenen Tests.")
+        return 0
+
+    print(f"[INFO] Verifikation von {len(jobs)} Test(s) ...")
+    verifier = test_verify.verifier_from_args(args, test_dir)
+    targets = [test_verify.VerifyTarget(path, job.test_class_name) for path, job in jobs.items()]
+    try:
+        with telemetry.get_telemetry().phase("verify"):
+            outcomes = verifier.verify(targets)
+    except RuntimeError as e:
+        raise SystemExit(f"Verifikation nicht möglich: {e}")
+    error: Optional[str] = None
+    if args.repair_rounds > 0:
+        outcomes, error = repair_failed_tests(jobs, outcomes, verifier, args.repair_rounds, args.jobs)
+
+    remaining = 0
+    for outcome in outcomes:
+        if outcome.ok:
+            print(f"[OK] Verifiziert: {outcome.path}")
+            continue
+        stage = "übersetzt nicht" if outcome.stage == "compile" else "Tests schlagen fehl"
+        print(f"[ERROR] {outcome.class_name} {stage}:\n{textwrap.indent(outcome.diagnostics, '    ')}")
+        forget_replies(jobs[outcome.path.resolve()])
+        if args.verify_on_failure == "revert":
+            revert_test(jobs[outcome.path.resolve()])
+            print(f"[WARN] Zurückgenommen: {outcome.path}")
+        else:
+            remaining += 1
+
+    ok = sum(1 for o in outcomes if o.ok)
+    print(f"[INFO] Verifikation: {ok} ok, {len(outcomes) - ok} fehlerhaft.")
+    if error is not None:
+        raise SystemExit(f"Verifikation nach Reparatur nicht möglich: {error}")
+    return remaining
 
 
 # ---------------------------------------------------------
@@ -219,7 +949,86 @@ def main() -> None:
         required=True,
         help="Pfad zu src/test/java",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Maximale Anzahl paralleler Azure-OpenAI-Aufrufe (Default: 1 = sequentiell)",
+    )
+    parser.add_argument(
+        "--pack-tokens",
+        type=int,
+        default=DEFAULT_PACK_TOKENS,
+        help=(
+            "Kleine Klassen (bis 1/4 davon) zu Sammelanfragen mit höchstens so vielen Tokens "
+            f"Quelltext packen (Default: {DEFAULT_PACK_TOKENS}, 0 = aus)"
+        ),
+    )
+    parser.add_argument(
+        "--pack-max-classes",
+        type=int,
+        default=DEFAULT_PACK_MAX_CLASSES,
+        help=f"Höchstens so viele Klassen pro Sammelanfrage (Default: {DEFAULT_PACK_MAX_CLASSES})",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Nur anzeigen, welche Tests erzeugt würden (keine Modellaufrufe, nichts wird geschrieben)",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=None,
+        help=f"Pfad zum Generierungs-Manifest (Default: <test-dir>/{DEFAULT_MANIFEST_NAME})",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Manifest ignorieren und alle Tests neu erzeugen",
+    )
+    parser.add_argument(
+        "--since",
+        default=None,
+        metavar="REF",
+        help="Nur Dateien verarbeiten, die seit merge-base(REF, HEAD) geändert wurden (z.B. origin/main)",
+    )
+    parser.add_argument(
+        "--delete-orphans",
+        action="store_true",
+        help="Mit --since: generierte Tests gelöschter Klassen entfernen",
+    )
+    parser.add_argument(
+        "--repair-rounds",
+        type=int,
+        default=DEFAULT_REPAIR_ROUNDS,
+        help=f"Mit --verify: fehlerhafte Tests so oft mit den Meldungen korrigieren lassen (Default: {DEFAULT_REPAIR_ROUNDS}, 0 = aus)",
+    )
+    batch_backend.add_batch_arguments(parser)
+    sharding.add_shard_arguments(parser)
+    test_verify.add_verify_arguments(parser)
+    ai_cache.add_cache_arguments(parser)
+    java_index.add_index_arguments(parser)
+    llm_transport.add_transport_arguments(parser)
+    llm_stream.add_stream_arguments(parser)
+    rate_limit.add_rate_limit_arguments(parser)
+    model_router.add_routing_arguments(parser)
+    llm_hedge.add_hedge_arguments(parser)
+    telemetry.add_telemetry_arguments(parser)
     args = parser.parse_args()
+    if args.jobs < 1:
+        raise SystemExit("--jobs muss >= 1 sein.")
+    # Jeder Worker soll eine eigene Keep-Alive-Verbindung im Pool bekommen
+    args.http_pool_size = max(args.http_pool_size, args.jobs)
+
+    telemetry.configure_from_args(args, export=not args.dry_run)
+    ai_cache.configure_from_args(args)
+    java_index.configure_from_args(args, save=not args.dry_run)
+    if args.dry_run:
+        context_packer.use_estimate()  # kein tiktoken-Import/-Download
+    llm_transport.configure_from_args(args)
+    llm_stream.configure_from_args(args)
+    rate_limit.configure_from_args(args, max_concurrency=args.jobs)
+    model_router.configure_from_args(args)
+    llm_hedge.configure_from_args(args)
 
     source_dir = pathlib.Path(args.source_dir).resolve()
     test_dir = pathlib.Path(args.test_dir).resolve()
@@ -227,22 +1036,208 @@ def main() -> None:
     if not source_dir.exists():
         raise SystemExit(f"Source-Verzeichnis existiert nicht: {source_dir}")
 
-    # Einfachheit für Hackathon: ALLE Java-Dateien unter source_dir
-    target_files: List[pathlib.Path] = sorted(source_dir.rglob("*.java"))
+    manifest_path = pathlib.Path(args.manifest).resolve() if args.manifest else test_dir / DEFAULT_MANIFEST_NAME
+    manifest = GenerationManifest.load(manifest_path)
+    if args.dry_run:
+        run_generation(args, source_dir, test_dir, manifest)
+        return
+    before = dict(manifest.entries)
+    failed = 0
+    try:
+        run_generation(args, source_dir, test_dir, manifest)
+        if args.verify:
+            failed = verify_generated_tests(args, test_dir)
+    finally:
+        manifest.save()
+        if args.shard is not None:
+            changed, removed = sharding.diff_entries(before, manifest.entries)
+            sharding.write_partial(
+                pathlib.Path(args.shard_dir),
+                "tests",
+                args.shard,
+                manifest.path,
+                MANIFEST_VERSION,
+                changed,
+                removed,
+                items=len(_ASSIGNED),
+                weight=sum(_prompt_weight(f) for f in _ASSIGNED),
+            )
+    if failed:
+        raise SystemExit(f"{failed} generierte(r) Test(s) fehlerhaft (siehe oben).")
+
+
+def select_changed_files(
+    since: str,
+    source_dir: pathlib.Path,
+    test_dir: pathlib.Path,
+    manifest: GenerationManifest,
+    delete_orphans: bool,
+    dry_run: bool = False,
+) -> List[pathlib.Path]:
+    """
+    Ermittelt die Zieldateien aus git und räumt Umbenennungen/Löschungen im Testbaum
+    auf (mit dry_run nur die Zieldateien, der Testbaum bleibt unangetastet).
+    """
+    changes = git_changes.changed_java_files(since, source_dir)
+    print(f"[INFO] {len(changes)} geänderte Java-Datei(en) seit {since}.")
+    if dry_run:
+        return git_changes.generation_targets(changes)
+
+    for change in git_changes.move_renamed_tests(changes, source_dir, test_dir):
+        manifest.remove(change.old_path.relative_to(source_dir).as_posix())
+
+    for deleted in git_changes.deleted_sources(changes):
+        try:
+            key = deleted.relative_to(source_dir).as_posix()
+        except ValueError:
+            continue
+        entry = manifest.get(key)
+        if entry is None:
+            continue
+        orphan = manifest.output_path(entry)
+        if not delete_orphans:
+            print(f"[INFO] Klasse gelöscht, generierter Test bleibt bestehen (--delete-orphans zum Entfernen): {orphan}")
+            continue
+        if orphan.exists():
+            orphan.unlink()
+            print(f"[OK] Verwaisten Test entfernt: {orphan}")
+        manifest.remove(key)
+
+    return git_changes.generation_targets(changes)
+
+
+def _prompt_weight(source_file: pathlib.Path) -> int:
+    """Geschätzte Prompt-Größe: der Quelltext geht vollständig in den Prompt ein."""
+    try:
+        return source_file.stat().st_size
+    except OSError:
+        return 0
+
+
+def shard_targets(
+    target_files: List[pathlib.Path],
+    shard: sharding.Shard,
+    source_dir: pathlib.Path,
+) -> List[pathlib.Path]:
+    """
+    Die Dateien dieses Shards. Gleichstände entscheidet der Pfad relativ zu source_dir,
+    damit Runner mit unterschiedlichem Checkout-Pfad dieselbe Aufteilung berechnen.
+    """
+    mine = sharding.partition(
+        target_files, shard, weight=_prompt_weight, key=lambda f: f.relative_to(source_dir).as_posix()
+    )
+    _ASSIGNED[:] = mine
+    weight = sum(_prompt_weight(f) for f in mine)
+    print(f"[INFO] Shard {shard.label}: {len(mine)} von {len(target_files)} Datei(en), ~{weight} Bytes Quelltext.")
+    return mine
+
+
+def prepare_test_jobs(
+    target_files: List[pathlib.Path],
+    source_dir: pathlib.Path,
+    test_dir: pathlib.Path,
+    manifest: Optional[GenerationManifest],
+    force: bool = False,
+) -> List[TestJob]:
+    """prepare_test_job() für alle Dateien; Fehler einzelner Dateien werden gemeldet und übersprungen."""
+    jobs: List[TestJob] = []
+    for f in target_files:
+        try:
+            job = prepare_test_job(f, source_dir, test_dir, manifest, force)
+        except Exception as e:
+            print(f"[ERROR] Fehler beim Vorbereiten von {f}: {e}")
+            continue
+        if job is not None:
+            jobs.append(job)
+    return jobs
+
+
+def report_dry_run(jobs: List[TestJob], args: argparse.Namespace) -> None:
+    """--dry-run: was ein echter Lauf an Modellaufrufen bräuchte, ohne sie auszuführen."""
+    endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT", "").rstrip("/")
+    cache = ai_cache.get_cache()
+    packed, singles = ([], jobs) if args.batch else pack_jobs(jobs, args.pack_tokens, args.pack_max_classes)
+
+    def _call_deployment(route: Optional[model_router.Route]) -> str:
+        return (args.batch and args.batch_deployment) or _deployment(route)
+
+    calls = [(p.prompt, _call_deployment(packed_route(p))) for p in packed]
+    calls += [(job.prompt, _call_deployment(job.route)) for job in singles]
+    prompts = [prompt for prompt, _ in calls]
+    remote = [
+        prompt
+        for prompt, deployment in calls
+        if not cache.contains(ai_cache.make_cache_key(endpoint, deployment, API_VERSION, SYSTEM_PROMPT, prompt))
+    ]
+
+    show_tier = model_router.get_router().enabled and not args.batch
+    print("[INFO] Dry-Run – würde erzeugen:")
+    for job in sorted(jobs, key=lambda j: str(j.source_file)):
+        tier = f" [{job.route.tier}: {job.route.reason}]" if show_tier and job.route is not None else ""
+        print(f"  - {job.source_file} -> {job.target_path}{tier}")
+    tokens = sum(context_packer.count_tokens(SYSTEM_PROMPT + prompt) for prompt in remote)
+    print(
+        f"[INFO] Dry-Run: {len(jobs)} Test(s), {len(prompts)} Modellaufruf(e) "
+        f"({len(packed)} Sammelanfrage(n)), davon {len(prompts) - len(remote)} aus dem Antwort-Cache; "
+        f"~{tokens} Prompt-Tokens für die übrigen."
+    )
+
+
+def run_generation(
+    args: argparse.Namespace,
+    source_dir: pathlib.Path,
+    test_dir: pathlib.Path,
+    manifest: GenerationManifest,
+) -> None:
+    with telemetry.get_telemetry().phase("scan"):
+        if args.since:
+            target_files = select_changed_files(
+                args.since, source_dir, test_dir, manifest, args.delete_orphans, args.dry_run
+            )
+        else:
+            # Einfachheit für Hackathon: ALLE Java-Dateien unter source_dir
+            target_files = [f.path for f in source_files.iter_source_files(source_dir, (".java",))]
+
+    if args.shard is not None:
+        target_files = shard_targets(target_files, args.shard, source_dir)
 
     if not target_files:
         print("[INFO] Keine Java-Dateien gefunden – nichts zu tun.")
         return
 
-    print("[INFO] Java-Dateien, für die Tests erzeugt werden:")
+    print("[INFO] Java-Dateien, die geprüft werden:")
     for f in target_files:
         print(f"  - {f}")
 
-    for f in target_files:
-        try:
-            generate_test_for_file(f, source_dir, test_dir)
-        except Exception as e:
-            print(f"[ERROR] Fehler beim Generieren von Tests für {f}: {e}")
+    if args.jobs == 1 and not args.batch and args.pack_tokens <= 0 and not args.dry_run:
+        for f in target_files:
+            try:
+                generate_test_for_file(f, source_dir, test_dir, manifest, args.force)
+            except Exception as e:
+                print(f"[ERROR] Fehler beim Generieren von Tests für {f}: {e}")
+        return
+
+    jobs = prepare_test_jobs(target_files, source_dir, test_dir, manifest, args.force)
+    if not jobs:
+        print("[INFO] Keine Klassen, für die Tests erzeugt werden – nichts zu tun.")
+        return
+
+    if args.dry_run:
+        report_dry_run(jobs, args)
+        return
+
+    if args.batch:
+        # Batch-Aufträge sind ohnehin günstig, dort bleibt es bei einer Klasse pro Auftrag
+        run_jobs_batch(jobs, args)
+        return
+
+    packed, singles = pack_jobs(jobs, args.pack_tokens, args.pack_max_classes)
+    if packed:
+        print(
+            f"[INFO] {sum(len(p.jobs) for p in packed)} kleine Klasse(n) in "
+            f"{len(packed)} Sammelanfrage(n) gepackt, {len(singles)} einzeln."
+        )
+    run_jobs_parallel(singles, args.jobs, packed)
 
 
 if __name__ == "__main__":
@@ -9,12 +9,27 @@ Erzeugt EIN Playwright-Testfile für:
 - Generische UI-Tests für ALLE HTML-Templates (z.B. followup.html)
 
 Strategie:
-- Azure OpenAI generiert den "intelligenten" Teil:
-  - Test 'hackathon2025 UI: initial render and REST interaction'
-  - API-Tests für /api/... Endpoints
-- Dieses Script hängt für JEDES weitere HTML-Template
-  einen einfachen Smoke-Test hinten dran:
+- Azure OpenAI generiert den "intelligenten" Teil in kleinen Einheiten:
+  - Test 'hackathon2025 UI: initial render and REST interaction' (index.html)
+  - je /api/...-Endpoint ein API-Test; der Prompt enthält nur Verb, Pfad,
+    Parameter und die Handler-Methode (aus dem Java-Index)
+- Einfache GET-Endpoints, deren Handler nur Map.of(...) mit festen Keys
+  zurückgeben, brauchen kein Modell: Status, JSON-Form und Pflicht-Keys werden
+  direkt aus Mapping, @RequestParam-Defaults und return-Anweisungen erzeugt
+  (offline reproduzierbar; abschaltbar mit --llm-api-tests).
+- Die Einheiten laufen parallel (--jobs). Jeder erzeugte Block wird mit dem
+  Hash seines Prompts in tests/.ai-ui-units.json abgelegt; unveränderte
+  Einheiten werden übernommen, ein neuer Controller kostet also nur seine
+  eigenen (kleinen) Aufrufe.
+- Die Endpoint-Prompts beginnen mit einem festen Präfix (Regeln + Beispiel),
+  Endpoint und Handler-Code stehen am Ende (Prompt-Caching beim Anbieter).
+- Zusammengesetzt wird deterministisch: Import, Index-Test, API-Tests nach
+  Pfad/Verb, danach für JEDES weitere HTML-Template ein einfacher Smoke-Test:
     - URL-Konvention: /<basename>  (followup.html -> /followup)
+- Mit --dry-run werden nur die neu zu erzeugenden Einheiten aufgelistet.
+- Mit --shard i/N erzeugt ein Lauf nur seinen Teil der Modell-Einheiten und
+  schreibt ein Teilergebnis des Stores (siehe sharding.py); nach
+  "sharding.py merge" setzt ein Lauf ohne --shard die Spec ohne neue Aufrufe zusammen.
 
 Erwartet Umgebungsvariablen:
 - AZURE_OPENAI_ENDPOINT
@@ -22,88 +37,93 @@ Erwartet Umgebungsvariablen:
 - AZURE_OPENAI_DEPLOYMENT
 """
 
+import argparse
+import hashlib
+import json
 import os
 import pathlib
 import textwrap
-import json
-import requests
 import re
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import ai_cache
+import common
+import java_index
+import llm_hedge
+import llm_transport
+import model_router
+import rate_limit
+import sharding
+import source_files
+import telemetry
+from common import read_file
 
 API_VERSION = "2024-02-15-preview"  # ggf. anpassen
 
-
-# -------------------- Hilfsfunktionen --------------------
-
-
-def read_file(path: pathlib.Path) -> str:
-    if not path.exists():
-        print(f"[WARN] Datei nicht gefunden: {path}")
-        return ""
-    return path.read_text(encoding="utf-8")
+SYSTEM_PROMPT = (
+    "You are a senior test engineer specialized in web UIs and Playwright. "
+    "You write high-quality, compilable Playwright tests in TypeScript "
+    "using '@playwright/test'. Tests must focus on realistic user flows "
+    "and robust validation checks. You do NOT invent endpoints or pages. "
+    "You NEVER rely on fragile exact strings when a looser regex or "
+    "substring check suffices."
+)
 
 
-def call_azure_openai_for_playwright(prompt: str) -> str:
-    endpoint = os.environ["AZURE_OPENAI_ENDPOINT"].rstrip("/")
-    api_key = os.environ["AZURE_OPENAI_API_KEY"]
-    deployment = os.environ["AZURE_OPENAI_DEPLOYMENT"]
-
-    url = f"{endpoint}/openai/deployments/{deployment}/chat/completions?api-version={API_VERSION}"
-
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": api_key,
-    }
-
-    system_prompt = (
-        "You are a senior test engineer specialized in web UIs and Playwright. "
-        "You write high-quality, compilable Playwright tests in TypeScript "
-        "using '@playwright/test'. Tests must focus on realistic user flows "
-        "and robust validation checks. You do NOT invent endpoints or pages. "
-        "You NEVER rely on fragile exact strings when a looser regex or "
-        "substring check suffices."
-    )
+# -------------------- Hilfsfunktionen --------------------
 
-    body = {
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": prompt},
-        ]
-        # kein max_tokens / keine temperature → Azure-kompatibel
-    }
 
-    resp = requests.post(url, headers=headers, data=json.dumps(body), timeout=90)
-    if resp.status_code >= 400:
-        raise RuntimeError(f"Azure OpenAI Fehler {resp.status_code}: {resp.text}")
-    data = resp.json()
-    return data["choices"][0]["message"]["content"]
+def call_azure_openai_for_playwright(
+    prompt: str,
+    label: str = "playwright",
+    deployment: Optional[str] = None,
+    valid: Optional[Callable[[str], bool]] = None,
+) -> str:
+    return common.azure_chat(prompt, SYSTEM_PROMPT, API_VERSION, label, 90, deployment=deployment, valid=valid)
 
 
 def strip_code_fences(text: str) -> str:
     """
     Entfernt ```ts``` / ```typescript``` / ```js``` Codeblöcke, falls vorhanden.
     """
-    match = re.search(r"```(?:ts|typescript|javascript|js)?\s*(.*?)```", text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    return text.strip()
+    return common.strip_code_fences(text, ("ts", "typescript", "javascript", "js"))
 
 
-def collect_controllers(controllers_dir: pathlib.Path):
+def collect_controllers(
+    controllers_dir: pathlib.Path,
+    records: Optional[Iterable[java_index.JavaFileRecord]] = None,
+) -> Iterator[Dict]:
     """
-    Sammelt alle *.java-Dateien unterhalb des Controllers-Verzeichnisses.
-    Rückgabe: Liste von Dicts mit {name, path, code}.
+    Liefert alle Controller (@Controller/@RestController) unterhalb des Verzeichnisses.
+    Klassen ohne Controller-Annotation werden über den Java-Index aussortiert,
+    ohne sie zu lesen, solange sie sich nicht geändert haben; leere Dateien ebenso.
+    Je Controller ein Dict {name, path, file, endpoints} – der Quelltext wird erst
+    beim Bauen der Einheiten über file.read() gelesen. Bereits gescannte Records
+    (z.B. vom Orchestrator) können übergeben werden, dann wird nicht erneut gescannt.
     """
-    result = []
-    for path in controllers_dir.rglob("*.java"):
-        code = read_file(path)
-        result.append(
-            {
-                "name": path.name,
-                "path": str(path),
-                "code": code,
-            }
-        )
-    return result
+    if records is None:
+        records = java_index.get_index().scan(controllers_dir)
+    for record in records:
+        if not record.is_controller or record.size == 0:
+            continue
+        path = pathlib.Path(record.path)
+        yield {
+            "name": path.name,
+            "path": str(path),
+            "file": source_files.SourceFile(path=path, size=record.size),
+            "endpoints": record.endpoints,
+        }
+
+
+def format_params(params) -> str:
+    """@RequestParam-Liste mit Defaults; "?" markiert optionale Parameter ohne Default."""
+    return ", ".join(
+        f"{p.name}={p.default}" if p.default is not None else (p.name if p.required else f"{p.name}?")
+        for p in params
+    )
 
 
 def get_index_html(templates_dir: pathlib.Path) -> str:
@@ -116,24 +136,12 @@ def get_index_html(templates_dir: pathlib.Path) -> str:
     return ""
 
 
-def build_prompt(controllers, index_html: str) -> str:
-    controllers_str = ""
-    for c in controllers:
-        controllers_str += f"\nController {c['name']} (Pfad: {c['path']}):\n```java\n{c['code']}\n```\n"
-
-    return textwrap.dedent(f"""
+INDEX_PROMPT_TEMPLATE = textwrap.dedent("""
     We are working on a Spring Boot demo app called "hackathon2025".
     It runs on http://localhost:8080.
 
-    There is an index page (GET /) rendered via a Thymeleaf template, and there are
-    REST endpoints implemented in Spring controllers, especially under /api/... paths.
-
-    Your job is to generate ONE Playwright test file in TypeScript named
-    `ui-hackathon2025.spec.ts` that contains:
-
-    1) A UI test for the index page (GET /)
-    2) API tests for all REST endpoints whose path clearly starts with /api/
-       and that return JSON.
+    There is an index page (GET /) rendered via a Thymeleaf template.
+    Your job is to generate exactly ONE Playwright UI test in TypeScript for it.
 
     === INDEX PAGE BEHAVIOR (MUST BE STABLE) ===
 
@@ -190,92 +198,401 @@ def build_prompt(controllers, index_html: str) -> str:
 
     Only adapt selectors or expected texts IF the provided HTML has clearly changed.
 
-    === CONTROLLERS (CONTEXT FOR API TESTS) ===
+    Do NOT output import statements; `import {{ test, expect }} from '@playwright/test';`
+    is added once for the whole file.
 
-    Here are all Java controllers:
-
-    {controllers_str}
+    Output ONLY the TypeScript code of this single test (no explanations, no comments).
+    """)
 
-    From these controllers, you must:
+# Statischer Präfix zuerst (byte-identisch für alle Endpoints, damit der Anbieter ihn
+# cachen kann), die Angaben zum Endpoint stehen am Ende. Wird nicht formatiert.
+ENDPOINT_PROMPT_PREFIX = textwrap.dedent("""
+    We are working on a Spring Boot demo app called "hackathon2025".
+    It runs on http://localhost:8080.
 
-    - Identify all REST endpoints (methods annotated with @GetMapping, @PostMapping,
-      @RequestMapping, etc.) whose path clearly starts with '/api/'.
-    - For each such endpoint that returns JSON, create a dedicated API test in
-      the SAME file (ui-hackathon2025.spec.ts).
+    Your job is to generate exactly ONE Playwright API test in TypeScript for the
+    REST endpoint described at the end of this message.
 
-    For API tests:
+    Rules:
 
+    - The test MUST have the EXACT name given as "Test name" below.
     - Use Playwright's APIRequestContext via the `request` fixture:
-        test('...', async ({{ request }}) => {{ ... }})
-    - For each /api/... endpoint:
-        - Perform a GET request (or the appropriate HTTP method) to
-          'http://localhost:8080<path>'.
-        - Assert that the status is 200.
-        - Parse the JSON body.
-        - Assert that the parsed value is an object and has at least one field.
-        - If the controller clearly uses a hard-coded message like
-          "Hello from rest api for hackathon 2025!!!", you may:
-            - assert that `String(message).toLowerCase()` contains 'hello'.
-        - If the controller clearly uses a message like
-          "good night from rest api for hackathon 2025!!!", you may:
-            - assert that `String(message).toLowerCase()` matches `/good\\s+night/`.
-        - DO NOT use tricks like `'good night'.replace(' ', '')` or similar.
-        - DO NOT assert on exact full strings unless absolutely necessary.
-          Prefer robust checks (contains, regex with optional whitespace).
-
-    GLOBAL RULES:
-
-    - DO NOT invent any endpoints or routes. If there is no controller method for a path,
-      IGNORE it completely.
-    - All tests must be in a single file:
-        ui-hackathon2025.spec.ts
-    - Use:
-        import {{ test, expect }} from '@playwright/test';
-
-    Output ONLY the TypeScript code of ui-hackathon2025.spec.ts (no explanations, no comments).
+        test('<test name>', async ({ request }) => { ... })
+    - Send the request with the given HTTP method to 'http://localhost:8080' + path.
+      Pass values for required request params; params with defaults may be omitted.
+    - Assert that the status is 200.
+    - Parse the JSON body and assert that it is an object with at least one field.
+    - If the handler clearly returns a hard-coded message, assert on a robust part of it
+      (e.g. `String(message).toLowerCase()` contains a keyword, or a regex with optional
+      whitespace like `/good\\s+night/`). DO NOT assert on exact full strings unless
+      absolutely necessary.
+    - DO NOT invent any other endpoints or routes.
+    - Do NOT output import statements; `import { test, expect } from '@playwright/test';`
+      is added once for the whole file.
+
+    Output ONLY the TypeScript code of this single test (no explanations, no comments).
+
+    Example (style only, do not copy):
+
+    Endpoint: GET /api/hello  (HelloRestController.hello; params: name (optional))
+    Test name: hackathon2025 API: GET /api/hello
+    Result:
+    test('hackathon2025 API: GET /api/hello', async ({ request }) => {
+      const response = await request.get('http://localhost:8080/api/hello');
+      expect(response.status()).toBe(200);
+      const body = await response.json();
+      expect(typeof body).toBe('object');
+      expect(Object.keys(body).length).toBeGreaterThan(0);
+      expect(String(body.message).toLowerCase()).toMatch(/hello/);
+    });
+
+    Now the endpoint to test.
     """)
 
+ENDPOINT_PROMPT_TEMPLATE = textwrap.dedent("""
+    Endpoint: {method} {path}  ({handler}{params}), detected in the controller {controller}
+    Test name: {test_name}
 
-# -------------------- main --------------------
+    Handler source:
 
+    ```java
+    {source}
+    ```
+    """)
 
-def main():
-    # Skript liegt in scripts/, Repo-Root ist eine Ebene höher
-    repo_root = pathlib.Path(__file__).resolve().parents[1]
+# Store der erzeugten Testblöcke (wird mit tests/ committet): ein Eintrag pro Einheit
+UNIT_STORE_NAME = ".ai-ui-units.json"
+UNIT_STORE_VERSION = 1
+INDEX_UNIT = "index"
 
-    controllers_dir = repo_root / "src/main/java/com/example/hackathon2025"
-    templates_dir = repo_root / "src/main/resources/templates"
 
-    controllers = collect_controllers(controllers_dir)
-    index_html = get_index_html(templates_dir)
+@dataclass
+class UiUnit:
+    """
+    Eine Generierungseinheit: der Index-Seiten-Test oder ein API-Test pro /api/-Endpoint.
+    Ist code gesetzt, wurde der Test deterministisch erzeugt und braucht keinen Modellaufruf.
+    """
 
-    if not controllers:
-        print(f"[WARN] Keine Controller unter {controllers_dir} gefunden.")
-    if not index_html:
-        print(f"[WARN] Kein index.html unter {templates_dir} gefunden.")
+    unit_id: str
+    prompt: str
+    sort_key: Tuple[int, str, str]
+    code: Optional[str] = None
+    # Modell-Stufe (model_router.py), gesetzt von plan_units()
+    route: Optional[model_router.Route] = None
+    # Deployment, das tatsächlich geantwortet hat (mit --hedge ggf. das Duplikat)
+    deployment: str = ""
+
+    @property
+    def input_sha256(self) -> str:
+        return hashlib.sha256((SYSTEM_PROMPT + "\n" + self.prompt).encode("utf-8")).hexdigest()
+
+
+def build_index_unit(index_html: str) -> UiUnit:
+    return UiUnit(INDEX_UNIT, INDEX_PROMPT_TEMPLATE.format(index_html=index_html), (0, "", ""))
+
+
+# -------------------- Deterministische API-Tests --------------------
+
+# Java-Typen -> typeof im Browser (Spring/Jackson serialisiert Zahlen als JSON-Zahl)
+JSON_KINDS = {
+    "String": "string",
+    "char": "string",
+    "Character": "string",
+    "boolean": "boolean",
+    "Boolean": "boolean",
+}
+JSON_KINDS.update(
+    {t: "number" for t in ("byte", "short", "int", "long", "float", "double",
+                           "Byte", "Short", "Integer", "Long", "Float", "Double")}
+)
+# Beispielwerte für Parameter ohne Default (Pflicht oder required = false)
+SAMPLE_VALUES = {"string": "test", "number": "1", "boolean": "true"}
+_STRING_RE = re.compile(r'^"((?:\\.|[^"\\])*)"$')
+
+
+def _value_kind(expr: str, param_kinds: Dict[str, str]) -> str:
+    """typeof eines Map-Werts, soweit ohne Ausführung erkennbar; sonst "any" (nur Key-Prüfung)."""
+    expr = expr.strip()
+    if _STRING_RE.match(expr) or ('"' in expr and "+" in expr and "?" not in expr):
+        return "string"  # Literal oder String-Konkatenation
+    if re.fullmatch(r"-?\d+(\.\d+)?[lLfFdD]?", expr):
+        return "number"
+    if expr in ("true", "false"):
+        return "boolean"
+    return param_kinds.get(expr, "any")
+
+
+def infer_response_shapes(method_code: str) -> Optional[List[Dict[str, str]]]:
+    """
+    Mögliche JSON-Antworten eines Handlers als [{Key: typeof}], je return-Anweisung eine.
+    None, wenn nicht jede return-Anweisung ein Map.of(...) mit String-Keys ist –
+    dann ist das Verhalten nicht sicher ableitbar und der Test kommt vom Modell.
+    """
+    returns = java_index.return_expressions(method_code)
+    if not returns:
+        return None
+    param_kinds = {name: JSON_KINDS.get(t, "any") for t, name in java_index.method_parameters(method_code)}
+    shapes: List[Dict[str, str]] = []
+    for expr in returns:
+        entries = java_index.map_of_entries(expr)
+        if entries is None:
+            return None
+        shape = {key: _value_kind(value, param_kinds) for key, value in entries}
+        if shape not in shapes:
+            shapes.append(shape)
+    return shapes
+
+
+def deterministic_api_test(ep, method: str, method_code: str, test_name: str) -> Optional[str]:
+    """
+    Playwright-API-Test ohne Modellaufruf: Status 200, JSON-Content-Type, Objekt mit
+    genau den Keys einer der möglichen Antworten und – wo eindeutig – deren typeof.
+    Nur für GET ohne Pfadvariablen. Parameter mit defaultValue werden weggelassen (der
+    Default des Servers wird mitgetestet), alle anderen bekommen Beispielwerte – auch
+    required = false, sonst käme null an (Map.of(..., null) wirft).
+    """
+    if method != "GET" or "{" in ep.path:
+        return None
+    shapes = infer_response_shapes(method_code)
+    if not shapes:
+        return None
+
+    param_types = {name: t for t, name in java_index.method_parameters(method_code)}
+    query = []
+    for p in ep.params:
+        if p.default is not None:
+            continue  # Default des Servers wird mitgetestet
+        sample = SAMPLE_VALUES.get(JSON_KINDS.get(param_types.get(p.name, ""), ""))
+        if sample is None:
+            return None
+        query.append((p.name, sample))
+    url = f"http://localhost:8080{ep.path}" + (f"?{urllib.parse.urlencode(query)}" if query else "")
+
+    key_sets = [sorted(shape) for shape in shapes]
+    lines = [
+        f"test({json.dumps(test_name)}, async ({{ request }}) => {{",
+        f"  const response = await request.get({json.dumps(url)});",
+        "  expect(response.status()).toBe(200);",
+        "  expect(response.headers()['content-type']).toContain('application/json');",
+        "  const body = await response.json();",
+        "  expect(body).not.toBeNull();",
+        "  expect(typeof body).toBe('object');",
+    ]
+    if len(key_sets) == 1:
+        lines.append(f"  expect(Object.keys(body).sort()).toEqual({json.dumps(key_sets[0])});")
+    else:
+        lines.append(f"  expect({json.dumps(key_sets)}).toContainEqual(Object.keys(body).sort());")
+    # typeof nur für Keys, die in allen Antworten mit derselben Art vorkommen
+    for key in key_sets[0]:
+        kinds = {shape.get(key) for shape in shapes}
+        if len(kinds) == 1 and kinds != {"any"}:
+            lines.append(f"  expect(typeof body[{json.dumps(key)}]).toBe('{kinds.pop()}');")
+    lines.append("});")
+    return "\n".join(lines)
+
+
+def build_endpoint_units(controllers, deterministic: bool = True) -> List[UiUnit]:
+    """
+    Eine Einheit pro /api/-Endpoint; der Prompt enthält nur die Handler-Methode.
+    Mit deterministic=True wird der Test für einfache Map.of-Handler direkt erzeugt.
+    """
+    units: Dict[str, UiUnit] = {}
+    for c in controllers:
+        source = c["file"].read() if any(ep.path.startswith("/api/") for ep in c["endpoints"]) else ""
+        for ep in c["endpoints"]:
+            if not ep.path.startswith("/api/"):
+                continue
+            method = "GET" if ep.http_method == "REQUEST" else ep.http_method
+            unit_id = f"{method} {ep.path}"
+            if unit_id in units:
+                continue
+            handler_name = ep.handler.rsplit(".", 1)[-1]
+            method_code = java_index.method_source(source, handler_name)
+            test_name = f"hackathon2025 API: {method} {ep.path}"
+            code = deterministic_api_test(ep, method, method_code, test_name) if deterministic and method_code else None
+            if code is not None:
+                units[unit_id] = UiUnit(unit_id, "", (1, ep.path, method), code)
+                continue
+            params = format_params(ep.params)
+            prompt = ENDPOINT_PROMPT_PREFIX + ENDPOINT_PROMPT_TEMPLATE.format(
+                controller=c["name"],
+                method=method,
+                path=ep.path,
+                handler=ep.handler,
+                params=f"; params: {params}" if params else "",
+                source=method_code or source,
+                test_name=test_name,
+            )
+            units[unit_id] = UiUnit(unit_id, prompt, (1, ep.path, method))
+    return sorted(units.values(), key=lambda u: u.sort_key)
+
+
+def extract_test_block(completion: str) -> str:
+    """Code ohne Markdown-Zäune und ohne import-Zeilen (die stehen einmal am Dateianfang)."""
+    code = strip_code_fences(completion)
+    code = re.sub(r"^\s*import\s.*?;?\s*$\n?", "", code, flags=re.MULTILINE)
+    return code.strip()
+
+
+def load_unit_store(path: pathlib.Path) -> Dict[str, Dict]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != UNIT_STORE_VERSION:
+        return {}
+    return dict(data.get("entries") or {})
+
+
+def save_unit_store(path: pathlib.Path, entries: Dict[str, Dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {"version": UNIT_STORE_VERSION, "entries": {k: entries[k] for k in sorted(entries)}}
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def plan_units(
+    units: List[UiUnit],
+    old_entries: Dict[str, Dict],
+) -> Tuple[Dict[str, Dict], List[UiUnit]]:
+    """
+    Teilt die Modell-Einheiten in unverändert übernehmbare Store-Einträge und neu zu
+    erzeugende und legt die Modell-Stufe je Einheit fest (nach Prompt-Größe). Ein
+    Block bleibt gültig, solange er von dieser oder einer höheren Stufe stammt.
+    """
+    router = model_router.get_router()
+    reused: Dict[str, Dict] = {}
+    todo: List[UiUnit] = []
+    for unit in units:
+        if unit.code is not None:
+            continue
+        unit.route = router.route(
+            model_router.RouteInput(rate_limit.estimate_tokens(unit.prompt)), unit.unit_id, record=False
+        )
+        entry = old_entries.get(unit.unit_id)
+        if (
+            entry
+            and entry.get("input_sha256") == unit.input_sha256
+            and router.accepts(unit.route, entry.get("deployment", ""))
+        ):
+            reused[unit.unit_id] = entry
+        else:
+            todo.append(unit)
+
+    derived = sum(1 for u in units if u.code is not None)
+    print(
+        f"[INFO] {derived} API-Test(s) aus dem Quelltext abgeleitet, "
+        f"{len(reused)} Testblock/-blöcke unverändert übernommen, {len(todo)} neu zu erzeugen."
+    )
+    return reused, todo
 
-    prompt = build_prompt(controllers, index_html)
 
-    print("[INFO] Rufe Azure OpenAI zur Generierung von Playwright-Tests auf...")
-    completion = call_azure_openai_for_playwright(prompt)
-    base_ts = strip_code_fences(completion).strip()
+def generate_units(
+    units: List[UiUnit],
+    store_path: pathlib.Path,
+    jobs: int,
+) -> Tuple[Dict[str, str], Dict[str, Dict]]:
+    """
+    Erzeugt die Testblöcke parallel. Einheiten, deren Prompt (Hash über System-Prompt,
+    Template und Eingaben) und Deployment unverändert sind, werden aus dem Store
+    übernommen – ein neuer Controller kostet also nur seine eigenen Aufrufe.
+    Schlägt ein Aufruf fehl, bleibt ein vorhandener alter Block erhalten.
+    Rückgabe: Blöcke je Einheit und die Store-Einträge der übergebenen Einheiten
+    (Einträge anderer Einheiten fehlen darin, der Aufrufer speichert).
+    """
+    old_entries = load_unit_store(store_path)
+    entries, todo = plan_units(units, old_entries)
+    blocks: Dict[str, str] = {u.unit_id: u.code for u in units if u.code is not None}
+    blocks.update({unit_id: entry["code"] for unit_id, entry in entries.items()})
 
-    # --- Generische UI-Tests für ALLE HTML-Templates anhängen ---
-    extra_tests = []
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {pool.submit(generate_unit, unit): unit for unit in todo}
+        for future in as_completed(futures):
+            unit = futures[future]
+            try:
+                code, error = future.result(), None
+            except Exception as e:
+                code, error = None, e
+            apply_unit_result(unit, code, error, old_entries, blocks, entries)
 
-    if templates_dir.exists():
-        for tpl in templates_dir.rglob("*.html"):
-            name = tpl.name          # z.B. followup.html
-            base = tpl.stem          # z.B. followup
+    return blocks, entries
 
-            # index.html ist schon im ersten Test abgedeckt
-            if base.lower() in ("index", "home", "start"):
-                continue
 
-            test_name = f"hackathon2025 UI: render {base} page"
-            url_path = f"/{base}"
+def generate_unit(unit: UiUnit) -> str:
+    """
+    Ein Modellaufruf für eine Einheit; liefert den Testblock ohne Importe. Ist der
+    Block unbrauchbar (siehe block_problem), wird die nächsthöhere Modell-Stufe gefragt.
+    """
+    router = model_router.get_router()
+    route = unit.route
+    if route is not None:
+        router.record(route, unit.unit_id)
+    while True:
+        completion = call_azure_openai_for_playwright(
+            unit.prompt,
+            label=unit.unit_id,
+            deployment=route.deployment if route is not None else None,
+            valid=lambda text: block_problem(extract_test_block(text)) is None,
+        )
+        with telemetry.get_telemetry().phase("postprocess", unit.unit_id):
+            code = extract_test_block(completion)
+        problem = block_problem(code)
+        higher = router.escalate(route, problem, unit.unit_id) if problem is not None and route is not None else None
+        if higher is None:
+            unit.route = route
+            unit.deployment = ai_cache.get_cache().last_deployment() or ""
+            return code
+        route = higher
+
+
+def block_problem(code: str) -> Optional[str]:
+    """Grobe Prüfung eines Testblocks; liefert den Grund, falls er unbrauchbar ist."""
+    if not re.search(r"\btest\s*\(", code):
+        return "kein test(...)-Block"
+    if code.count("{") != code.count("}") or code.count("(") != code.count(")"):
+        return "unvollständig (Klammern passen nicht)"
+    return None
+
+
+def apply_unit_result(
+    unit: UiUnit,
+    code: Optional[str],
+    error: Optional[BaseException],
+    old_entries: Dict[str, Dict],
+    blocks: Dict[str, str],
+    entries: Dict[str, Dict],
+) -> None:
+    """Übernimmt das Ergebnis in blocks/entries; bei Fehler bleibt ein vorhandener alter Block erhalten."""
+    if error is None:
+        deployment = unit.deployment or (unit.route.deployment if unit.route is not None else "")
+        deployment = deployment or os.environ.get("AZURE_OPENAI_DEPLOYMENT", "")
+        blocks[unit.unit_id] = code
+        entries[unit.unit_id] = {"input_sha256": unit.input_sha256, "deployment": deployment, "code": code}
+        return
+    old = old_entries.get(unit.unit_id)
+    if old:
+        print(f"[WARN] {unit.unit_id}: Generierung fehlgeschlagen ({error}), behalte bisherigen Test.")
+        entries[unit.unit_id] = old
+        blocks[unit.unit_id] = old["code"]
+    else:
+        print(f"[WARN] {unit.unit_id}: Generierung fehlgeschlagen ({error}), Test fehlt.")
+
+
+def template_smoke_tests(templates_dir: pathlib.Path) -> List[str]:
+    """Generische Smoke-Tests für alle weiteren HTML-Templates (URL-Konvention /<basename>)."""
+    extra_tests = []
+    if not templates_dir.exists():
+        return extra_tests
+    for tpl in sorted(templates_dir.rglob("*.html")):
+        base = tpl.stem          # z.B. followup
+
+        # index.html ist schon im ersten Test abgedeckt
+        if base.lower() in ("index", "home", "start"):
+            continue
+
+        test_name = f"hackathon2025 UI: render {base} page"
+        url_path = f"/{base}"
 
-            extra_ts = f"""
+        extra_ts = f"""
 test('{test_name}', async ({'{'} page {'}'}) => {{
   await page.goto('http://localhost:8080{url_path}');
   const heading = page.getByRole('heading', {{ level: 1 }});
@@ -283,16 +600,130 @@ test('{test_name}', async ({'{'} page {'}'}) => {{
 }});
 """.strip()
 
-            extra_tests.append(extra_ts)
+        extra_tests.append(extra_ts)
+    return extra_tests
+
+
+def assemble_spec(units: List[UiUnit], blocks: Dict[str, str], extra_tests: List[str]) -> str:
+    """Deterministische Reihenfolge: Import, Index-Test, API-Tests nach Pfad/Verb, Template-Smoke-Tests."""
+    parts = ["import { test, expect } from '@playwright/test';"]
+    parts += [blocks[u.unit_id] for u in sorted(units, key=lambda u: u.sort_key) if blocks.get(u.unit_id)]
+    parts += extra_tests
+    return "\n\n".join(parts) + "\n"
+
+
+# -------------------- main --------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Erzeugt tests/ui-hackathon2025.spec.ts (Playwright) mittels Azure OpenAI."
+    )
+    parser.add_argument(
+        "--repo-root",
+        default=str(pathlib.Path(__file__).resolve().parents[1]),
+        help="Wurzel des Projekts (Default: eine Ebene über scripts/, z.B. für Benchmarks abweichend)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help="Parallele Azure-OpenAI-Aufrufe für die einzelnen Testblöcke (Default: 4)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Nur anzeigen, welche Testblöcke neu erzeugt würden (keine Modellaufrufe, nichts wird geschrieben)",
+    )
+    parser.add_argument(
+        "--llm-api-tests",
+        action="store_true",
+        help="Auch einfache Map.of-Endpoints per Azure OpenAI testen statt deterministisch aus dem Quelltext",
+    )
+    sharding.add_shard_arguments(parser)
+    ai_cache.add_cache_arguments(parser)
+    java_index.add_index_arguments(parser)
+    llm_transport.add_transport_arguments(parser)
+    rate_limit.add_rate_limit_arguments(parser)
+    model_router.add_routing_arguments(parser)
+    llm_hedge.add_hedge_arguments(parser)
+    telemetry.add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    args.http_pool_size = max(args.http_pool_size, args.jobs)
+    tel = telemetry.configure_from_args(args, export=not args.dry_run)
+    ai_cache.configure_from_args(args)
+    java_index.configure_from_args(args, save=not args.dry_run)
+    llm_transport.configure_from_args(args)
+    rate_limit.configure_from_args(args, max_concurrency=args.jobs)
+    model_router.configure_from_args(args)
+    llm_hedge.configure_from_args(args)
+
+    # Skript liegt in scripts/, Repo-Root ist eine Ebene höher (überschreibbar mit --repo-root)
+    repo_root = pathlib.Path(args.repo_root).resolve()
 
-    full_ts = base_ts
-    if extra_tests:
-        full_ts += "\n\n" + "\n\n".join(extra_tests)
+    controllers_dir = repo_root / "src/main/java/com/example/hackathon2025"
+    templates_dir = repo_root / "src/main/resources/templates"
+
+    with tel.phase("scan"):
+        controllers = list(collect_controllers(controllers_dir))
+        index_html = get_index_html(templates_dir)
+
+    if not controllers:
+        print(f"[WARN] Keine Controller unter {controllers_dir} gefunden.")
+    if not index_html:
+        print(f"[WARN] Kein index.html unter {templates_dir} gefunden.")
+
+    with tel.phase("prompt"):
+        units = [build_index_unit(index_html)] + build_endpoint_units(controllers, deterministic=not args.llm_api_tests)
 
     tests_dir = repo_root / "tests"
+    store_path = tests_dir / UNIT_STORE_NAME
+    print(f"[INFO] Playwright-Tests: {len(units)} Einheit(en) (Index-Seite + {len(units) - 1} API-Endpoint(s)).")
+
+    if args.dry_run:
+        _, todo = plan_units(units, load_unit_store(store_path))
+        for unit in todo:
+            print(f"  - {unit.unit_id}")
+        tokens = sum(rate_limit.estimate_tokens(SYSTEM_PROMPT + u.prompt) for u in todo)
+        print(f"[INFO] Dry-Run: {len(todo)} Modellaufruf(e) nötig, ~{tokens} Prompt-Tokens.")
+        return
+
+    if args.shard is not None:
+        # Nur Modell-Einheiten werden verteilt; die Spec setzt später ein Lauf ohne --shard zusammen
+        model_units = [u for u in units if u.code is None]
+        mine = sharding.partition(model_units, args.shard, weight=lambda u: len(u.prompt), key=lambda u: u.unit_id)
+        print(f"[INFO] Shard {args.shard.label}: {len(mine)} von {len(model_units)} Einheit(en).")
+        before = load_unit_store(store_path)
+        _, entries = generate_units(mine, store_path, args.jobs)
+        changed, _ = sharding.diff_entries(before, entries)
+        sharding.write_partial(
+            pathlib.Path(args.shard_dir),
+            "ui-tests",
+            args.shard,
+            store_path,
+            UNIT_STORE_VERSION,
+            changed,
+            items=len(mine),
+            weight=sum(len(u.prompt) for u in mine),
+        )
+        return
+
+    blocks, entries = generate_units(units, store_path, args.jobs)
+    # Einträge entfernter Endpoints fallen heraus
+    save_unit_store(store_path, entries)
+
+    write_spec(tests_dir, units, blocks, templates_dir)
+
+
+def write_spec(tests_dir: pathlib.Path, units: List[UiUnit], blocks: Dict[str, str], templates_dir: pathlib.Path) -> None:
+    tel = telemetry.get_telemetry()
+    with tel.phase("postprocess"):
+        full_ts = assemble_spec(units, blocks, template_smoke_tests(templates_dir))
+
     tests_dir.mkdir(parents=True, exist_ok=True)
     target_path = tests_dir / "ui-hackathon2025.spec.ts"
-    target_path.write_text(full_ts, encoding="utf-8")
+    with tel.phase("write"):
+        target_path.write_text(full_ts, encoding="utf-8")
 
     print(f"[OK] Playwright UI-Test geschrieben (inkl. generischer HTML-Tests): {target_path}")
 
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+generation_manifest.py
+
+Manifest für inkrementelle Generierung.
+
+Pro Eintrag (z.B. pro Quelldatei) wird festgehalten, mit welchen Eingaben
+(Quell-Hash, Prompt-Template + dessen Hash, Deployment) die Ausgabe erzeugt wurde
+und welchen Hash die geschriebene Ausgabe hatte. Ein neuer Lauf muss einen
+Eintrag nur dann neu erzeugen, wenn sich eine dieser Eingaben geändert hat oder
+die Ausgabedatei fehlt. Über den Ausgabe-Hash lassen sich manuell angepasste
+Ausgaben erkennen.
+
+Format (JSON):
+{
+  "version": 1,
+  "entries": {
+    "<key>": {
+      "source_sha256": "...",
+      "template": "<name>",
+      "template_sha256": "...",
+      "deployment": "...",
+      "output": "<pfad relativ zum Manifest>",
+      "output_sha256": "..."
+    }
+  }
+}
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+from typing import Collection, Dict, Optional, Union
+
+MANIFEST_VERSION = 1
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def sha256_file(path: pathlib.Path) -> Optional[str]:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+class GenerationManifest:
+    """Thread-safe Sicht auf eine Manifest-Datei."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "GenerationManifest":
+        manifest = cls(path)
+        if not path.exists():
+            return manifest
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Manifest {path} nicht lesbar ({e}), starte mit leerem Manifest.")
+            return manifest
+        if data.get("version") != MANIFEST_VERSION:
+            print(f"[WARN] Manifest {path} hat eine unbekannte Version, starte mit leerem Manifest.")
+            return manifest
+        manifest.entries = dict(data.get("entries") or {})
+        return manifest
+
+    def output_path(self, entry: dict) -> pathlib.Path:
+        return self.path.parent / entry["output"]
+
+    def is_fresh(
+        self,
+        key: str,
+        source_sha256: str,
+        template: str,
+        template_sha256: str,
+        deployment: Union[str, Collection[str]],
+    ) -> bool:
+        """
+        True, wenn der Eintrag mit genau diesen Eingaben erzeugt wurde und die Ausgabe
+        noch existiert. Manuell angepasste Ausgaben gelten als aktuell (siehe output_changed),
+        damit Handarbeit nicht ohne geänderte Eingaben überschrieben wird.
+        deployment darf auch eine Menge gleichwertiger Deployments sein (Modell-Routing).
+        """
+        allowed = {deployment} if isinstance(deployment, str) else set(deployment)
+        with self._lock:
+            entry = self.entries.get(key)
+        if not entry:
+            return False
+        if (
+            entry.get("source_sha256") != source_sha256
+            or entry.get("template") != template
+            or entry.get("template_sha256") != template_sha256
+            or entry.get("deployment") not in allowed
+        ):
+            return False
+        return self.output_path(entry).exists()
+
+    def output_changed(self, key: str) -> bool:
+        """True, wenn die Ausgabedatei nicht mehr dem zuletzt geschriebenen Stand entspricht."""
+        entry = self.get(key)
+        if not entry:
+            return False
+        return sha256_file(self.output_path(entry)) != entry.get("output_sha256")
+
+    def record(
+        self,
+        key: str,
+        source_sha256: str,
+        template: str,
+        template_sha256: str,
+        deployment: str,
+        output_path: pathlib.Path,
+        output_text: str,
+    ) -> None:
+        try:
+            output_rel = output_path.resolve().relative_to(self.path.parent.resolve()).as_posix()
+        except ValueError:
+            output_rel = str(output_path.resolve())
+        with self._lock:
+            self.entries[key] = {
+                "source_sha256": source_sha256,
+                "template": template,
+                "template_sha256": template_sha256,
+                "deployment": deployment,
+                "output": output_rel,
+                "output_sha256": sha256_text(output_text),
+            }
+            self._dirty = True
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self.entries.get(key)
+
+    def remove(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self._dirty = True
+            return entry
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": MANIFEST_VERSION,
+                "entries": {k: self.entries[k] for k in sorted(self.entries)},
+            }
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=str(self.path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.write("\n")
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+git_changes.py
+
+Ermittelt geänderte Java-Dateien aus der lokalen git-Historie (für --since REF).
+
+- Basis ist der merge-base von REF und HEAD, d.h. bei einem PR-Branch
+  (--since origin/main) zählen nur die Änderungen des Branches selbst,
+  nicht die, die inzwischen auf main gelandet sind.
+- Verglichen wird gegen den Working Tree, uncommittete Änderungen und neue,
+  noch nicht getrackte Dateien zählen also mit.
+- Umbenennungen werden erkannt (-M), damit der bestehende Test der alten Klasse
+  an den neuen Ort verschoben werden kann, statt verwaist liegen zu bleiben;
+  Klassenname und package des verschobenen Tests werden dabei angepasst.
+- git wird mit -z aufgerufen: Pfade mit Tabs, Anführungszeichen oder
+  Nicht-ASCII-Zeichen kommen unverändert (nicht C-quoted) zurück.
+"""
+
+import pathlib
+import re
+import subprocess
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass
+class JavaChange:
+    """Eine geänderte Java-Datei. status: A (neu), M (geändert), R (umbenannt), D (gelöscht)."""
+
+    status: str
+    path: pathlib.Path
+    old_path: Optional[pathlib.Path] = None
+
+
+def _git(repo_root: pathlib.Path, *args: str) -> str:
+    result = subprocess.run(
+        ["git", "-C", str(repo_root), *args],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} fehlgeschlagen: {result.stderr.strip()}")
+    return result.stdout
+
+
+def find_repo_root(path: pathlib.Path) -> pathlib.Path:
+    return pathlib.Path(_git(path, "rev-parse", "--show-toplevel").strip())
+
+
+def changed_java_files(since: str, source_dir: pathlib.Path) -> List[JavaChange]:
+    """Alle seit merge-base(since, HEAD) geänderten *.java-Dateien unterhalb von source_dir."""
+    source_dir = source_dir.resolve()
+    repo_root = find_repo_root(source_dir)
+    base = _git(repo_root, "merge-base", since, "HEAD").strip()
+    scope = str(source_dir.relative_to(repo_root)) or "."
+
+    changes: List[JavaChange] = []
+    # -z: "STATUS\0PFAD\0" bzw. bei R/C "STATUS\0ALT\0NEU\0"
+    fields = _git(repo_root, "diff", "--name-status", "-z", "-M", "--no-color", base, "--", scope).split("\0")
+    i = 0
+    while i + 1 < len(fields) and fields[i]:
+        status = fields[i][:1]
+        if status in ("R", "C"):
+            old, target = fields[i + 1], fields[i + 2]
+            i += 3
+        else:
+            old, target = None, fields[i + 1]
+            i += 2
+        if status == "R":
+            change = JavaChange("R", repo_root / target, repo_root / old)
+        elif status in ("A", "M", "D", "C", "T"):
+            change = JavaChange({"C": "A", "T": "M"}.get(status, status), repo_root / target)
+        else:
+            continue
+        if change.path.suffix == ".java":
+            changes.append(change)
+
+    untracked = _git(repo_root, "ls-files", "-z", "--others", "--exclude-standard", "--", scope)
+    for rel in untracked.split("\0"):
+        if rel.endswith(".java"):
+            changes.append(JavaChange("A", repo_root / rel))
+
+    return sorted(changes, key=lambda c: str(c.path))
+
+
+def test_path_for(source_file: pathlib.Path, source_dir: pathlib.Path, test_dir: pathlib.Path) -> pathlib.Path:
+    """Konventioneller Testpfad: <test_dir>/<package>/<Klasse>Test.java."""
+    rel = source_file.resolve().relative_to(source_dir.resolve())
+    return test_dir / rel.with_name(f"{source_file.stem}Test.java")
+
+
+def move_renamed_tests(
+    changes: List[JavaChange],
+    source_dir: pathlib.Path,
+    test_dir: pathlib.Path,
+) -> List[JavaChange]:
+    """
+    Verschiebt für umbenannte Klassen den bestehenden Test an den neuen Pfad,
+    sofern dort noch keiner liegt, und passt Klassenname und package an (der Test
+    übersetzt also auch, wenn die anschließende Neugenerierung ausfällt).
+    Gibt die Umbenennungen zurück, deren Test verschoben wurde.
+    """
+    moved: List[JavaChange] = []
+    for change in changes:
+        if change.status != "R" or change.old_path is None:
+            continue
+        try:
+            old_test = test_path_for(change.old_path, source_dir, test_dir)
+            new_test = test_path_for(change.path, source_dir, test_dir)
+        except ValueError:
+            continue  # alte oder neue Datei liegt außerhalb von source_dir
+        if old_test == new_test or not old_test.exists() or new_test.exists():
+            continue
+        new_test.parent.mkdir(parents=True, exist_ok=True)
+        code = old_test.read_text(encoding="utf-8")
+        renames = {old_test.stem: new_test.stem, change.old_path.stem: change.path.stem}
+        new_test.write_text(rename_test_class(code, renames, new_test, test_dir), encoding="utf-8")
+        old_test.unlink()
+        print(f"[INFO] Umbenennung erkannt, Test verschoben: {old_test} -> {new_test}")
+        moved.append(change)
+    return moved
+
+
+def rename_test_class(
+    code: str,
+    renames: Dict[str, str],
+    new_test: pathlib.Path,
+    test_dir: pathlib.Path,
+) -> str:
+    """Ersetzt Test- und Klassennamen (alt -> neu) und setzt das package passend zum neuen Pfad."""
+    for old_name, new_name in renames.items():
+        code = re.sub(rf"\b{re.escape(old_name)}\b", new_name, code)
+    package = ".".join(new_test.parent.resolve().relative_to(test_dir.resolve()).parts)
+    declaration = f"package {package};" if package else ""
+    if re.search(r"^\s*package\s+[\w.]+\s*;", code, re.MULTILINE):
+        return re.sub(r"^(\s*)package\s+[\w.]+\s*;", lambda m: m.group(1) + declaration, code, count=1, flags=re.MULTILINE)
+    return f"{declaration}\n\n{code}" if declaration else code
+
+
+def deleted_sources(changes: List[JavaChange]) -> List[pathlib.Path]:
+    return [c.path for c in changes if c.status == "D"]
+
+
+def generation_targets(changes: List[JavaChange]) -> List[pathlib.Path]:
+    """Dateien, für die (neu) generiert werden muss: neu, geändert oder umbenannt."""
+    return [c.path for c in changes if c.status in ("A", "M", "R") and c.path.exists()]
+
+
+def delete_orphaned_tests(
+    changes: List[JavaChange],
+    source_dir: pathlib.Path,
+    test_dir: pathlib.Path,
+) -> List[pathlib.Path]:
+    """Löscht die konventionellen Testdateien gelöschter Klassen (nur für vollständig generierte Testbäume)."""
+    removed: List[pathlib.Path] = []
+    for deleted in deleted_sources(changes):
+        try:
+            orphan = test_path_for(deleted, source_dir, test_dir)
+        except ValueError:
+            continue
+        if orphan.exists():
+            orphan.unlink()
+            print(f"[OK] Verwaisten Test entfernt: {orphan}")
+            removed.append(orphan)
+    return removed
@@ -0,0 +1,821 @@
+#!/usr/bin/env python3
+"""
+java_index.py
+
+Persistenter, strukturierter Index über die Java-Quellen des Projekts.
+
+Jede Datei wird genau einmal geparst; das Ergebnis (JavaFileRecord) enthält:
+- package
+- alle Klassen der Datei (auch mehrere Top-Level-Typen und innere Klassen)
+  mit Annotationen und Methodensignaturen
+- Mapping-Methoden mit HTTP-Verb, vollständigem Pfad (inkl. Klassen-Präfix aus
+  @RequestMapping) und den @RequestParam-Namen/Defaults
+
+Unterstützt @GetMapping/@PostMapping/@PutMapping/@DeleteMapping/@PatchMapping
+sowie @RequestMapping mit value/path und method= (einzeln oder als Array).
+@RequestMapping ohne method= wird als Verb "REQUEST" geführt (alle Methoden).
+
+Der Index liegt als JSON auf der Platte (Default: $AI_JAVA_INDEX oder
+.ai-cache/java-index.json). Ein Eintrag wird ohne Lesen der Datei
+wiederverwendet, solange mtime und Größe passen; sonst wird der Inhalt gehasht
+und nur bei geändertem Hash neu geparst.
+
+Der Parser ist bewusst leichtgewichtig (kein vollständiger Java-Parser):
+Kommentare werden entfernt, String-Literale bei der Klammerzählung übersprungen.
+Für Generatoren, die einzelne Handler auswerten, gibt es zusätzlich
+method_source(), method_parameters(), return_expressions() und map_of_entries().
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import pathlib
+import re
+import tempfile
+import textwrap
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import source_files
+
+# Erhöhen, wenn sich der Parser ändert – alte Einträge werden dann neu geparst
+INDEX_VERSION = 1
+DEFAULT_INDEX_PATH = ".ai-cache/java-index.json"
+
+MAPPING_VERBS = {
+    "GetMapping": "GET",
+    "PostMapping": "POST",
+    "PutMapping": "PUT",
+    "DeleteMapping": "DELETE",
+    "PatchMapping": "PATCH",
+}
+CONTROLLER_ANNOTATIONS = ("Controller", "RestController")
+
+
+# ---------- Datenmodell ----------
+
+@dataclass
+class RequestParam:
+    name: str
+    default: Optional[str] = None
+    required: bool = True
+
+
+@dataclass
+class Endpoint:
+    http_method: str  # GET, POST, ... oder REQUEST (@RequestMapping ohne method=)
+    path: str
+    handler: str  # Klasse.methode
+    params: List[RequestParam] = field(default_factory=list)
+
+
+@dataclass
+class JavaMethod:
+    name: str
+    signature: str
+    annotations: List[str] = field(default_factory=list)
+
+
+@dataclass
+class JavaClass:
+    name: str  # bei inneren Klassen Outer.Inner
+    kind: str  # class | interface | enum | record
+    annotations: List[str] = field(default_factory=list)
+    base_paths: List[str] = field(default_factory=list)
+    methods: List[JavaMethod] = field(default_factory=list)
+    endpoints: List[Endpoint] = field(default_factory=list)
+    public: bool = False
+    top_level: bool = True
+
+    @property
+    def is_controller(self) -> bool:
+        return any(a in CONTROLLER_ANNOTATIONS for a in self.annotations)
+
+    @property
+    def is_rest_controller(self) -> bool:
+        return "RestController" in self.annotations
+
+
+@dataclass
+class JavaFileRecord:
+    path: str
+    package: str
+    classes: List[JavaClass] = field(default_factory=list)
+    sha256: str = ""
+    mtime_ns: int = 0
+    size: int = 0
+
+    @property
+    def stem(self) -> str:
+        return pathlib.PurePath(self.path).stem
+
+    @property
+    def primary_class(self) -> Optional[JavaClass]:
+        """Der Top-Level-Typ, der zum Dateinamen passt, sonst der erste Top-Level-Typ."""
+        top = [c for c in self.classes if c.top_level]
+        for c in top:
+            if c.name == self.stem:
+                return c
+        return top[0] if top else None
+
+    @property
+    def is_controller(self) -> bool:
+        return any(c.is_controller for c in self.classes)
+
+    @property
+    def is_rest_controller(self) -> bool:
+        return any(c.is_rest_controller for c in self.classes)
+
+    @property
+    def is_bootstrap(self) -> bool:
+        """@SpringBootApplication oder Hauptklasse *Application – dafür werden keine Tests generiert."""
+        if any("SpringBootApplication" in c.annotations for c in self.classes):
+            return True
+        primary = self.primary_class
+        return primary is not None and primary.name.endswith("Application")
+
+    @property
+    def endpoints(self) -> List[Endpoint]:
+        return [e for c in self.classes for e in c.endpoints]
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "JavaFileRecord":
+        classes = []
+        for c in data.get("classes") or []:
+            endpoints = [
+                Endpoint(
+                    e["http_method"],
+                    e["path"],
+                    e["handler"],
+                    [RequestParam(**p) for p in e.get("params") or []],
+                )
+                for e in c.get("endpoints") or []
+            ]
+            methods = [JavaMethod(**m) for m in c.get("methods") or []]
+            classes.append(
+                JavaClass(
+                    name=c["name"],
+                    kind=c["kind"],
+                    annotations=list(c.get("annotations") or []),
+                    base_paths=list(c.get("base_paths") or []),
+                    methods=methods,
+                    endpoints=endpoints,
+                    public=bool(c.get("public")),
+                    top_level=bool(c.get("top_level", True)),
+                )
+            )
+        return cls(
+            path=data["path"],
+            package=data.get("package", ""),
+            classes=classes,
+            sha256=data.get("sha256", ""),
+            mtime_ns=int(data.get("mtime_ns") or 0),
+            size=int(data.get("size") or 0),
+        )
+
+
+# ---------- Lexikalische Hilfen ----------
+
+def strip_comments(code: str) -> str:
+    """Entfernt // und /* */ Kommentare, String- und Char-Literale bleiben unverändert."""
+    out: List[str] = []
+    i, n = 0, len(code)
+    while i < n:
+        ch = code[i]
+        if code.startswith('"""', i):
+            end = code.find('"""', i + 3)
+            end = n if end < 0 else end + 3
+            out.append(code[i:end])
+            i = end
+        elif ch in "\"'":
+            end = _skip_literal(code, i)
+            out.append(code[i:end])
+            i = end
+        elif code.startswith("//", i):
+            end = code.find("\n", i)
+            i = n if end < 0 else end
+        elif code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            # Zeilenumbrüche erhalten, damit Fehlermeldungen/Zeilen grob stimmen
+            chunk = code[i:n if end < 0 else end + 2]
+            out.append("\n" * chunk.count("\n") or " ")
+            i = n if end < 0 else end + 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def _skip_literal(code: str, i: int) -> int:
+    """Index direkt hinter dem String-/Char-Literal, das bei i beginnt."""
+    quote = code[i]
+    j = i + 1
+    while j < len(code):
+        if code[j] == "\\":
+            j += 2
+            continue
+        if code[j] == quote or code[j] == "\n":
+            return j + 1
+        j += 1
+    return j
+
+
+def _matching(code: str, i: int) -> int:
+    """Index der zur Klammer bei i passenden schließenden Klammer (oder len(code))."""
+    pairs = {"(": ")", "{": "}", "[": "]"}
+    stack = [pairs[code[i]]]
+    j = i + 1
+    while j < len(code) and stack:
+        ch = code[j]
+        if ch in "\"'":
+            j = _skip_literal(code, j)
+            continue
+        if ch in pairs:
+            stack.append(pairs[ch])
+        elif stack and ch == stack[-1]:
+            stack.pop()
+            if not stack:
+                return j
+        j += 1
+    return len(code)
+
+
+def _split_top_level(text: str, sep: str = ",") -> List[str]:
+    """Teilt an sep, aber nicht innerhalb von Klammern, Generics oder Literalen."""
+    parts: List[str] = []
+    depth = 0
+    start = 0
+    j = 0
+    while j < len(text):
+        ch = text[j]
+        if ch in "\"'":
+            j = _skip_literal(text, j)
+            continue
+        if ch in "({[<":
+            depth += 1
+        elif ch in ")}]>":
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(text[start:j])
+            start = j + 1
+        j += 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+_ANNOTATION_RE = re.compile(r"@\s*([A-Za-z_][\w.]*)")
+
+
+def _parse_annotations(header: str) -> Tuple[List[Tuple[str, str]], str]:
+    """
+    Liest alle Annotationen aus header. Rückgabe: [(Name, Argumenttext)] und
+    der header ohne Annotationen (Modifier, Typ, Name, Parameter).
+    """
+    annotations: List[Tuple[str, str]] = []
+    rest: List[str] = []
+    i = 0
+    while i < len(header):
+        m = _ANNOTATION_RE.match(header, i)
+        if m is None or m.group(1) == "interface":
+            if header[i] in "\"'":
+                end = _skip_literal(header, i)
+                rest.append(header[i:end])
+                i = end
+                continue
+            if header[i] == "(":
+                end = _matching(header, i)
+                rest.append(header[i:end + 1])
+                i = end + 1
+                continue
+            rest.append(header[i])
+            i += 1
+            continue
+        name = m.group(1).rsplit(".", 1)[-1]
+        j = m.end()
+        while j < len(header) and header[j].isspace():
+            j += 1
+        args = ""
+        if j < len(header) and header[j] == "(":
+            end = _matching(header, j)
+            args = header[j + 1:end]
+            j = end + 1
+        annotations.append((name, args))
+        rest.append(" ")
+        i = j
+    return annotations, "".join(rest)
+
+
+def _annotation_values(args: str) -> Dict[str, List[str]]:
+    """
+    Argumente einer Annotation als {Attribut: [Werte]}. Ein Argument ohne Namen
+    zählt als "value". Strings werden entquotet, Enum-Konstanten auf den
+    letzten Namensteil reduziert (RequestMethod.GET -> GET).
+    """
+    result: Dict[str, List[str]] = {}
+    for part in _split_top_level(args):
+        m = re.match(r"^([A-Za-z_]\w*)\s*=(?!=)\s*(.*)$", part, re.DOTALL)
+        key, raw = (m.group(1), m.group(2)) if m else ("value", part)
+        result[key] = _literal_values(raw)
+    return result
+
+
+def _literal_values(raw: str) -> List[str]:
+    raw = raw.strip()
+    if raw.startswith("{") and raw.endswith("}"):
+        values: List[str] = []
+        for item in _split_top_level(raw[1:-1]):
+            values.extend(_literal_values(item))
+        return values
+    strings = re.findall(r'"((?:\\.|[^"\\])*)"', raw)
+    if strings:
+        return ["".join(strings)]  # "a" + "b" -> ab
+    return [raw.rsplit(".", 1)[-1]] if raw else []
+
+
+def _join_paths(prefix: str, path: str) -> str:
+    return "/" + "/".join(p.strip("/") for p in (prefix, path) if p.strip("/"))
+
+
+# ---------- Parser ----------
+
+def _members(body: str) -> Iterable[Tuple[str, Optional[str]]]:
+    """
+    Zerlegt einen Klassenrumpf in Member: (Kopf, Block-Inhalt oder None).
+    Felder/abstrakte Methoden enden mit ';', Methoden/innere Klassen mit einem Block.
+    """
+    start = 0
+    j = 0
+    while j < len(body):
+        ch = body[j]
+        if ch in "\"'":
+            j = _skip_literal(body, j)
+            continue
+        if ch == "(" or ch == "[":
+            j = _matching(body, j) + 1
+            continue
+        if ch == ";":
+            yield body[start:j], None
+            start = j = j + 1
+            continue
+        if ch == "{":
+            end = _matching(body, j)
+            header = body[start:j]
+            _, bare = _parse_annotations(header)
+            head = bare.split("(", 1)[0]
+            if "=" in head or re.search(r"\bnew\s", head):
+                # Feld mit Array-/Lambda-/anonymem Initialisierer: bis zum ';' weiterlesen
+                j = end + 1
+                continue
+            yield header, body[j + 1:end]
+            start = j = end + 1
+            continue
+        j += 1
+    if body[start:].strip():
+        yield body[start:], None
+
+
+_TYPE_DECL_RE = re.compile(r"\b(class|interface|enum|record)\s+([A-Za-z_]\w*)")
+_METHOD_RE = re.compile(r"([A-Za-z_]\w*)\s*\($")
+_RETURN_RE = re.compile(r"\breturn\b")
+_MAP_OF_RE = re.compile(r"^(?:java\.util\.)?Map\.(of|ofEntries)\s*\((.*)\)$", re.DOTALL)
+_MAP_ENTRY_RE = re.compile(r"^(?:(?:java\.util\.)?Map\.)?entry\s*\((.*)\)$", re.DOTALL)
+_STRING_LITERAL_RE = re.compile(r'^"((?:\\.|[^"\\])*)"$')
+
+
+def _parse_type(
+    header: str,
+    body: str,
+    outer: Optional[str],
+    classes: List[JavaClass],
+) -> None:
+    annotations, bare = _parse_annotations(header)
+    m = _TYPE_DECL_RE.search(bare)
+    if m is None:
+        return
+    kind, simple = m.group(1), m.group(2)
+    name = f"{outer}.{simple}" if outer else simple
+    ann_names = [a for a, _ in annotations]
+    base_paths = [""]
+    for a, args in annotations:
+        if a == "RequestMapping":
+            values = _annotation_values(args)
+            base_paths = values.get("value") or values.get("path") or [""]
+    cls = JavaClass(
+        name=name,
+        kind=kind,
+        annotations=ann_names,
+        base_paths=[p for p in base_paths if p],
+        public=bool(re.search(r"\bpublic\b", bare[: m.start()])),
+        top_level=outer is None,
+    )
+    classes.append(cls)
+
+    if kind == "enum":
+        # Enum-Konstanten bis zum ersten ';' überspringen
+        j = 0
+        while j < len(body):
+            ch = body[j]
+            if ch in "\"'":
+                j = _skip_literal(body, j)
+                continue
+            if ch in "({":
+                j = _matching(body, j) + 1
+                continue
+            if ch == ";":
+                break
+            j += 1
+        body = body[j + 1:] if j < len(body) else ""
+
+    for member_header, block in _members(body):
+        member_annotations, member_bare = _parse_annotations(member_header)
+        if _TYPE_DECL_RE.search(member_bare) and block is not None:
+            _parse_type(member_header, block, name, classes)
+            continue
+        method = _parse_method(member_header, member_annotations, member_bare)
+        if method is None:
+            continue
+        cls.methods.append(method)
+        _add_endpoints(cls, method, member_annotations, member_header)
+
+
+def _parse_method(
+    header: str,
+    annotations: List[Tuple[str, str]],
+    bare: str,
+) -> Optional[JavaMethod]:
+    bare = bare.strip()
+    paren = bare.find("(")
+    if paren < 0 or "=" in bare[:paren]:
+        return None
+    m = _METHOD_RE.search(bare[: paren + 1])
+    if m is None:
+        return None
+    name = m.group(1)
+    if name in ("if", "for", "while", "switch", "catch", "synchronized", "return", "new"):
+        return None
+    signature = " ".join(bare.split())
+    return JavaMethod(name=name, signature=signature, annotations=[a for a, _ in annotations])
+
+
+def _method_params(header: str) -> List[RequestParam]:
+    """@RequestParam-Parameter aus dem Methodenkopf (inkl. Annotationen)."""
+    # Parameterliste: erste Klammer auf oberster Ebene, die nicht zu einer Annotation gehört
+    params_text = ""
+    j = 0
+    while j < len(header):
+        ch = header[j]
+        if ch in "\"'":
+            j = _skip_literal(header, j)
+            continue
+        if ch == "@":
+            m = _ANNOTATION_RE.match(header, j)
+            j = m.end() if m else j + 1
+            while j < len(header) and header[j].isspace():
+                j += 1
+            if j < len(header) and header[j] == "(":
+                j = _matching(header, j) + 1
+            continue
+        if ch == "(":
+            end = _matching(header, j)
+            params_text = header[j + 1:end]
+            break
+        j += 1
+
+    params: List[RequestParam] = []
+    for param in _split_top_level(params_text):
+        param_annotations, param_bare = _parse_annotations(param)
+        for a, args in param_annotations:
+            if a != "RequestParam":
+                continue
+            values = _annotation_values(args)
+            words = re.findall(r"[A-Za-z_]\w*", param_bare)
+            name = (values.get("value") or values.get("name") or [words[-1] if words else ""])[0]
+            default = (values.get("defaultValue") or [None])[0]
+            required_values = values.get("required")
+            required = default is None and (not required_values or required_values[0] != "false")
+            params.append(RequestParam(name=name, default=default, required=required))
+    return params
+
+
+def _add_endpoints(
+    cls: JavaClass,
+    method: JavaMethod,
+    annotations: List[Tuple[str, str]],
+    header: str,
+) -> None:
+    for a, args in annotations:
+        if a in MAPPING_VERBS:
+            verbs = [MAPPING_VERBS[a]]
+        elif a == "RequestMapping":
+            verbs = _annotation_values(args).get("method") or ["REQUEST"]
+        else:
+            continue
+        values = _annotation_values(args)
+        paths = values.get("value") or values.get("path") or [""]
+        params = _method_params(header)
+        for prefix in cls.base_paths or [""]:
+            for path in paths:
+                for verb in verbs:
+                    cls.endpoints.append(
+                        Endpoint(
+                            http_method=verb.upper(),
+                            path=_join_paths(prefix, path),
+                            handler=f"{cls.name}.{method.name}",
+                            params=params,
+                        )
+                    )
+
+
+def parse_java(code: str, path: str = "") -> JavaFileRecord:
+    """Parst Java-Quelltext in einen JavaFileRecord (ohne Datei-Metadaten)."""
+    clean = strip_comments(code)
+    package_match = re.search(r"^\s*package\s+([\w.]+)\s*;", clean, re.MULTILINE)
+    record = JavaFileRecord(path=path, package=package_match.group(1) if package_match else "")
+    # package/imports abtrennen – danach nur noch Top-Level-Typen
+    body = re.sub(r"^\s*(package|import)\s[^;]*;", "", clean, flags=re.MULTILINE)
+    for header, block in _members(body):
+        if block is not None:
+            _parse_type(header, block, None, record.classes)
+    return record
+
+
+def method_source(code: str, method_name: str) -> str:
+    """
+    Quelltext (Annotationen, Kopf und Rumpf, ohne Kommentare) der ersten Methode
+    namens method_name – auch in inneren Klassen. Leerer String, falls nicht gefunden.
+    """
+    def _search(body: str) -> str:
+        for header, block in _members(body):
+            if block is None:
+                continue
+            annotations, bare = _parse_annotations(header)
+            if _TYPE_DECL_RE.search(bare):
+                found = _search(block)
+                if found:
+                    return found
+                continue
+            method = _parse_method(header, annotations, bare)
+            if method is not None and method.name == method_name:
+                return textwrap.dedent(header.strip("\n") + "{" + block + "}").strip()
+        return ""
+
+    body = re.sub(r"^\s*(package|import)\s[^;]*;", "", strip_comments(code), flags=re.MULTILINE)
+    return _search(body)
+
+
+def _body_start(method_code: str) -> int:
+    """
+    Index der öffnenden Rumpf-Klammer einer Methode aus method_source(), sonst -1.
+    Klammern in Annotationsargumenten ({"/a", "/b"}) und Parametern werden übersprungen.
+    """
+    j = 0
+    while j < len(method_code):
+        ch = method_code[j]
+        if ch in "\"'":
+            j = _skip_literal(method_code, j)
+            continue
+        if ch == "(":
+            j = _matching(method_code, j) + 1
+            continue
+        if ch == "{":
+            return j
+        j += 1
+    return -1
+
+
+def method_parameters(method_code: str) -> List[Tuple[str, str]]:
+    """(Typ, Name) der Parameter einer Methode aus method_source(); Annotationen entfernt."""
+    start = _body_start(method_code)
+    _, bare = _parse_annotations(method_code[:start] if start >= 0 else method_code)
+    paren = bare.find("(")
+    if paren < 0:
+        return []
+    params: List[Tuple[str, str]] = []
+    for param in _split_top_level(bare[paren + 1:_matching(bare, paren)]):
+        _, param_bare = _parse_annotations(param)
+        words = re.sub(r"\bfinal\b", " ", param_bare).split()
+        if len(words) >= 2:
+            params.append((" ".join(words[:-1]), words[-1]))
+    return params
+
+
+def return_expressions(method_code: str) -> List[str]:
+    """
+    Ausdrücke aller return-Anweisungen im Rumpf einer Methode aus method_source()
+    (auch aus Lambdas/anonymen Klassen – Aufrufer sollten das konservativ auswerten).
+    """
+    start = _body_start(method_code)
+    if start < 0:
+        return []
+    body = method_code[start + 1:_matching(method_code, start)]
+    result: List[str] = []
+    j = 0
+    while j < len(body):
+        ch = body[j]
+        if ch in "\"'":
+            j = _skip_literal(body, j)
+            continue
+        m = _RETURN_RE.match(body, j)
+        if m is None or (j > 0 and (body[j - 1].isalnum() or body[j - 1] == "_")):
+            j += 1
+            continue
+        k = m.end()
+        while k < len(body) and body[k] != ";":
+            if body[k] in "\"'":
+                k = _skip_literal(body, k)
+            elif body[k] in "({[":
+                k = _matching(body, k) + 1
+            else:
+                k += 1
+        result.append(" ".join(body[m.end():k].split()))
+        j = k + 1
+    return result
+
+
+def map_of_entries(expr: str) -> Optional[List[Tuple[str, str]]]:
+    """(Key, Wert-Ausdruck) aus Map.of(...)/Map.ofEntries(Map.entry(...)) mit String-Keys, sonst None."""
+    expr = expr.strip()
+    m = _MAP_OF_RE.match(expr)
+    if m is None or _matching(expr, m.start(2) - 1) != len(expr) - 1:
+        return None  # z.B. Map.of(...).toString()
+    args = _split_top_level(m.group(2))
+    if m.group(1) == "ofEntries":
+        pairs = []
+        for arg in args:
+            e = _MAP_ENTRY_RE.match(arg)
+            if e is None:
+                return None
+            pairs.extend(_split_top_level(e.group(1)))
+        args = pairs
+    if len(args) % 2:
+        return None
+    entries = []
+    for key, value in zip(args[::2], args[1::2]):
+        k = _STRING_LITERAL_RE.match(key)
+        if k is None:
+            return None
+        entries.append((k.group(1), value))
+    return entries
+
+
+# ---------- Persistenter Index ----------
+
+class JavaIndex:
+    """Dateibasierter Index (thread-safe). Schlüssel: Pfad relativ zum Arbeitsverzeichnis."""
+
+    def __init__(self, path: pathlib.Path, enabled: bool = True) -> None:
+        self.path = path
+        self.enabled = enabled
+        self.entries: Dict[str, dict] = {}
+        self.parsed = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: pathlib.Path, enabled: bool = True) -> "JavaIndex":
+        index = cls(path, enabled)
+        if not enabled or not path.exists():
+            return index
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Java-Index {path} nicht lesbar ({e}), wird neu aufgebaut.")
+            return index
+        if data.get("version") == INDEX_VERSION:
+            index.entries = dict(data.get("entries") or {})
+        return index
+
+    @staticmethod
+    def key_for(source_file: pathlib.Path) -> str:
+        resolved = source_file.resolve()
+        try:
+            return resolved.relative_to(pathlib.Path.cwd().resolve()).as_posix()
+        except ValueError:
+            return resolved.as_posix()
+
+    def get(self, source_file: pathlib.Path, code: Optional[str] = None) -> Optional[JavaFileRecord]:
+        """
+        Record für source_file. code kann übergeben werden, wenn die Datei ohnehin
+        schon gelesen wurde. None, wenn die Datei nicht lesbar ist.
+        """
+        key = self.key_for(source_file)
+        try:
+            stat = source_file.stat()
+        except OSError:
+            return None
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+            with self._lock:
+                self.reused += 1
+            return JavaFileRecord.from_dict(entry)
+
+        if code is None:
+            try:
+                code = source_file.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                return None
+        sha256 = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        if entry and entry.get("sha256") == sha256:
+            record = JavaFileRecord.from_dict(entry)
+            with self._lock:
+                self.reused += 1
+        else:
+            record = parse_java(code, key)
+            record.sha256 = sha256
+            with self._lock:
+                self.parsed += 1
+        record.mtime_ns = stat.st_mtime_ns
+        record.size = stat.st_size
+        if self.enabled:
+            with self._lock:
+                self.entries[key] = asdict(record)
+                self._dirty = True
+        return record
+
+    def scan(self, source_dir: pathlib.Path) -> List[JavaFileRecord]:
+        """
+        Alle *.java unterhalb von source_dir (ohne target/, node_modules/ und ignorierte
+        Pfade, siehe source_files.py); Einträge gelöschter Dateien fallen heraus.
+        """
+        records: List[JavaFileRecord] = []
+        seen = set()
+        for source_file in source_files.iter_source_files(source_dir, (".java",)):
+            record = self.get(source_file.path)
+            if record is not None:
+                records.append(record)
+                seen.add(record.path)
+        prefix = self.key_for(source_dir).rstrip("/") + "/"
+        with self._lock:
+            stale = [k for k in self.entries if k.startswith(prefix) and k not in seen]
+            for k in stale:
+                del self.entries[k]
+            if stale:
+                self._dirty = True
+        return records
+
+    def save(self) -> None:
+        with self._lock:
+            if not self.enabled or not self._dirty:
+                return
+            data = {"version": INDEX_VERSION, "entries": {k: self.entries[k] for k in sorted(self.entries)}}
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=str(self.path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def summary(self) -> str:
+        return f"[INFO] Java-Index: {self.parsed} Datei(en) geparst, {self.reused} aus dem Index ({self.path})"
+
+
+# ---------------------------------------------------------
+# Prozessweite Konfiguration für die Skripte
+# ---------------------------------------------------------
+_index = JavaIndex(pathlib.Path(os.environ.get("AI_JAVA_INDEX") or DEFAULT_INDEX_PATH), enabled=False)
+
+
+def add_index_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("Java-Index")
+    group.add_argument(
+        "--java-index",
+        default=os.environ.get("AI_JAVA_INDEX") or DEFAULT_INDEX_PATH,
+        help=f"Datei für den persistenten Java-Index (Default: $AI_JAVA_INDEX oder {DEFAULT_INDEX_PATH})",
+    )
+    group.add_argument(
+        "--no-java-index",
+        action="store_true",
+        help="Index nicht lesen/schreiben (jede Datei wird neu geparst)",
+    )
+
+
+def configure_from_args(args: argparse.Namespace, save: bool = True) -> JavaIndex:
+    """
+    Lädt den prozessweiten Index; er wird beim Beenden des Skripts gespeichert
+    (mit save=False, z.B. bei --dry-run, nur gelesen).
+    """
+    global _index
+    _index = JavaIndex.load(pathlib.Path(args.java_index), enabled=not args.no_java_index)
+    atexit.register(_finish, _index, save)
+    return _index
+
+
+def _finish(index: JavaIndex, save: bool = True) -> None:
+    if save:
+        index.save()
+    if index.parsed or index.reused:
+        print(index.summary())
+
+
+def get_index() -> JavaIndex:
+    return _index
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+llm_hedge.py
+
+Hedged Requests (--hedge) gegen einzelne Nachzügler unter den Modellaufrufen.
+
+- Pro Deployment werden die Latenzen der letzten Aufrufe gemerkt. Ist ein
+  Aufruf nach dem --hedge-percentile-Perzentil dieser Latenzen (mindestens
+  --hedge-min-delay Sekunden) noch nicht zurück, geht ein Duplikat raus – an
+  dasselbe Deployment oder an --hedge-deployment.
+- Die erste gültige Antwort gewinnt, der Verlierer wird abgebrochen: ein
+  gestreamter Aufruf (--stream) schließt sofort seine Verbindung; ein normaler
+  Aufruf, der schon auf die Antwort wartet, läuft im Hintergrund zu Ende und
+  wird verworfen; ein noch nicht gesendeter Aufruf entfällt.
+- Obergrenzen: höchstens --hedge-max-rate der Aufrufe bekommen ein Duplikat,
+  und sobald die verworfenen Tokens --hedge-max-wasted-tokens erreichen, wird
+  nicht mehr gehedged.
+- Jeder Hedge ist ein Telemetrie-Datensatz "hedge"; am Ende des Laufs gibt es
+  eine Zusammenfassung (Anteil, Gewinner, verworfene Tokens).
+
+Solange für ein Deployment weniger als --hedge-min-samples Latenzen vorliegen,
+wird nicht gehedged. Cache und Rate-Limiter bleiben unverändert (beide Anfragen
+laufen durch den Limiter); der Telemetrie-Span des Aufrufers bekommt Status und
+usage der Antwort, die gewonnen hat.
+"""
+
+import argparse
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional
+
+import telemetry
+
+DEFAULT_PERCENTILE = 95.0
+DEFAULT_MIN_DELAY = 5.0
+DEFAULT_MIN_SAMPLES = 5
+DEFAULT_WINDOW = 100
+DEFAULT_MAX_RATE = 0.1
+DEFAULT_MAX_WASTED_TOKENS = 50000
+
+# attempt(deployment, cancel) -> Antworttext; cancel ist None, wenn nicht gehedged wird
+Attempt = Callable[[str, Optional[threading.Event]], str]
+
+
+class Cancelled(RuntimeError):
+    """Ein Versuch wurde abgebrochen, weil der andere schon eine gültige Antwort hatte."""
+
+
+@dataclass
+class _Try:
+    """Ein Versuch (Original oder Duplikat) in einem eigenen Thread mit eigenem Span."""
+
+    deployment: str
+    span: telemetry.CallSpan
+    cancel: threading.Event = field(default_factory=threading.Event)
+    future: Future = field(default_factory=Future)
+    text: Optional[str] = None
+    error: Optional[BaseException] = None
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Hedger:
+    """Prozessweite Hedging-Konfiguration und -Statistik (thread-safe)."""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = DEFAULT_PERCENTILE,
+        min_delay: float = DEFAULT_MIN_DELAY,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        max_rate: float = DEFAULT_MAX_RATE,
+        max_wasted_tokens: int = DEFAULT_MAX_WASTED_TOKENS,
+        deployment: Optional[str] = None,
+        window: int = DEFAULT_WINDOW,
+    ) -> None:
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = max(1, min_samples)
+        self.max_rate = max_rate
+        self.max_wasted_tokens = max_wasted_tokens
+        self.deployment = deployment
+        self.window = window
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.wasted_tokens = 0
+        self._budget_warned = False
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    # ---------- Latenzen ----------
+
+    def observe(self, deployment: str, duration: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(deployment, deque(maxlen=self.window)).append(duration)
+
+    def delay(self, deployment: str) -> Optional[float]:
+        """Wartezeit bis zum Duplikat; None, solange zu wenige Latenzen bekannt sind."""
+        with self._lock:
+            values = list(self._latencies.get(deployment, ()))
+        if len(values) < self.min_samples:
+            return None
+        return max(self.min_delay, _percentile(values, self.percentile / 100.0))
+
+    # ---------- Obergrenzen ----------
+
+    def _budget_left(self) -> bool:
+        if self.max_wasted_tokens <= 0 or self.wasted_tokens < self.max_wasted_tokens:
+            return True
+        if not self._budget_warned:
+            self._budget_warned = True
+            print(f"[WARN] Hedging: {self.wasted_tokens} verworfene Tokens – Budget erschöpft, keine weiteren Duplikate.")
+        return False
+
+    def _may_hedge(self) -> bool:
+        with self._lock:
+            return self._budget_left() and self.hedged < self.max_rate * self.calls
+
+    def _reserve(self) -> bool:
+        with self._lock:
+            if not self._budget_left() or self.hedged >= self.max_rate * self.calls:
+                return False
+            self.hedged += 1
+            return True
+
+    def _waste(self, tokens: int) -> None:
+        with self._lock:
+            self.wasted_tokens += tokens
+
+    # ---------- Aufruf ----------
+
+    def run(
+        self,
+        attempt: Attempt,
+        deployment: str,
+        label: str = "",
+        prompt_tokens: int = 0,
+        valid: Optional[Callable[[str], bool]] = None,
+    ) -> str:
+        """
+        Führt attempt(deployment, cancel) aus, bei Bedarf zusätzlich ein Duplikat.
+        valid(text) entscheidet, ob eine Antwort gewinnen darf (Default: nicht leer);
+        gibt es keine gültige, zählt das Ergebnis des Originals (Text oder Exception).
+        prompt_tokens (geschätzt) dient als Verlust eines abgebrochenen Versuchs ohne usage.
+        """
+        if not self.enabled:
+            return attempt(deployment, None)
+        with self._lock:
+            self.calls += 1
+        wait_s = self.delay(deployment)
+        if wait_s is None or not self._may_hedge():
+            start = time.monotonic()
+            text = attempt(deployment, None)
+            self.observe(deployment, time.monotonic() - start)
+            return text
+
+        valid = valid or (lambda text: bool(text.strip()))
+        primary = self._start(attempt, deployment, label)
+        tries = [primary]
+        if not wait([primary.future], timeout=wait_s)[0] and self._reserve():
+            hedge_deployment = self.deployment or deployment
+            print(f"[INFO] {label}: nach {wait_s:.1f}s keine Antwort, sende Duplikat an {hedge_deployment}.")
+            tries.append(self._start(attempt, hedge_deployment, label))
+
+        winner = self._race(tries, valid)
+        chosen = winner or primary
+        for other in tries:
+            if other is not chosen:
+                self._abandon(other, prompt_tokens)
+        if len(tries) > 1:
+            if winner is tries[1]:
+                with self._lock:
+                    self.hedge_wins += 1
+            telemetry.get_telemetry().event(
+                "hedge",
+                label=label,
+                deployment=deployment,
+                hedge_deployment=tries[1].deployment,
+                delay_s=round(wait_s, 3),
+                winner="hedge" if winner is tries[1] else "primary" if winner is primary else "none",
+            )
+        _adopt(chosen.span)
+        if chosen.error is not None:
+            raise chosen.error
+        return chosen.text or ""
+
+    def _start(self, attempt: Attempt, deployment: str, label: str) -> _Try:
+        """Startet einen Versuch in einem Daemon-Thread (ein verworfener Versuch hält das Prozessende nicht auf)."""
+        current = _Try(deployment, telemetry.CallSpan(label=label, started=time.time(), deployment=deployment))
+
+        def _run() -> None:
+            start = time.monotonic()
+            with telemetry.get_telemetry().bind(current.span):
+                try:
+                    current.text = attempt(deployment, current.cancel)
+                except Exception as e:
+                    current.error = e
+            if current.error is None:
+                self.observe(deployment, time.monotonic() - start)
+            current.future.set_result(current)
+
+        threading.Thread(target=_run, name=f"hedge-{deployment}", daemon=True).start()
+        return current
+
+    @staticmethod
+    def _race(tries: List[_Try], valid: Callable[[str], bool]) -> Optional[_Try]:
+        """Wartet auf die erste gültige Antwort; None, wenn keine gültig ist."""
+        pending = {t.future for t in tries}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                current = future.result()
+                if current.error is None and current.text is not None and valid(current.text):
+                    return current
+        return None
+
+    def _abandon(self, loser: _Try, prompt_tokens: int) -> None:
+        """Bricht einen Versuch ab und verbucht seine Tokens als verworfen (ggf. erst, wenn er fertig ist)."""
+        loser.cancel.set()
+        if loser.future.done():
+            self._waste(_spent(loser, prompt_tokens))
+            return
+        # läuft noch: vorläufig den Prompt anrechnen, nach dem Ende korrigieren
+        self._waste(prompt_tokens)
+        loser.future.add_done_callback(lambda _: self._waste(_spent(loser, prompt_tokens) - prompt_tokens))
+
+    def summary(self) -> str:
+        share = 100.0 * self.hedged / self.calls if self.calls else 0.0
+        budget = f"Budget {self.max_wasted_tokens}" if self.max_wasted_tokens > 0 else "ohne Budget"
+        return (
+            f"[INFO] Hedging: {self.hedged} von {self.calls} Aufruf(en) mit Duplikat ({share:.1f}%, "
+            f"max. {100.0 * self.max_rate:.0f}%), Duplikat schneller: {self.hedge_wins}, "
+            f"verworfene Tokens ~{self.wasted_tokens} ({budget})"
+        )
+
+
+def _spent(current: _Try, prompt_tokens: int) -> int:
+    """Verbrauchte Tokens eines Versuchs: usage, sonst Schätzung (0, wenn nie gesendet)."""
+    span = current.span
+    if span.status is None or span.status >= 400:
+        return 0
+    return (span.prompt_tokens or prompt_tokens) + (span.completion_tokens or 0)
+
+
+def _adopt(span: telemetry.CallSpan) -> None:
+    """
+    Überträgt Deployment, Status, Latenzen und usage des gewählten Versuchs in den
+    Span des Aufrufers (der Cache legt die Antwort unter diesem Deployment ab).
+    """
+    target = telemetry.current_span()
+    if target is None:
+        return
+    for name in ("deployment", "status", "ttfb_s", "ttft_s", "prompt_tokens", "completion_tokens", "cached_tokens"):
+        value = getattr(span, name)
+        if value is not None:
+            setattr(target, name, value)
+    target.retries += span.retries
+
+
+# ---------------------------------------------------------
+# Prozessweite Konfiguration für die Skripte
+# ---------------------------------------------------------
+_hedger = Hedger()
+
+
+def add_hedge_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("Hedged Requests")
+    group.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Langsame Modellaufrufe duplizieren; die erste gültige Antwort gewinnt",
+    )
+    group.add_argument(
+        "--hedge-percentile",
+        type=float,
+        default=DEFAULT_PERCENTILE,
+        help=f"Duplikat, wenn ein Aufruf länger braucht als dieses Perzentil der letzten Latenzen (Default: {DEFAULT_PERCENTILE:g})",
+    )
+    group.add_argument(
+        "--hedge-min-delay",
+        type=float,
+        default=DEFAULT_MIN_DELAY,
+        help=f"Frühestens nach so vielen Sekunden duplizieren (Default: {DEFAULT_MIN_DELAY:g})",
+    )
+    group.add_argument(
+        "--hedge-min-samples",
+        type=int,
+        default=DEFAULT_MIN_SAMPLES,
+        help=f"Erst hedgen, wenn so viele Latenzen des Deployments bekannt sind (Default: {DEFAULT_MIN_SAMPLES})",
+    )
+    group.add_argument(
+        "--hedge-max-rate",
+        type=float,
+        default=DEFAULT_MAX_RATE,
+        help=f"Höchstens dieser Anteil der Aufrufe bekommt ein Duplikat (Default: {DEFAULT_MAX_RATE:g})",
+    )
+    group.add_argument(
+        "--hedge-max-wasted-tokens",
+        type=int,
+        default=DEFAULT_MAX_WASTED_TOKENS,
+        help=f"Keine Duplikate mehr, sobald so viele Tokens verworfen wurden (Default: {DEFAULT_MAX_WASTED_TOKENS}, 0 = unbegrenzt)",
+    )
+    group.add_argument(
+        "--hedge-deployment",
+        default=os.environ.get("AZURE_OPENAI_DEPLOYMENT_HEDGE") or None,
+        help="Deployment für die Duplikate (Default: $AZURE_OPENAI_DEPLOYMENT_HEDGE oder dasselbe wie das Original)",
+    )
+
+
+def configure_from_args(args: argparse.Namespace) -> Hedger:
+    global _hedger
+    _hedger = Hedger(
+        enabled=args.hedge,
+        percentile=args.hedge_percentile,
+        min_delay=args.hedge_min_delay,
+        min_samples=args.hedge_min_samples,
+        max_rate=args.hedge_max_rate,
+        max_wasted_tokens=args.hedge_max_wasted_tokens,
+        deployment=args.hedge_deployment,
+    )
+    if _hedger.enabled:
+        atexit.register(_finish, _hedger)
+    return _hedger
+
+
+def _finish(hedger: Hedger) -> None:
+    if hedger.calls:
+        print(hedger.summary())
+
+
+def get_hedger() -> Hedger:
+    return _hedger
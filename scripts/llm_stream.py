@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+llm_stream.py
+
+Streaming-Modus (--stream) für Chat-Completions über Server-Sent Events.
+
+- Die Antwort wird Stück für Stück gelesen und – falls gewünscht – sofort in
+  eine .partial-Datei geschrieben (z.B. `tail -f docs/architecture.md.partial`).
+- Eine Prüffunktion bewertet den bisherigen Text, solange die ersten
+  --stream-check-tokens Tokens laufen (plus einmal beim Erreichen der Grenze).
+  Ist die Antwort offensichtlich unbrauchbar (z.B. Java-Code statt Markdown,
+  keine Überschrift), wird der Request sofort abgebrochen (StreamRejected),
+  statt auf die vollständige Generierung zu warten.
+- Pro Aufruf wird die Zeit bis zum ersten Token (TTFT) und die Gesamtdauer
+  ausgegeben, am Ende eine Zusammenfassung.
+- Mit --hedge (llm_hedge.py) wird ein verlorener Versuch über ein
+  threading.Event abgebrochen; die Verbindung wird dann sofort geschlossen.
+
+Ein Stream, der nicht mit finish_reason "stop" endet (Tokenlimit, Content-Filter,
+Verbindungsende ohne Abschluss), gilt als unvollständig (StreamIncomplete).
+
+Die Aufrufer nutzen weiterhin ai_cache: abgebrochene Antworten werden nicht gecacht.
+"""
+
+import argparse
+import atexit
+import json
+import pathlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import llm_hedge
+import llm_transport
+import rate_limit
+import telemetry
+
+DEFAULT_CHECK_TOKENS = 200
+
+# check(text, window_reached) -> Grund für den Abbruch oder None
+StreamCheck = Callable[[str, bool], Optional[str]]
+
+
+class StreamRejected(RuntimeError):
+    """Die gestreamte Antwort wurde von der Prüffunktion vorzeitig verworfen."""
+
+    def __init__(self, reason: str, partial: str) -> None:
+        super().__init__(f"Antwort vorzeitig verworfen: {reason}")
+        self.reason = reason
+        self.partial = partial
+
+
+class StreamIncomplete(StreamRejected):
+    """Der Stream endete ohne finish_reason "stop" – die Antwort ist abgeschnitten."""
+
+
+@dataclass
+class StreamResult:
+    text: str
+    ttft: Optional[float]
+    duration: float
+    finish_reason: Optional[str] = None
+
+
+class StreamStats:
+    """Thread-safe Sammlung von TTFT/Dauer aller gestreamten Aufrufe."""
+
+    def __init__(self) -> None:
+        self.ttfts: List[float] = []
+        self.durations: List[float] = []
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def add(self, ttft: Optional[float], duration: float, rejected: bool = False) -> None:
+        with self._lock:
+            if ttft is not None:
+                self.ttfts.append(ttft)
+            self.durations.append(duration)
+            if rejected:
+                self.rejected += 1
+
+    def summary(self) -> str:
+        with self._lock:
+            ttfts = sorted(self.ttfts)
+            calls = len(self.durations)
+            rejected = self.rejected
+        if not ttfts:
+            return f"[INFO] Streaming: {calls} Aufruf(e), kein Token empfangen, {rejected} vorzeitig verworfen"
+        median = ttfts[len(ttfts) // 2]
+        return (
+            f"[INFO] Streaming: {calls} Aufruf(e), TTFT Median {median:.2f}s / Max {ttfts[-1]:.2f}s, "
+            f"{rejected} vorzeitig verworfen"
+        )
+
+
+def _iter_lines(resp: Any):
+    """Zeilen einer gestreamten requests- bzw. httpx-Response als str."""
+    if type(resp).__module__.startswith("httpx"):
+        yield from resp.iter_lines()
+        return
+    for line in resp.iter_lines(decode_unicode=True):
+        yield line if isinstance(line, str) else line.decode("utf-8")
+
+
+def iter_sse_deltas(resp: Any):
+    """
+    Liefert (content_delta, finish_reason) aus einem Chat-Completions-SSE-Stream.
+    Beendet sich bei "data: [DONE]" bzw. Ende des Streams. Schickt der Server
+    ein usage-Feld mit, wird es im aktiven Telemetrie-Span vermerkt.
+    """
+    for line in _iter_lines(resp):
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return
+        try:
+            chunk = json.loads(payload)
+        except ValueError:
+            continue
+        if chunk.get("usage"):
+            telemetry.get_telemetry().record_usage(telemetry.extract_usage(chunk))
+        for choice in chunk.get("choices") or []:
+            delta = (choice.get("delta") or {}).get("content") or ""
+            yield delta, choice.get("finish_reason")
+
+
+class Streamer:
+    """Konfiguration des Streaming-Modus (prozessweit, siehe configure_from_args)."""
+
+    def __init__(self, enabled: bool = False, check_tokens: int = DEFAULT_CHECK_TOKENS) -> None:
+        self.enabled = enabled
+        self.check_tokens = check_tokens
+        self.stats = StreamStats()
+
+    def complete(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        body: Dict[str, Any],
+        read_timeout: float,
+        label: str = "",
+        check: Optional[StreamCheck] = None,
+        partial_path: Optional[pathlib.Path] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> StreamResult:
+        """
+        Streamt eine Chat-Completion. Wirft RuntimeError bei HTTP-Fehlern,
+        StreamRejected, wenn check() die Antwort verwirft, und llm_hedge.Cancelled,
+        sobald cancel gesetzt ist.
+        """
+        start = time.monotonic()
+        resp = llm_transport.get_transport().post_json(
+            url, headers, dict(body, stream=True), read_timeout=read_timeout, stream=True
+        )
+        if resp.status_code >= 400:
+            if hasattr(resp, "read"):
+                resp.read()  # httpx: Body eines gestreamten Fehlers erst lesen
+            raise RuntimeError(f"Azure OpenAI Fehler {resp.status_code}: {resp.text}")
+        # Der Slot des Rate-Limiters gilt, bis der Stream gelesen ist (siehe finally)
+
+        parts: List[str] = []
+        ttft: Optional[float] = None
+        finish_reason: Optional[str] = None
+        window_done = check is None
+        partial = None
+        try:
+            if partial_path is not None:
+                partial_path.parent.mkdir(parents=True, exist_ok=True)
+                partial = partial_path.open("w", encoding="utf-8")
+            for delta, reason in iter_sse_deltas(resp):
+                if cancel is not None and cancel.is_set():
+                    span = telemetry.current_span()
+                    if span is not None:
+                        span.completion_tokens = rate_limit.estimate_tokens("".join(parts))
+                    raise llm_hedge.Cancelled(f"Stream {label} abgebrochen (Duplikat war schneller)")
+                finish_reason = reason or finish_reason
+                if not delta:
+                    continue
+                if ttft is None:
+                    ttft = time.monotonic() - start
+                    span = telemetry.current_span()
+                    if span is not None:
+                        span.ttft_s = round(ttft, 6)
+                parts.append(delta)
+                if partial is not None:
+                    partial.write(delta)
+                    partial.flush()
+                if not window_done:
+                    text = "".join(parts)
+                    window_reached = rate_limit.estimate_tokens(text) >= self.check_tokens
+                    rejection = check(text, window_reached)
+                    if rejection:
+                        self.stats.add(ttft, time.monotonic() - start, rejected=True)
+                        print(f"[WARN] Stream {label} abgebrochen nach {time.monotonic() - start:.1f}s: {rejection}")
+                        raise StreamRejected(rejection, text)
+                    window_done = window_reached
+        finally:
+            resp.close()
+            rate_limit.get_limiter().release()
+            if partial is not None:
+                partial.close()
+                partial_path.unlink(missing_ok=True)
+
+        text = "".join(parts)
+        if finish_reason != "stop":
+            self.stats.add(ttft, time.monotonic() - start, rejected=True)
+            reason = f"kein Abschluss (finish_reason={finish_reason or 'fehlt'})"
+            print(f"[WARN] Stream {label} unvollständig: {reason}, {len(text)} Zeichen verworfen.")
+            raise StreamIncomplete(reason, text)
+        if check is not None and not window_done:
+            # kurze Antwort: Grenze nie erreicht, einmal abschließend prüfen
+            rejection = check(text, True)
+            if rejection:
+                self.stats.add(ttft, time.monotonic() - start, rejected=True)
+                raise StreamRejected(rejection, text)
+        duration = time.monotonic() - start
+        self.stats.add(ttft, duration)
+        ttft_text = f"{ttft:.2f}s" if ttft is not None else "–"
+        print(f"[INFO] Stream {label}: erstes Token nach {ttft_text}, fertig nach {duration:.1f}s ({len(text)} Zeichen)")
+        return StreamResult(text=text, ttft=ttft, duration=duration, finish_reason=finish_reason)
+
+
+# ---------------------------------------------------------
+# Prozessweite Konfiguration für die Skripte
+# ---------------------------------------------------------
+_streamer = Streamer()
+
+
+def add_stream_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("Streaming")
+    group.add_argument(
+        "--stream",
+        action="store_true",
+        help="Antworten per SSE streamen, unbrauchbare Antworten früh abbrechen und TTFT ausgeben",
+    )
+    group.add_argument(
+        "--stream-check-tokens",
+        type=int,
+        default=DEFAULT_CHECK_TOKENS,
+        help=f"Innerhalb so vieler Tokens muss die Antwort plausibel aussehen (Default: {DEFAULT_CHECK_TOKENS})",
+    )
+
+
+def configure_from_args(args: argparse.Namespace) -> Streamer:
+    global _streamer
+    _streamer = Streamer(enabled=args.stream, check_tokens=args.stream_check_tokens)
+    if _streamer.enabled:
+        atexit.register(_finish, _streamer)
+    return _streamer
+
+
+def _finish(streamer: Streamer) -> None:
+    if streamer.stats.durations:
+        print(streamer.stats.summary())
+
+
+def get_streamer() -> Streamer:
+    return _streamer
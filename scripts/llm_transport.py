@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+llm_transport.py
+
+Gemeinsamer HTTP-Transport für alle Generator-Skripte.
+
+- Eine persistente Session pro Prozess (Keep-Alive): TCP- und TLS-Handshake
+  werden nur einmal pro Verbindung bezahlt, nicht bei jedem Aufruf.
+- Verbindungspool mit einstellbarer Größe (--http-pool-size), damit parallele
+  Worker (--jobs) nicht auf eine Verbindung warten oder ständig neue öffnen.
+- Getrennte Timeouts für Verbindungsaufbau (--connect-timeout) und Lesen der
+  Antwort (Default je Aufrufstelle, überschreibbar mit --read-timeout).
+- Optional HTTP/2 (--http2) über httpx, sofern httpx[http2] installiert ist;
+  dann werden alle Aufrufe über eine multiplexte Verbindung geschickt.
+  Ohne httpx wird mit Warnung auf HTTP/1.1 (requests) zurückgefallen.
+
+Jeder POST läuft durch den Rate-Limiter (rate_limit.py): Budgets, Retry-After,
+Backoff bei 429/5xx und adaptive Parallelität.
+
+Für die OpenAI-SDK-Skripte liefert sdk_http_client() einen passend
+konfigurierten httpx.Client (das SDK nutzt httpx ohnehin).
+"""
+
+import argparse
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import rate_limit
+
+DEFAULT_POOL_SIZE = int(os.environ.get("AI_HTTP_POOL_SIZE") or "16")
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("AI_HTTP_CONNECT_TIMEOUT") or "10")
+
+
+class Transport:
+    """Prozessweiter HTTP-Client mit Verbindungspool (thread-safe)."""
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: Optional[float] = None,
+        http2: bool = False,
+    ) -> None:
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.http2 = http2
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _read_timeout(self, default: float) -> float:
+        return self.read_timeout if self.read_timeout is not None else default
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self._build_client()
+            return self._client
+
+    def _build_client(self):
+        if self.http2:
+            try:
+                import httpx
+
+                return httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_connections=self.pool_size,
+                        max_keepalive_connections=self.pool_size,
+                    ),
+                )
+            except ImportError:
+                print("[WARN] --http2 benötigt 'httpx[http2]' – falle auf HTTP/1.1 (requests) zurück.")
+                self.http2 = False
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        return session
+
+    def post_json(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        body: Dict[str, Any],
+        read_timeout: float,
+        stream: bool = False,
+    ):
+        """
+        Schickt einen JSON-POST über die gemeinsame Session.
+        Rückgabe ist ein requests.Response bzw. httpx.Response (beide mit
+        status_code, text, headers und json()). Mit stream=True wird der Body
+        nicht vorab gelesen (für SSE, siehe llm_stream.py); der Aufrufer muss
+        die Response schließen und bei Erfolg (status < 400) den Slot des
+        Rate-Limiters mit rate_limit.get_limiter().release() freigeben.
+        """
+        client = self._get_client()
+        data = json.dumps(body)
+        read = self._read_timeout(read_timeout)
+
+        def _send():
+            if self.http2:
+                import httpx
+
+                timeout = httpx.Timeout(read, connect=self.connect_timeout)
+                request = client.build_request("POST", url, headers=headers, content=data, timeout=timeout)
+                return client.send(request, stream=stream)
+            return client.post(url, headers=headers, data=data, timeout=(self.connect_timeout, read), stream=stream)
+
+        estimated = rate_limit.estimate_tokens(data) + rate_limit.DEFAULT_COMPLETION_TOKENS
+        return rate_limit.get_limiter().call(_send, estimated, hold=stream)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        read_timeout: float,
+        data: Optional[Dict[str, str]] = None,
+        files: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Allgemeiner Request (z.B. GET oder Multipart-Upload für die Batch-API) über
+        dieselbe Session und denselben Rate-Limiter wie post_json.
+        """
+        client = self._get_client()
+        read = self._read_timeout(read_timeout)
+
+        def _send():
+            if self.http2:
+                import httpx
+
+                timeout = httpx.Timeout(read, connect=self.connect_timeout)
+                return client.request(method, url, headers=headers, data=data, files=files, timeout=timeout)
+            return client.request(
+                method, url, headers=headers, data=data, files=files, timeout=(self.connect_timeout, read)
+            )
+
+        return rate_limit.get_limiter().call(_send, 1)
+
+    def sdk_http_client(self, read_timeout: float = 90.0):
+        """httpx.Client für das OpenAI-SDK mit denselben Pool-/Timeout-Einstellungen."""
+        import httpx
+
+        kwargs: Dict[str, Any] = {}
+        if self.http2:
+            kwargs["http2"] = True
+        return httpx.Client(
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+            ),
+            timeout=httpx.Timeout(self._read_timeout(read_timeout), connect=self.connect_timeout),
+            **kwargs,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+# ---------------------------------------------------------
+# Prozessweite Konfiguration für die Skripte
+# ---------------------------------------------------------
+_transport = Transport()
+
+
+def add_transport_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("HTTP-Transport")
+    group.add_argument(
+        "--http-pool-size",
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+        help=f"Maximale Anzahl offener Keep-Alive-Verbindungen (Default: $AI_HTTP_POOL_SIZE oder {DEFAULT_POOL_SIZE})",
+    )
+    group.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help=f"Timeout für den Verbindungsaufbau in Sekunden (Default: {DEFAULT_CONNECT_TIMEOUT:g})",
+    )
+    group.add_argument(
+        "--read-timeout",
+        type=float,
+        default=None,
+        help="Timeout für das Lesen der Antwort in Sekunden (Default: je Skript, 90 bzw. 180)",
+    )
+    group.add_argument(
+        "--http2",
+        action="store_true",
+        help="HTTP/2-Multiplexing über httpx verwenden (benötigt httpx[http2])",
+    )
+
+
+def configure_from_args(args: argparse.Namespace) -> Transport:
+    """Initialisiert den prozessweiten Transport aus den CLI-Argumenten."""
+    global _transport
+    _transport.close()
+    _transport = Transport(
+        pool_size=args.http_pool_size,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        http2=args.http2,
+    )
+    return _transport
+
+
+def get_transport() -> Transport:
+    return _transport
@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+"""
+mock_openai_server.py
+
+Lokaler, OpenAI-/Azure-OpenAI-kompatibler Ersatzserver für Benchmarks und
+Regressionstests der Generator-Skripte – ganz ohne Azure-Zugang.
+
+Unterstützte Endpunkte (Pfad-Präfix und api-version werden ignoriert):
+- .../chat/completions   (Azure: /openai/deployments/<d>/chat/completions, OpenAI: /v1/chat/completions)
+  inkl. "stream": true (Server-Sent Events)
+- .../responses          (Responses API, z.B. generate_tests_openai2.py), inkl. Streaming
+- .../files, .../files/<id>/content, .../batches, .../batches/<id>  (Batch-API, sofort "completed")
+- GET /__stats, POST /__reset  (Zähler für Benchmarks)
+
+Die Antworten sind deterministische Platzhalter passend zur Aufgabe (JUnit-Test,
+Playwright-Test, Architektur-Doku, JSON-Zusammenfassung), erkannt am System-Prompt.
+
+Fehler- und Lastsimulation:
+- --latency SPEC         fixed:MS | uniform:MIN:MAX | normal:MEAN:SD | exp:MEAN (Millisekunden)
+- --error-429-rate P     Anteil der Aufrufe mit 429 (+ Retry-After, --retry-after)
+- --error-5xx-rate P     Anteil der Aufrufe mit 500/502/503
+- --fence-rate P         Anteil der Antworten in ```-Codeblöcken
+- --truncate-rate P      Anteil der Antworten, die nach der Hälfte abbrechen
+- --stream-delay-ms MS   Pause zwischen zwei Stream-Chunks (langsames Streaming)
+- --straggler-rate P     Anteil der Aufrufe, die zusätzlich --straggler-ms warten
+                         (Nachzügler für --hedge, siehe llm_hedge.py)
+- --weak-deployment NAME Antworten dieses Deployments (mehrfach angebbar) brechen mit
+                         --weak-rate nach der Hälfte ab – ein "schwaches" Modell für
+                         das Eskalieren in model_router.py; /__stats zählt je Deployment
+
+Prompt-Caching wie beim Anbieter: ein Präfix aus System-Prompt + Prompt gilt ab
+1024 Tokens (in Schritten von 128 Tokens) als gecacht, sobald ein früherer Aufruf
+denselben Präfix hatte; gemeldet als usage.prompt_tokens_details.cached_tokens
+(Responses API: usage.input_tokens_details.cached_tokens). Abschaltbar mit
+--no-prompt-cache.
+
+Aufruf:
+    python scripts/mock_openai_server.py --port 18080 --latency normal:300:100 --error-429-rate 0.05
+    export AZURE_OPENAI_ENDPOINT=http://127.0.0.1:18080 AZURE_OPENAI_API_KEY=x AZURE_OPENAI_DEPLOYMENT=mock
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+
+# ---------- Platzhalter-Antworten ----------
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def fake_junit(prompt: str) -> str:
+    # Sammelanfrage: je "Abschnitt: <Schlüssel>" ein markierter Abschnitt
+    parts = re.split(r"^Abschnitt:[ \t]*(\S+)[ \t]*$", prompt, flags=re.MULTILINE)
+    if len(parts) > 1:
+        return "\n".join(
+            f"===== BEGIN {key} =====\n{_fake_junit_class(chunk)}===== END {key} ====="
+            for key, chunk in zip(parts[1::2], parts[2::2])
+        ) + "\n"
+    return _fake_junit_class(prompt)
+
+
+def _fake_junit_class(prompt: str) -> str:
+    # Nur der Teil nach dem letzten "Quell-Code:" (davor stehen Beispiele im Präfix)
+    source = prompt.rsplit("Quell-Code:", 1)[-1]
+    package = re.search(r"^\s*package\s+([\w.]+)\s*;", source, re.MULTILINE)
+    cls = re.search(r"\bclass\s+(\w+)", source)
+    name = cls.group(1) if cls else "Generated"
+    header = f"package {package.group(1)};\n\n" if package else ""
+    return (
+        f"{header}import org.junit.jupiter.api.Test;\n\n"
+        "import static org.junit.jupiter.api.Assertions.*;\n\n"
+        f"class {name}Test {{\n\n"
+        "    @Test\n"
+        "    void createsInstance() {\n"
+        f"        assertNotNull(new {name}());\n"
+        "    }\n"
+        "}\n"
+    )
+
+
+def fake_playwright(prompt: str) -> str:
+    paths = sorted(set(re.findall(r"\"(/api/[\w/-]*)\"", prompt)))[:50]
+    tests = [
+        "import { test, expect } from '@playwright/test';\n",
+        "test('hackathon2025 UI: initial render and REST interaction', async ({ page }) => {\n"
+        "  await page.goto('http://localhost:8080/');\n"
+        "  expect(await page.title()).toContain('Hackathon');\n"
+        "});\n",
+    ]
+    for path in paths:
+        tests.append(
+            f"test('API {path}', async ({{ request }}) => {{\n"
+            f"  const response = await request.get('http://localhost:8080{path}');\n"
+            "  expect(response.status()).toBe(200);\n"
+            "});\n"
+        )
+    return "\n".join(tests)
+
+
+def fake_summary(prompt: str) -> str:
+    path = re.search(r"^File:\s*(\S+)", prompt, re.MULTILINE)
+    return json.dumps(
+        {
+            "path": path.group(1) if path else "",
+            "role": "class",
+            "purpose": "Placeholder summary from the mock server.",
+            "endpoints": [],
+            "dependencies": [],
+            "notes": [],
+        }
+    )
+
+
+def fake_architecture_doc(prompt: str) -> str:
+    sections = [
+        "Introduction",
+        "Architecture Overview",
+        "Components and Responsibilities",
+        "UI and REST Interaction",
+        "Testing Strategy",
+        "CI/CD and AI-Assisted Workflows",
+        "Limitations and Next Steps",
+    ]
+    filler = (
+        "This paragraph was produced by the local mock server. It describes the component "
+        "in general terms so that the document has a realistic length and structure. "
+    )
+    parts = ["# Hackathon2025 – Architecture\n"]
+    for section in sections:
+        parts.append(f"## {section}\n\n" + filler * 6 + "\n")
+    return "\n".join(parts)
+
+
+def fake_completion(system_prompt: str, prompt: str) -> Tuple[str, str]:
+    """(Art, Text) passend zum System-Prompt."""
+    system = system_prompt.lower()
+    if "playwright" in system:
+        return "playwright", fake_playwright(prompt)
+    if "summarize single source files" in system:
+        return "summary", fake_summary(prompt)
+    if "architect" in system:
+        return "docs", fake_architecture_doc(prompt)
+    if "junit" in system:
+        return "junit", fake_junit(prompt)
+    return "other", "OK"
+
+
+# ---------- Prompt-Cache ----------
+
+# Wie Azure OpenAI/OpenAI: Cache ab 1024 Tokens, danach in Schritten von 128 Tokens
+PREFIX_CACHE_MIN_TOKENS = 1024
+PREFIX_CACHE_STEP_TOKENS = 128
+_CHARS_PER_TOKEN = 4
+
+
+class PrefixCache:
+    """Merkt sich Hashes aller Präfix-Stufen bisheriger Prompts (nur Länge + Hash, kein Text)."""
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.seen: Set[str] = set()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.seen.clear()
+
+    def lookup(self, system_prompt: str, prompt: str) -> int:
+        """Anzahl gecachter Prompt-Tokens für diesen Aufruf; trägt alle Stufen danach ein."""
+        if not self.enabled:
+            return 0
+        data = (system_prompt + prompt).encode("utf-8")
+        min_chars = PREFIX_CACHE_MIN_TOKENS * _CHARS_PER_TOKEN
+        step_chars = PREFIX_CACHE_STEP_TOKENS * _CHARS_PER_TOKEN
+        digest = hashlib.sha1()
+        pos = 0
+        cached = 0
+        keys = []
+        for end in range(min_chars, len(data) + 1, step_chars):
+            digest.update(data[pos:end])
+            pos = end
+            keys.append((end, digest.hexdigest()))
+        with self.lock:
+            for end, key in keys:
+                if key not in self.seen:
+                    break
+                cached = end // _CHARS_PER_TOKEN
+            self.seen.update(key for _, key in keys)
+        return cached
+
+
+# ---------- Server ----------
+
+class MockConfig:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.latency = args.latency
+        self.error_429_rate = args.error_429_rate
+        self.error_5xx_rate = args.error_5xx_rate
+        self.retry_after = args.retry_after
+        self.fence_rate = args.fence_rate
+        self.truncate_rate = args.truncate_rate
+        self.weak_deployments = set(args.weak_deployment or ())
+        self.weak_rate = args.weak_rate
+        self.stream_delay = args.stream_delay_ms / 1000.0
+        self.straggler_rate = args.straggler_rate
+        self.straggler_ms = args.straggler_ms
+        self.stream_chunk_chars = args.stream_chunk_chars
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+
+    def roll(self, probability: float) -> bool:
+        with self.lock:
+            return self.random.random() < probability
+
+    def delay(self) -> float:
+        kind, _, rest = self.latency.partition(":")
+        values = [float(v) for v in rest.split(":") if v]
+        with self.lock:
+            if kind == "uniform":
+                ms = self.random.uniform(values[0], values[1])
+            elif kind == "normal":
+                ms = self.random.gauss(values[0], values[1])
+            elif kind == "exp":
+                ms = self.random.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+            else:
+                ms = values[0] if values else 0.0
+            if self.random.random() < self.straggler_rate:
+                ms += self.straggler_ms
+        return max(0.0, ms) / 1000.0
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.requests = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+            self.by_status: Dict[str, int] = {}
+            self.by_kind: Dict[str, int] = {}
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.cached_tokens = 0
+            self.by_deployment: Dict[str, int] = {}
+
+    def count_deployment(self, deployment: str) -> None:
+        with self.lock:
+            self.by_deployment[deployment] = self.by_deployment.get(deployment, 0) + 1
+
+    def add(
+        self,
+        status: int,
+        kind: str,
+        bytes_in: int,
+        bytes_out: int,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_tokens: int = 0,
+    ) -> None:
+        with self.lock:
+            self.requests += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.by_status[str(status)] = self.by_status.get(str(status), 0) + 1
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cached_tokens += cached_tokens
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "by_status": dict(self.by_status),
+                "by_kind": dict(self.by_kind),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cached_tokens": self.cached_tokens,
+                "by_deployment": dict(self.by_deployment),
+            }
+
+
+class BatchStore:
+    """Minimaler Batch-API-Ersatz: Jobs werden beim Anlegen sofort abgearbeitet."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, dict] = {}
+
+    def add_file(self, content: bytes) -> str:
+        file_id = f"file-{uuid.uuid4().hex[:16]}"
+        with self.lock:
+            self.files[file_id] = content
+        return file_id
+
+    def create_batch(self, input_file_id: str) -> dict:
+        with self.lock:
+            content = self.files.get(input_file_id, b"")
+        out_lines = []
+        for line in content.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            messages = item["body"]["messages"]
+            _, text = fake_completion(messages[0]["content"], messages[-1]["content"])
+            out_lines.append(
+                json.dumps(
+                    {
+                        "custom_id": item["custom_id"],
+                        "response": {"status_code": 200, "body": {"choices": [{"message": {"role": "assistant", "content": text}}]}},
+                        "error": None,
+                    }
+                )
+            )
+        output_file_id = self.add_file(("\n".join(out_lines) + "\n").encode("utf-8"))
+        batch = {
+            "id": f"batch-{uuid.uuid4().hex[:16]}",
+            "object": "batch",
+            "status": "completed",
+            "input_file_id": input_file_id,
+            "output_file_id": output_file_id,
+            "error_file_id": None,
+            "request_counts": {"total": len(out_lines), "completed": len(out_lines), "failed": 0},
+        }
+        with self.lock:
+            self.batches[batch["id"]] = batch
+        return batch
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: MockConfig
+    stats: Stats
+    batches: BatchStore
+    prefix_cache: PrefixCache
+
+    def log_message(self, fmt: str, *args) -> None:
+        pass  # kein Log pro Request
+
+    # ---------- Hilfen ----------
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, payload: dict, kind: str, bytes_in: int, extra_headers: Optional[Dict[str, str]] = None, usage: Tuple[int, ...] = (0, 0)) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+        if kind != "control":  # /__stats und /__reset zählen nicht mit
+            self.stats.add(status, kind, bytes_in, len(data), *usage)
+
+    def _inject_error(self, kind: str, bytes_in: int) -> bool:
+        if self.config.roll(self.config.error_429_rate):
+            self._send_json(
+                429,
+                {"error": {"code": "429", "message": "Rate limit exceeded (mock)."}},
+                kind,
+                bytes_in,
+                {"Retry-After": f"{self.config.retry_after:g}", "x-ratelimit-remaining-requests": "0"},
+            )
+            return True
+        if self.config.roll(self.config.error_5xx_rate):
+            with self.config.lock:
+                status = self.config.random.choice((500, 502, 503))
+            self._send_json(status, {"error": {"code": str(status), "message": "Server error (mock)."}}, kind, bytes_in)
+            return True
+        return False
+
+    def _shape(self, text: str, deployment: str = "") -> str:
+        if self.config.roll(self.config.fence_rate):
+            text = f"```\n{text}\n```"
+        truncate = self.config.truncate_rate
+        if deployment in self.config.weak_deployments:
+            truncate = max(truncate, self.config.weak_rate)
+        if self.config.roll(truncate):
+            text = text[: len(text) // 2]
+        return text
+
+    def _stream(self, events, kind: str, bytes_in: int, usage: Tuple[int, ...]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sent = 0
+        try:
+            for event in events:
+                chunk = event.encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.flush()
+                sent += len(chunk)
+                if self.config.stream_delay:
+                    time.sleep(self.config.stream_delay)
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client hat abgebrochen (z.B. frühe Ablehnung im Streaming-Modus)
+        self.stats.add(200, kind, bytes_in, sent, *usage)
+
+    def _pieces(self, text: str):
+        size = max(1, self.config.stream_chunk_chars)
+        for i in range(0, len(text), size):
+            yield text[i:i + size]
+
+    # ---------- Routing ----------
+
+    def do_GET(self) -> None:
+        path = urlparse(self.path).path
+        if path == "/__stats":
+            self._send_json(200, self.stats.as_dict(), "control", 0)
+            return
+        m = re.search(r"/files/([\w-]+)/content$", path)
+        if m:
+            with self.batches.lock:
+                content = self.batches.files.get(m.group(1))
+            if content is None:
+                self._send_json(404, {"error": {"message": "file not found"}}, "batch", 0)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            self.stats.add(200, "batch", 0, len(content))
+            return
+        m = re.search(r"/batches/([\w-]+)$", path)
+        if m:
+            with self.batches.lock:
+                batch = self.batches.batches.get(m.group(1))
+            if batch is None:
+                self._send_json(404, {"error": {"message": "batch not found"}}, "batch", 0)
+            else:
+                self._send_json(200, batch, "batch", 0)
+            return
+        self._send_json(404, {"error": {"message": f"unknown path {path}"}}, "unknown", 0)
+
+    def do_POST(self) -> None:
+        path = urlparse(self.path).path
+        raw = self._read_body()
+        if path == "/__reset":
+            self.stats.reset()
+            self.prefix_cache.reset()
+            self._send_json(200, {"ok": True}, "control", 0)
+            return
+        if path.endswith("/files"):
+            self._handle_file_upload(raw)
+            return
+        if path.endswith("/batches"):
+            body = json.loads(raw or b"{}")
+            self._send_json(200, self.batches.create_batch(body.get("input_file_id", "")), "batch", len(raw))
+            return
+        if path.endswith("/chat/completions"):
+            self._handle_chat(json.loads(raw or b"{}"), len(raw))
+            return
+        if path.endswith("/responses"):
+            self._handle_responses(json.loads(raw or b"{}"), len(raw))
+            return
+        self._send_json(404, {"error": {"message": f"unknown path {path}"}}, "unknown", len(raw))
+
+    def _handle_file_upload(self, raw: bytes) -> None:
+        message = BytesParser(policy=policy.HTTP).parsebytes(
+            b"Content-Type: " + (self.headers.get("Content-Type") or "").encode("latin-1") + b"\r\n\r\n" + raw
+        )
+        content = b""
+        for part in message.iter_parts():
+            if part.get_param("name", header="content-disposition") == "file":
+                content = part.get_payload(decode=True) or b""
+        file_id = self.batches.add_file(content)
+        self._send_json(200, {"id": file_id, "object": "file", "purpose": "batch", "status": "processed"}, "batch", len(raw))
+
+    def _handle_chat(self, body: dict, bytes_in: int) -> None:
+        messages = body.get("messages") or []
+        system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        prompt = messages[-1].get("content", "") if messages else ""
+        kind, text = fake_completion(system, prompt)
+        if self._inject_error(kind, bytes_in):
+            return
+        time.sleep(self.config.delay())
+        match = re.search(r"/deployments/([^/]+)/", self.path)
+        model = (match.group(1) if match else body.get("model")) or "mock"
+        self.stats.count_deployment(model)
+        text = self._shape(text, model)
+        usage = (_estimate_tokens(system + prompt), _estimate_tokens(text), self.prefix_cache.lookup(system, prompt))
+
+        if body.get("stream"):
+            def events():
+                for piece in self._pieces(text):
+                    chunk = {"object": "chat.completion.chunk", "model": model, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield f"data: {json.dumps({'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+                yield "data: [DONE]\n\n"
+
+            self._stream(events(), kind, bytes_in, usage)
+            return
+
+        payload = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": usage[0],
+                "completion_tokens": usage[1],
+                "total_tokens": usage[0] + usage[1],
+                "prompt_tokens_details": {"cached_tokens": usage[2]},
+            },
+        }
+        self._send_json(200, payload, kind, bytes_in, usage=usage)
+
+    def _handle_responses(self, body: dict, bytes_in: int) -> None:
+        system = body.get("instructions") or ""
+        raw_input = body.get("input") or ""
+        if isinstance(raw_input, list):
+            texts = []
+            for item in raw_input:
+                content = item.get("content") if isinstance(item, dict) else item
+                if isinstance(content, list):
+                    texts.extend(c.get("text", "") for c in content if isinstance(c, dict))
+                elif isinstance(content, str):
+                    if isinstance(item, dict) and item.get("role") in ("system", "developer"):
+                        system += content
+                    else:
+                        texts.append(content)
+            prompt = "\n".join(texts)
+        else:
+            prompt = str(raw_input)
+        kind, text = fake_completion(system, prompt)
+        if self._inject_error(kind, bytes_in):
+            return
+        time.sleep(self.config.delay())
+        self.stats.count_deployment(body.get("model") or "mock")
+        text = self._shape(text, body.get("model") or "mock")
+        usage = (_estimate_tokens(system + prompt), _estimate_tokens(text), self.prefix_cache.lookup(system, prompt))
+        response_id = f"resp_{uuid.uuid4().hex[:12]}"
+        response = {
+            "id": response_id,
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": "completed",
+            "model": body.get("model") or "mock",
+            "output": [
+                {
+                    "id": f"msg_{uuid.uuid4().hex[:12]}",
+                    "type": "message",
+                    "role": "assistant",
+                    "status": "completed",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}],
+                }
+            ],
+            "usage": {
+                "input_tokens": usage[0],
+                "output_tokens": usage[1],
+                "total_tokens": usage[0] + usage[1],
+                "input_tokens_details": {"cached_tokens": usage[2]},
+            },
+        }
+
+        if body.get("stream"):
+            def events():
+                for piece in self._pieces(text):
+                    delta = {"type": "response.output_text.delta", "delta": piece, "output_index": 0, "content_index": 0}
+                    yield f"event: response.output_text.delta\ndata: {json.dumps(delta)}\n\n"
+                yield f"event: response.completed\ndata: {json.dumps({'type': 'response.completed', 'response': response})}\n\n"
+
+            self._stream(events(), kind, bytes_in, usage)
+            return
+        self._send_json(200, response, kind, bytes_in, usage=usage)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lokaler OpenAI-/Azure-OpenAI-Ersatzserver für Benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:MS | uniform:MIN:MAX | normal:MEAN:SD | exp:MEAN")
+    parser.add_argument("--error-429-rate", type=float, default=0.0)
+    parser.add_argument("--error-5xx-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After bei 429 in Sekunden")
+    parser.add_argument("--fence-rate", type=float, default=0.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--stream-delay-ms", type=float, default=0.0)
+    parser.add_argument("--straggler-rate", type=float, default=0.0, help="Anteil der Aufrufe mit --straggler-ms Zusatzlatenz")
+    parser.add_argument("--straggler-ms", type=float, default=5000.0)
+    parser.add_argument("--weak-deployment", action="append", help="Deployment, dessen Antworten (mit --weak-rate) abbrechen")
+    parser.add_argument("--weak-rate", type=float, default=1.0)
+    parser.add_argument("--stream-chunk-chars", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-prompt-cache", action="store_true", help="Kein simuliertes Prompt-Caching (cached_tokens immer 0)")
+    args = parser.parse_args()
+
+    Handler.config = MockConfig(args)
+    Handler.stats = Stats()
+    Handler.batches = BatchStore()
+    Handler.prefix_cache = PrefixCache(enabled=not args.no_prompt_cache)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(f"[INFO] Mock-Server lauscht auf http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
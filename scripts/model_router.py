@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+model_router.py
+
+Verteilt Modellaufrufe nach Größe und Art der Eingabe auf gestaffelte Deployments
+und eskaliert bei unbrauchbaren Antworten auf die nächstgrößere Stufe.
+
+Stufen (jeweils nur, wenn das Deployment konfiguriert ist):
+- small    $AZURE_OPENAI_DEPLOYMENT_SMALL   (schnell/günstig, z.B. gpt-4o-mini)
+- default  $AZURE_OPENAI_DEPLOYMENT         (wie bisher)
+- large    $AZURE_OPENAI_DEPLOYMENT_LARGE   (stärkstes Modell)
+
+Ohne SMALL/LARGE geht alles wie bisher an AZURE_OPENAI_DEPLOYMENT.
+
+Regeln (route()):
+- large, wenn die Eingabe mindestens --route-large-tokens Tokens oder
+  --route-large-methods Methoden hat,
+- small, wenn sie höchstens --route-small-tokens Tokens und
+  --route-small-methods Methoden hat und keine "schwere" Annotation trägt
+  (@Service, @Transactional, @Repository, ... siehe COMPLEX_ANNOTATIONS),
+- sonst default. Fehlt die gewählte Stufe, wird die nächste vorhandene genommen.
+
+Eskalation (escalate()): Die Aufrufer fragen bei unbrauchbarem Ergebnis
+(Doku laut looks_like_bad_doc, leerer/kaputter Testcode, Compilerfehler bei
+--verify) die nächsthöhere Stufe an. Gespeicherte Ergebnisse gelten als aktuell,
+wenn sie mit der gerouteten oder einer höheren Stufe erzeugt wurden (accepts()).
+
+Jede Entscheidung landet als Datensatz "route" (Label, Stufe, Deployment, Grund,
+ggf. eskaliert von) in der Telemetrie; am Ende zeigt eine Tabelle je Stufe
+Aufrufe, Latenz, Tokens und – mit --route-prices – geschätzte Kosten. Damit
+lassen sich die Schwellwerte nachjustieren.
+
+Der Rate-Limiter (rate_limit.py) bleibt prozessweit einer für alle Stufen.
+"""
+
+import argparse
+import atexit
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import telemetry
+
+TIERS = ("small", "default", "large")
+TIER_ENV = {
+    "small": "AZURE_OPENAI_DEPLOYMENT_SMALL",
+    "default": "AZURE_OPENAI_DEPLOYMENT",
+    "large": "AZURE_OPENAI_DEPLOYMENT_LARGE",
+}
+DEFAULT_SMALL_TOKENS = 600
+DEFAULT_SMALL_METHODS = 4
+DEFAULT_LARGE_TOKENS = 4000
+DEFAULT_LARGE_METHODS = 25
+# Klassen mit diesen Annotationen haben meist Abhängigkeiten/Seiteneffekte -> nie "small"
+COMPLEX_ANNOTATIONS = ("Service", "Transactional", "Repository", "Entity", "Configuration", "Aspect", "Component")
+
+
+@dataclass(frozen=True)
+class RouteInput:
+    """Merkmale einer Eingabe, nach denen geroutet wird."""
+
+    tokens: int
+    methods: int = 0
+    annotations: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_record(cls, tokens: int, record) -> "RouteInput":
+        """Aus einem java_index.JavaFileRecord (Methoden und Annotationen aller Klassen)."""
+        if record is None:
+            return cls(tokens)
+        methods = sum(len(c.methods) for c in record.classes)
+        annotations = tuple(sorted({a for c in record.classes for a in c.annotations}))
+        return cls(tokens, methods, annotations)
+
+
+@dataclass(frozen=True)
+class Route:
+    tier: str
+    deployment: str
+    reason: str = ""
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        deployments: Dict[str, str],
+        small_tokens: int = DEFAULT_SMALL_TOKENS,
+        small_methods: int = DEFAULT_SMALL_METHODS,
+        large_tokens: int = DEFAULT_LARGE_TOKENS,
+        large_methods: int = DEFAULT_LARGE_METHODS,
+        prices: Optional[Dict[str, Tuple[float, float]]] = None,
+    ) -> None:
+        self.deployments = {tier: deployments[tier] for tier in TIERS if deployments.get(tier)}
+        self.small_tokens = small_tokens
+        self.small_methods = small_methods
+        self.large_tokens = large_tokens
+        self.large_methods = large_methods
+        self.prices = prices or {}
+        self.decisions: Dict[str, int] = {}
+        self.escalations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "ModelRouter":
+        return cls({tier: os.environ.get(env, "") for tier, env in TIER_ENV.items()}, **kwargs)
+
+    @property
+    def enabled(self) -> bool:
+        """Nur mit mehr als einer Stufe wird tatsächlich geroutet."""
+        return len(self.deployments) > 1
+
+    def tier_of(self, deployment: str) -> Optional[str]:
+        for tier, name in self.deployments.items():
+            if name == deployment:
+                return tier
+        return None
+
+    def _available(self, wanted: str) -> Optional[str]:
+        """wanted, sonst die nächste vorhandene Stufe (zuerst Richtung default)."""
+        if wanted in self.deployments:
+            return wanted
+        for tier in ("default", "large", "small"):
+            if tier in self.deployments:
+                return tier
+        return None
+
+    def route(self, features: RouteInput, label: str = "", record: bool = True) -> Route:
+        """Stufe für eine Eingabe; record=False, wenn noch offen ist, ob der Aufruf überhaupt nötig ist."""
+        if features.tokens >= self.large_tokens or features.methods >= self.large_methods:
+            wanted = "large"
+            reason = f"{features.tokens} Tokens, {features.methods} Methoden"
+        elif (
+            features.tokens <= self.small_tokens
+            and features.methods <= self.small_methods
+            and not set(features.annotations) & set(COMPLEX_ANNOTATIONS)
+        ):
+            wanted = "small"
+            reason = f"{features.tokens} Tokens, {features.methods} Methoden"
+        else:
+            wanted = "default"
+            heavy = sorted(set(features.annotations) & set(COMPLEX_ANNOTATIONS))
+            reason = f"{features.tokens} Tokens, {features.methods} Methoden" + (f", @{', @'.join(heavy)}" if heavy else "")
+        tier = self._available(wanted)
+        route = Route(tier or "default", self.deployments.get(tier, ""), reason)
+        if record:
+            self.record(route, label)
+        return route
+
+    def highest(self, routes: Iterable[Route]) -> Route:
+        """Stärkste der Stufen, z.B. für eine Sammelanfrage aus mehreren Klassen."""
+        return max(routes, key=lambda r: TIERS.index(r.tier))
+
+    def escalate(self, route: Route, reason: str, label: str = "") -> Optional[Route]:
+        """Nächsthöhere vorhandene Stufe oder None, wenn route schon die höchste ist."""
+        for tier in TIERS[TIERS.index(route.tier) + 1:]:
+            if tier in self.deployments:
+                escalated = Route(tier, self.deployments[tier], reason)
+                with self._lock:
+                    self.escalations[route.tier] = self.escalations.get(route.tier, 0) + 1
+                if self.enabled:
+                    print(f"[INFO] {label}: eskaliere von {route.tier} auf {tier} ({reason}).")
+                self.record(escalated, label, escalated_from=route.tier)
+                return escalated
+        return None
+
+    def accepts(self, route: Route, deployment: str) -> bool:
+        """Ergebnis von deployment ist für route gut genug (gleiche oder höhere Stufe)."""
+        tier = self.tier_of(deployment)
+        if tier is None:
+            return False
+        return TIERS.index(tier) >= TIERS.index(route.tier)
+
+    def accepted_deployments(self, route: Route) -> List[str]:
+        return [self.deployments[t] for t in TIERS[TIERS.index(route.tier):] if t in self.deployments]
+
+    def record(self, route: Route, label: str, escalated_from: Optional[str] = None) -> None:
+        """Entscheidung zählen und als Telemetrie-Datensatz "route" ablegen."""
+        with self._lock:
+            self.decisions[route.tier] = self.decisions.get(route.tier, 0) + 1
+        fields = {"label": label, "tier": route.tier, "deployment": route.deployment, "reason": route.reason}
+        if escalated_from:
+            fields["escalated_from"] = escalated_from
+        telemetry.get_telemetry().event("route", **fields)
+
+    def summary(self, calls: Iterable[telemetry.CallSpan]) -> str:
+        """Tabelle je Stufe: Entscheidungen, Eskalationen, Aufrufe, Latenz, Tokens, Kosten."""
+        per_tier: Dict[str, List[telemetry.CallSpan]] = {}
+        for span in calls:
+            if span.cache == "hit":
+                continue
+            per_tier.setdefault(self.tier_of(span.deployment or "") or "?", []).append(span)
+        lines = ["[INFO] Modell-Routing:"]
+        lines.append(
+            f"  {'Stufe':<8} {'Deployment':<22} {'Routen':>6} {'Eskal.':>6} {'Aufrufe':>7} "
+            f"{'p50 [s]':>8} {'Prompt':>9} {'Compl.':>8} {'Kosten':>9}"
+        )
+        for tier in [t for t in TIERS if t in self.deployments] + (["?"] if "?" in per_tier else []):
+            spans = per_tier.get(tier, [])
+            durations = sorted(s.duration_s for s in spans)
+            p50 = durations[len(durations) // 2] if durations else 0.0
+            prompt = sum(s.prompt_tokens or 0 for s in spans)
+            completion = sum(s.completion_tokens or 0 for s in spans)
+            price = self.prices.get(tier)
+            cost = f"{(prompt * price[0] + completion * price[1]) / 1e6:.4f}" if price else "-"
+            lines.append(
+                f"  {tier:<8} {self.deployments.get(tier, '-'):<22} {self.decisions.get(tier, 0):>6} "
+                f"{self.escalations.get(tier, 0):>6} {len(spans):>7} {p50:>8.2f} {prompt:>9} {completion:>8} {cost:>9}"
+            )
+        return "\n".join(lines)
+
+
+def parse_prices(value: str) -> Dict[str, Tuple[float, float]]:
+    """"small=0.15/0.6,default=2.5/10" -> {tier: (Preis je 1M Prompt-Tokens, je 1M Completion-Tokens)}."""
+    prices: Dict[str, Tuple[float, float]] = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        try:
+            tier, rest = part.split("=", 1)
+            prompt_price, completion_price = rest.split("/", 1)
+            if tier not in TIERS:
+                raise ValueError(tier)
+            prices[tier] = (float(prompt_price), float(completion_price))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"ungültige Preisangabe: {part!r} (Format: stufe=prompt/completion)")
+    return prices
+
+
+# ---------------------------------------------------------
+# Prozessweite Konfiguration für die Skripte
+# ---------------------------------------------------------
+_router: Optional[ModelRouter] = None
+
+
+def add_routing_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("Modell-Routing ($AZURE_OPENAI_DEPLOYMENT_SMALL / _LARGE)")
+    group.add_argument(
+        "--route-small-tokens",
+        type=int,
+        default=DEFAULT_SMALL_TOKENS,
+        help=f"Eingaben bis zu so vielen Tokens gehen an die kleine Stufe (Default: {DEFAULT_SMALL_TOKENS})",
+    )
+    group.add_argument(
+        "--route-small-methods",
+        type=int,
+        default=DEFAULT_SMALL_METHODS,
+        help=f"... und höchstens so vielen Methoden (Default: {DEFAULT_SMALL_METHODS})",
+    )
+    group.add_argument(
+        "--route-large-tokens",
+        type=int,
+        default=DEFAULT_LARGE_TOKENS,
+        help=f"Eingaben ab so vielen Tokens gehen an die große Stufe (Default: {DEFAULT_LARGE_TOKENS})",
+    )
+    group.add_argument(
+        "--route-large-methods",
+        type=int,
+        default=DEFAULT_LARGE_METHODS,
+        help=f"... ebenso ab so vielen Methoden (Default: {DEFAULT_LARGE_METHODS})",
+    )
+    group.add_argument(
+        "--route-prices",
+        type=parse_prices,
+        default=parse_prices(os.environ.get("AI_ROUTE_PRICES", "")),
+        metavar="STUFE=P/C,...",
+        help="Preise je 1M Prompt-/Completion-Tokens für die Kostenschätzung, z.B. small=0.15/0.6,default=2.5/10 "
+        "(Default: $AI_ROUTE_PRICES)",
+    )
+
+
+def configure_from_args(args: argparse.Namespace) -> ModelRouter:
+    global _router
+    _router = ModelRouter.from_env(
+        small_tokens=args.route_small_tokens,
+        small_methods=args.route_small_methods,
+        large_tokens=args.route_large_tokens,
+        large_methods=args.route_large_methods,
+        prices=args.route_prices,
+    )
+    if _router.enabled:
+        print(f"[INFO] Modell-Routing aktiv: {', '.join(f'{t}={d}' for t, d in _router.deployments.items())}")
+        atexit.register(_finish, _router)
+    return _router
+
+
+def _finish(router: ModelRouter) -> None:
+    print(router.summary(telemetry.get_telemetry().calls))
+
+
+def get_router() -> ModelRouter:
+    """Der konfigurierte Router; ohne configure_from_args() einer aus der Umgebung mit Default-Schwellen."""
+    global _router
+    if _router is None:
+        _router = ModelRouter.from_env()
+    return _router
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+orchestrator.py
+
+Führt JUnit-Tests, Playwright-Tests und Architektur-Doku in EINEM Prozess aus
+(statt drei Workflows mit je eigenem Start, Scan, Verbindungspool und Rate-Limit):
+
+    python scripts all --jobs 6
+    python scripts all --only tests,docs
+
+- Das Projektmodell (Java-Dateien unter src/main/java samt Java-Index-Records)
+  wird einmal geladen; alle drei Pipelines arbeiten auf denselben Handles.
+- Alle Modellaufrufe sind Arbeitseinheiten in einer gemeinsamen Prioritäts-Queue
+  auf einer asyncio-Event-Loop. --jobs Worker-Coroutinen nehmen jeweils die
+  wichtigste Einheit und führen sie im gemeinsamen Thread-Pool aus (die
+  HTTP-Aufrufe selbst bleiben blockierend, siehe llm_transport.py). Transport
+  (ein Verbindungspool) und Rate-Limiter sind ohnehin prozessweit und werden
+  damit von allen Pipelines geteilt.
+- Priorität nach kritischem Pfad: zuerst die Map-Aufrufe der Doku, denn danach
+  folgt noch der lange Reduce-Aufruf (dieser bekommt ebenfalls Vorrang), dann
+  die JUnit-Aufrufe (längster Prompt zuerst), zuletzt die Playwright-Einheiten.
+- Die Doku wird immer per Map-Reduce erzeugt; --verify, --since, --batch und
+  --shard gibt es nur in den einzelnen Kommandos.
+
+Am Ende erscheint je Pipeline die Laufzeit; die Telemetrie (--telemetry) enthält
+alle Aufrufe des Prozesses.
+"""
+
+import argparse
+import asyncio
+import itertools
+import pathlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import ai_cache
+import common
+import context_packer
+import generate_docs_with_azure_openai as docs
+import generate_tests_with_azure_openai as tests
+import generate_ui_tests_with_azure_openai as ui
+import java_index
+import llm_hedge
+import llm_stream
+import llm_transport
+import model_router
+import rate_limit
+import source_files
+import telemetry
+
+PIPELINES = ("docs", "tests", "ui-tests")
+
+# Kleinere Zahl = früher; innerhalb einer Stufe entscheidet der zweite Wert
+PRIORITY_DOCS = 0
+PRIORITY_TESTS = 1
+PRIORITY_UI = 2
+
+
+# ---------- Projektmodell ----------
+
+@dataclass
+class ProjectModel:
+    """Einmal gescannte Java-Quellen des Projekts (Handles + Index-Records)."""
+
+    repo_root: pathlib.Path
+    java_root: pathlib.Path
+    files: List[source_files.SourceFile]
+    records: Dict[pathlib.Path, java_index.JavaFileRecord]
+
+    @classmethod
+    def load(cls, repo_root: pathlib.Path) -> "ProjectModel":
+        java_root = repo_root / "src/main/java"
+        files = list(source_files.iter_source_files(java_root, (".java",)))
+        index = java_index.get_index()
+        records = {}
+        for f in files:
+            record = index.get(f.path)
+            if record is not None:
+                records[f.path] = record
+        return cls(repo_root, java_root, files, records)
+
+    @property
+    def app_dir(self) -> pathlib.Path:
+        return self.java_root / "com/example/hackathon2025"
+
+    @property
+    def templates_dir(self) -> pathlib.Path:
+        return self.repo_root / "src/main/resources/templates"
+
+    def files_under(self, directory: pathlib.Path) -> List[source_files.SourceFile]:
+        return [f for f in self.files if f.path.is_relative_to(directory)]
+
+    def records_under(self, directory: pathlib.Path) -> List[java_index.JavaFileRecord]:
+        return [self.records[f.path] for f in self.files_under(directory) if f.path in self.records]
+
+
+# ---------- Scheduler ----------
+
+@dataclass(order=True)
+class WorkItem:
+    priority: Tuple
+    seq: int
+    run: Callable[[], Any] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class Scheduler:
+    """
+    Prioritäts-Queue mit `jobs` Worker-Coroutinen. Jede Einheit läuft im gemeinsamen
+    Thread-Pool; das Ergebnis (oder die Exception) landet im Future von submit().
+    """
+
+    def __init__(self, jobs: int) -> None:
+        self.jobs = jobs
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self.executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="llm")
+        self._seq = itertools.count()
+        self._workers: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.jobs)]
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+
+    def submit(self, priority: Tuple, run: Callable[[], Any]) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait(WorkItem(priority, next(self._seq), run, future))
+        return future
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.queue.get()
+            try:
+                result = await loop.run_in_executor(self.executor, item.run)
+            except Exception as e:
+                item.future.set_exception(e)
+            else:
+                item.future.set_result(result)
+            finally:
+                self.queue.task_done()
+
+
+async def _outcome(future: asyncio.Future) -> Tuple[Any, Optional[BaseException]]:
+    try:
+        return await future, None
+    except Exception as e:
+        return None, e
+
+
+async def _offload(fn: Callable, *args) -> Any:
+    """Lokale Vorarbeit (Dateien lesen, Prompts bauen) außerhalb der Loop und des LLM-Pools."""
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+# ---------- Pipelines ----------
+
+async def run_docs(model: ProjectModel, scheduler: Scheduler) -> None:
+    java_files = list(docs.collect_java_files(model.app_dir, model.files_under(model.app_dir)))
+    templates = list(docs.collect_templates(model.templates_dir))
+    items = [dict(jf, kind="java") for jf in java_files] + [dict(t, kind="template") for t in templates]
+    store_path = model.repo_root / "docs" / docs.SUMMARY_STORE_NAME
+
+    entries, todo = await _offload(docs.plan_summaries, items, docs.load_summary_store(store_path))
+    summaries: Dict[str, Dict] = {path: entry["summary"] for path, entry in entries.items()}
+    futures = [
+        scheduler.submit((PRIORITY_DOCS, -docs.item_weight(item)), lambda item=item: docs.summarize_item(item))
+        for item in todo
+    ]
+    for item, future in zip(todo, futures):
+        summary, error = await _outcome(future)
+        docs.apply_summary_result(item, summary, error, summaries, entries)
+    docs.save_summary_store(store_path, entries)
+
+    prompt = docs.build_reduce_prompt(docs.ordered_summaries(items, summaries))
+    print(f"[INFO] Reduce-Prompt: {len(prompt)} Zeichen (~{context_packer.count_tokens(prompt)} Tokens).")
+    md, error = await _outcome(
+        scheduler.submit(
+            (PRIORITY_DOCS, 0),
+            lambda: docs.generate_doc(prompt, model.repo_root / "docs" / "architecture.md.partial"),
+        )
+    )
+    if error is not None:
+        print(f"[WARN] Azure OpenAI konnte nicht verwendet werden: {error}")
+    if not md:
+        md = docs.build_fallback_doc(java_files, templates)
+    docs.write_architecture_doc(model.repo_root, md)
+
+
+async def run_tests(model: ProjectModel, scheduler: Scheduler, args: argparse.Namespace) -> None:
+    test_dir = pathlib.Path(args.test_dir).resolve() if args.test_dir else model.repo_root / "src/test/java"
+    manifest = tests.GenerationManifest.load(test_dir / tests.DEFAULT_MANIFEST_NAME)
+    target_files = [f.path for f in model.files]
+
+    jobs = await _offload(tests.prepare_test_jobs, target_files, model.java_root, test_dir, manifest, args.force)
+    if not jobs:
+        print("[INFO] Keine Klassen, für die Tests erzeugt werden – nichts zu tun.")
+        return
+    packed, singles = tests.pack_jobs(jobs, args.pack_tokens, args.pack_max_classes)
+    work = [*packed, *singles]
+    print(f"[INFO] JUnit: {len(work)} Aufruf(e) für {len(jobs)} Klasse(n) ({len(packed)} Sammelanfrage(n)).")
+
+    futures = [
+        scheduler.submit((PRIORITY_TESTS, -len(w.prompt)), lambda w=w: tests.run_work_item(w))
+        for w in work
+    ]
+    results: Dict[pathlib.Path, str] = {}
+    try:
+        for w, future in zip(work, futures):
+            result, error = await _outcome(future)
+            results.update(tests.work_results(w, result, error))
+    finally:
+        manifest.save()
+    for source_file in sorted(results):
+        print(results[source_file])
+
+
+async def run_ui_tests(model: ProjectModel, scheduler: Scheduler) -> None:
+    controllers = list(ui.collect_controllers(model.app_dir, model.records_under(model.app_dir)))
+    index_html = ui.get_index_html(model.templates_dir)
+    units = [ui.build_index_unit(index_html)] + ui.build_endpoint_units(controllers)
+    tests_dir = model.repo_root / "tests"
+    store_path = tests_dir / ui.UNIT_STORE_NAME
+
+    old_entries = ui.load_unit_store(store_path)
+    entries, todo = ui.plan_units(units, old_entries)
+    blocks: Dict[str, str] = {u.unit_id: u.code for u in units if u.code is not None}
+    blocks.update({unit_id: entry["code"] for unit_id, entry in entries.items()})
+    futures = [
+        scheduler.submit((PRIORITY_UI, -len(unit.prompt)), lambda unit=unit: ui.generate_unit(unit))
+        for unit in todo
+    ]
+    for unit, future in zip(todo, futures):
+        code, error = await _outcome(future)
+        ui.apply_unit_result(unit, code, error, old_entries, blocks, entries)
+    ui.save_unit_store(store_path, entries)
+    ui.write_spec(tests_dir, units, blocks, model.templates_dir)
+
+
+async def _timed(name: str, coro, durations: Dict[str, float]) -> None:
+    start = time.monotonic()
+    try:
+        await coro
+    finally:
+        durations[name] = time.monotonic() - start
+
+
+async def orchestrate(model: ProjectModel, args: argparse.Namespace, selected: List[str]) -> Dict[str, float]:
+    """Startet die gewählten Pipelines nebeneinander; Rückgabe: Laufzeit je Pipeline in Sekunden."""
+    scheduler = Scheduler(args.jobs)
+    scheduler.start()
+    pipelines = {
+        "docs": lambda: run_docs(model, scheduler),
+        "tests": lambda: run_tests(model, scheduler, args),
+        "ui-tests": lambda: run_ui_tests(model, scheduler),
+    }
+    durations: Dict[str, float] = {}
+    try:
+        outcomes = await asyncio.gather(
+            *(_timed(name, pipelines[name](), durations) for name in selected), return_exceptions=True
+        )
+    finally:
+        await scheduler.close()
+    failed = [(name, e) for name, e in zip(selected, outcomes) if isinstance(e, BaseException)]
+    for name, e in failed:
+        print(f"[ERROR] Pipeline {name} abgebrochen: {e}")
+    if failed:
+        raise SystemExit(f"{len(failed)} Pipeline(s) fehlgeschlagen.")
+    return durations
+
+
+def _pipeline_list(value: str) -> List[str]:
+    names = [n.strip() for n in value.split(",") if n.strip()]
+    unknown = sorted(set(names) - set(PIPELINES))
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unbekannte Pipeline(s): {', '.join(unknown)} (erlaubt: {', '.join(PIPELINES)})")
+    return names
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Erzeugt JUnit-Tests, Playwright-Tests und Architektur-Doku in einem Prozess."
+    )
+    parser.add_argument(
+        "--repo-root",
+        default=str(pathlib.Path(__file__).resolve().parents[1]),
+        help="Wurzel des Projekts (Default: eine Ebene über scripts/, z.B. für Benchmarks abweichend)",
+    )
+    parser.add_argument(
+        "--test-dir",
+        default=None,
+        help="Pfad zu src/test/java (Default: <repo-root>/src/test/java)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help="Gleichzeitige Modellaufrufe über alle Pipelines (Default: 4)",
+    )
+    parser.add_argument(
+        "--only",
+        type=_pipeline_list,
+        default=list(PIPELINES),
+        help=f"Nur diese Pipelines, kommagetrennt ({', '.join(PIPELINES)})",
+    )
+    parser.add_argument(
+        "--skip",
+        type=_pipeline_list,
+        default=[],
+        help="Diese Pipelines auslassen, kommagetrennt",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="JUnit: Manifest ignorieren und alle Tests neu erzeugen",
+    )
+    parser.add_argument(
+        "--pack-tokens",
+        type=int,
+        default=tests.DEFAULT_PACK_TOKENS,
+        help=f"JUnit: Quelltext-Budget für Sammelanfragen kleiner Klassen (Default: {tests.DEFAULT_PACK_TOKENS}, 0 = aus)",
+    )
+    parser.add_argument(
+        "--pack-max-classes",
+        type=int,
+        default=tests.DEFAULT_PACK_MAX_CLASSES,
+        help=f"JUnit: höchstens so viele Klassen pro Sammelanfrage (Default: {tests.DEFAULT_PACK_MAX_CLASSES})",
+    )
+    ai_cache.add_cache_arguments(parser)
+    java_index.add_index_arguments(parser)
+    llm_transport.add_transport_arguments(parser)
+    llm_stream.add_stream_arguments(parser)
+    rate_limit.add_rate_limit_arguments(parser)
+    model_router.add_routing_arguments(parser)
+    llm_hedge.add_hedge_arguments(parser)
+    telemetry.add_telemetry_arguments(parser)
+    args = parser.parse_args()
+    if args.jobs < 1:
+        raise SystemExit("--jobs muss >= 1 sein.")
+    selected = [name for name in PIPELINES if name in args.only and name not in args.skip]
+    if not selected:
+        raise SystemExit("Keine Pipeline ausgewählt (--only/--skip).")
+    try:
+        common.azure_config()
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    # Ein Pool und ein Limiter für alle Pipelines – je Worker eine Keep-Alive-Verbindung
+    args.http_pool_size = max(args.http_pool_size, args.jobs)
+
+    tel = telemetry.configure_from_args(args)
+    ai_cache.configure_from_args(args)
+    java_index.configure_from_args(args)
+    llm_transport.configure_from_args(args)
+    llm_stream.configure_from_args(args)
+    rate_limit.configure_from_args(args, max_concurrency=args.jobs)
+    model_router.configure_from_args(args)
+    llm_hedge.configure_from_args(args)
+
+    repo_root = pathlib.Path(args.repo_root).resolve()
+    with tel.phase("scan"):
+        model = ProjectModel.load(repo_root)
+    print(
+        f"[INFO] Projektmodell: {len(model.files)} Java-Datei(en) unter {model.java_root}; "
+        f"Pipelines: {', '.join(selected)}; {args.jobs} Worker."
+    )
+
+    durations = asyncio.run(orchestrate(model, args, selected))
+    for name in selected:
+        print(f"[OK] {name}: fertig nach {durations[name]:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+rate_limit.py
+
+Client-seitiger Scheduler für Modellaufrufe, damit ein 429 nicht mehr zu einer
+fehlenden Testdatei führt.
+
+- Token Buckets für Requests pro Minute (--rpm) und Tokens pro Minute (--tpm).
+  Tokens werden vor dem Aufruf geschätzt (Zeichen/4 + erwartete Antwortlänge)
+  und nach der Antwort anhand von "usage.total_tokens" korrigiert; usage, Status
+  und Wiederholungen landen zusätzlich im aktiven Telemetrie-Span (telemetry.py).
+- Header der Antwort werden ausgewertet:
+  - Retry-After / retry-after-ms: alle Aufrufe pausieren bis zu diesem Zeitpunkt.
+  - x-ratelimit-remaining-requests / -tokens: Buckets werden auf den vom Server
+    gemeldeten Rest gekürzt. Meldet der Server einen Rest von 0, pausieren alle
+    Aufrufe auch ohne --rpm/--tpm bis x-ratelimit-reset-* (sonst 1 s).
+- 429 und 5xx (sowie Verbindungsfehler/Timeouts) werden mit exponentiellem
+  Backoff + Full Jitter wiederholt (--max-retries).
+- Adaptive Parallelität (AIMD): Jeder Erfolg erhöht das Limit paralleler
+  Aufrufe additiv, jedes 429 halbiert es. Obergrenze ist die vom Skript
+  vorgegebene Parallelität (z.B. --jobs). Ein gestreamter Aufruf (hold=True)
+  belegt seinen Slot, bis der Body gelesen ist (release()).
+"""
+
+import argparse
+import atexit
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import telemetry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+_RETRYABLE_EXCEPTION_NAMES = (
+    "ConnectionError",
+    "Timeout",
+    "TimeoutError",
+    "ReadTimeout",
+    "ConnectTimeout",
+    "TransportError",
+    "APIConnectionError",
+    "APITimeoutError",
+)
+
+DEFAULT_RPM = int(os.environ.get("AZURE_OPENAI_RPM") or "0")
+DEFAULT_TPM = int(os.environ.get("AZURE_OPENAI_TPM") or "0")
+DEFAULT_MAX_RETRIES = 6
+DEFAULT_COMPLETION_TOKENS = 1500
+# Pause, wenn der Server "remaining 0" ohne x-ratelimit-reset-* meldet
+DEFAULT_EXHAUSTED_PAUSE = 1.0
+
+
+def parse_duration(value: Any) -> Optional[float]:
+    """Sekunden aus "1.5", "20ms", "6m0s" o.ä. (Format von x-ratelimit-reset-*); None, falls unlesbar."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", str(value or ""))
+    if not parts:
+        return None
+    factors = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(number) * factors[unit] for number, unit in parts)
+
+
+def estimate_tokens(text: str) -> int:
+    """Grobe Schätzung (ca. 4 Zeichen pro Token) – reicht für die Budgetplanung."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Klassischer Token Bucket mit Nachfüllrate capacity/60 pro Sekunde. capacity <= 0 = unbegrenzt."""
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Sekunden bis amount verfügbar ist (0 = sofort)."""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float) -> None:
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+    def clamp(self, remaining: float) -> None:
+        if not self.unlimited:
+            self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """Thread-safe Scheduler: Budgets (RPM/TPM), Server-Header, Retries und AIMD-Parallelität."""
+
+    def __init__(
+        self,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        max_concurrency: int = 1,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 60.0,
+    ) -> None:
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency = float(self.max_concurrency)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.retries = 0
+        self.throttled = 0
+        self._cond = threading.Condition()
+
+    # ---------- AIMD ----------
+
+    def _on_success(self) -> None:
+        # additive increase: ca. +1 pro "Fenster" von concurrency erfolgreichen Aufrufen
+        self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+
+    def _on_throttle(self) -> None:
+        # multiplicative decrease
+        self.concurrency = max(1.0, self.concurrency / 2.0)
+        self.throttled += 1
+
+    # ---------- Slots & Budgets ----------
+
+    def _acquire(self, estimated_tokens: int) -> None:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = max(
+                    self.paused_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(estimated_tokens, now),
+                )
+                if self.in_flight >= int(self.concurrency):
+                    self._cond.wait(timeout=wait if wait > 0 else None)
+                    continue
+                if wait > 0:
+                    self._cond.wait(timeout=wait)
+                    continue
+                self.requests.take(1)
+                self.tokens.take(estimated_tokens)
+                self.in_flight += 1
+                return
+
+    def _release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def release(self) -> None:
+        """Gibt den Slot eines mit call(..., hold=True) erfolgreich gestarteten Aufrufs frei."""
+        self._release()
+
+    def _apply_headers(self, headers: Any) -> Optional[float]:
+        """Wertet Rate-Limit-Header aus. Gibt die vom Server gewünschte Wartezeit zurück (falls vorhanden)."""
+        if not headers:
+            return None
+        retry_after: Optional[float] = None
+        try:
+            if headers.get("retry-after-ms"):
+                retry_after = float(headers["retry-after-ms"]) / 1000.0
+            elif headers.get("retry-after"):
+                retry_after = float(headers["retry-after"])
+        except (TypeError, ValueError):
+            retry_after = None
+
+        with self._cond:
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                value = headers.get(f"x-ratelimit-remaining-{kind}")
+                if value is None:
+                    continue
+                try:
+                    remaining = float(value)
+                except ValueError:
+                    continue
+                bucket.clamp(remaining)
+                if remaining < 1:
+                    # Kontingent erschöpft: auch ohne eigenes Budget bis zum Reset warten
+                    pause = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                    pause = DEFAULT_EXHAUSTED_PAUSE if pause is None else pause
+                    self.paused_until = max(self.paused_until, time.monotonic() + pause)
+                    self._cond.notify_all()
+            if retry_after is not None:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+                self._cond.notify_all()
+        return retry_after
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    # ---------- Aufruf ----------
+
+    def call(self, send: Callable[[], Any], estimated_tokens: int, hold: bool = False) -> Any:
+        """
+        Führt send() unter Einhaltung der Budgets aus und wiederholt 429/5xx/Verbindungsfehler.
+        send() liefert ein Response-Objekt (status_code, headers, json()) oder wirft
+        (z.B. SDK-Exceptions mit status_code und response.headers).
+        Nach ausgeschöpften Retries wird die letzte Response zurückgegeben bzw. die letzte
+        Exception erneut geworfen. Mit hold=True bleibt der Slot einer erfolgreichen
+        Response belegt (gestreamter Body); der Aufrufer gibt ihn mit release() frei.
+        """
+        attempt = 0
+        while True:
+            self._acquire(estimated_tokens)
+            resp = None
+            error: Optional[BaseException] = None
+            try:
+                resp = send()
+            except Exception as e:
+                error = e
+            except BaseException:
+                self._release()
+                raise
+
+            status = getattr(resp, "status_code", None) if resp is not None else getattr(error, "status_code", None)
+            success = error is None and (status is None or status < 400)
+            if not (hold and success):
+                self._release()
+            headers = getattr(resp, "headers", None) if resp is not None else getattr(getattr(error, "response", None), "headers", None)
+            retry_after = self._apply_headers(headers)
+
+            if success:
+                usage = self._account_usage(resp, estimated_tokens)
+                telemetry.get_telemetry().record_response(resp, usage)
+                with self._cond:
+                    self._on_success()
+                return resp
+
+            retryable = status in RETRY_STATUSES if status is not None else _is_retryable_exception(error)
+            if status == 429:
+                with self._cond:
+                    self._on_throttle()
+
+            if not retryable or attempt >= self.max_retries:
+                span = telemetry.current_span()
+                if span is not None:
+                    span.status = status
+                if error is not None:
+                    raise error
+                return resp
+
+            if resp is not None and hasattr(resp, "close"):
+                resp.close()  # Verbindung freigeben (wichtig bei gestreamten Responses)
+            delay = self._backoff(attempt, retry_after)
+            reason = f"HTTP {status}" if status is not None else type(error).__name__
+            print(f"[WARN] {reason} von Azure OpenAI – Versuch {attempt + 1}/{self.max_retries}, warte {delay:.1f}s ...")
+            with self._cond:
+                self.retries += 1
+            span = telemetry.current_span()
+            if span is not None:
+                span.retries += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def _account_usage(self, resp: Any, estimated_tokens: int) -> Dict[str, int]:
+        """Korrigiert das Token-Budget anhand von usage und gibt usage zurück (leer, falls unbekannt)."""
+        headers = getattr(resp, "headers", None) or {}
+        if "text/event-stream" in (headers.get("content-type") or ""):
+            return {}  # gestreamter Body darf hier nicht gelesen werden; es bleibt bei der Schätzung
+        usage = telemetry.extract_usage(resp)
+        actual = usage.get("total_tokens") or usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+        if actual <= 0:
+            return usage
+        with self._cond:
+            if actual < estimated_tokens:
+                self.tokens.give_back(estimated_tokens - actual)
+            else:
+                self.tokens.take(actual - estimated_tokens)
+        return usage
+
+    def summary(self) -> str:
+        return (
+            f"[INFO] Rate-Limiter: {self.retries} Wiederholungen, {self.throttled}x gedrosselt (429), "
+            f"Parallelität zuletzt {int(self.concurrency)}/{self.max_concurrency}"
+        )
+
+
+def _is_retryable_exception(error: Optional[BaseException]) -> bool:
+    if error is None:
+        return False
+    return any(cls.__name__ in _RETRYABLE_EXCEPTION_NAMES for cls in type(error).__mro__)
+
+
+# ---------------------------------------------------------
+# Prozessweite Konfiguration für die Skripte
+# ---------------------------------------------------------
+_limiter = RateLimiter()
+
+
+def add_rate_limit_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("Rate-Limits")
+    group.add_argument(
+        "--rpm",
+        type=int,
+        default=DEFAULT_RPM,
+        help="Requests pro Minute des Deployments (Default: $AZURE_OPENAI_RPM, 0 = unbegrenzt)",
+    )
+    group.add_argument(
+        "--tpm",
+        type=int,
+        default=DEFAULT_TPM,
+        help="Tokens pro Minute des Deployments (Default: $AZURE_OPENAI_TPM, 0 = unbegrenzt)",
+    )
+    group.add_argument(
+        "--max-retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=f"Wiederholungen bei 429/5xx/Verbindungsfehlern (Default: {DEFAULT_MAX_RETRIES})",
+    )
+
+
+def configure_from_args(args: argparse.Namespace, max_concurrency: int = 1) -> RateLimiter:
+    """Initialisiert den prozessweiten Limiter. max_concurrency ist die Obergrenze für AIMD."""
+    global _limiter
+    _limiter = RateLimiter(
+        rpm=args.rpm,
+        tpm=args.tpm,
+        max_retries=args.max_retries,
+        max_concurrency=max_concurrency,
+    )
+    atexit.register(_finish, _limiter)
+    return _limiter
+
+
+def _finish(limiter: RateLimiter) -> None:
+    if limiter.retries or limiter.throttled:
+        print(limiter.summary())
+
+
+def get_limiter() -> RateLimiter:
+    return _limiter
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+sharding.py
+
+Verteilung der Generierung auf mehrere CI-Runner (z.B. eine Job-Matrix).
+
+- --shard i/N (1-basiert) wählt deterministisch den i-ten von N Teilen der
+  Arbeit. Aufgeteilt wird nicht nach Dateianzahl, sondern nach geschätzter
+  Prompt-Größe (Longest Processing Time first: größte Einheit zuerst in den
+  bisher leichtesten Shard). Alle Shards sehen dieselbe Eingabe und kommen
+  deshalb ohne Absprache zur selben Aufteilung.
+- Jeder Shard schreibt neben seinen Ausgaben ein Teilergebnis nach
+  <shard-dir>/<tool>-shard-<i>-of-<N>.json (Default: $AI_SHARD_DIR oder
+  target/ai-shards). Es enthält nur die Einträge, die der Shard im jeweiligen
+  Store (Generierungs-Manifest, tests/.ai-ui-units.json, docs/.ai-summaries.json)
+  angelegt, geändert oder entfernt hat.
+- "python scripts/sharding.py merge" führt die Teilergebnisse aller Shards
+  zusammen: prüft, dass jeder Shard genau einmal vorliegt, erkennt Konflikte
+  (derselbe Key bzw. dieselbe Ausgabedatei mit unterschiedlichem Inhalt in
+  mehreren Shards), schreibt die Stores und gibt eine gemeinsame Übersicht aus.
+  Bei Konflikten wird nichts geschrieben (Exit-Code 1).
+
+Ablauf in CI (Beispiel mit N=4):
+    # Matrix-Job i = 1..4
+    python scripts/generate_tests_with_azure_openai.py ... --shard $i/4
+    # Artefakte (Tests + target/ai-shards/) einsammeln, dann einmal:
+    python scripts/sharding.py merge
+UI-Spec und Architektur-Doku werden danach von einem Lauf ohne --shard
+zusammengesetzt; dabei werden alle Einheiten aus den Stores übernommen.
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+PARTIAL_VERSION = 1
+DEFAULT_SHARD_DIR = "target/ai-shards"
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Shard:
+    index: int  # 1-basiert
+    count: int
+
+    @property
+    def label(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def partial_name(self, tool: str) -> str:
+        return f"{tool}-shard-{self.index}-of-{self.count}.json"
+
+
+def parse_shard(text: str) -> Shard:
+    """"i/N" mit 1 <= i <= N (als argparse-type verwendbar)."""
+    try:
+        index, count = (int(part) for part in text.split("/", 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"--shard erwartet i/N, z.B. 2/4 (nicht {text!r})")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"--shard {text}: i muss zwischen 1 und N liegen")
+    return Shard(index, count)
+
+
+def partition(
+    items: Sequence[T],
+    shard: Shard,
+    weight: Callable[[T], int],
+    key: Callable[[T], str],
+) -> List[T]:
+    """
+    Die Einheiten des Shards (in Eingabereihenfolge). Greedy-LPT über (Gewicht absteigend,
+    Key) – deterministisch, solange alle Shards dieselben Einheiten und Gewichte sehen.
+    """
+    loads = [0] * shard.count
+    mine = set()
+    for idx in sorted(range(len(items)), key=lambda i: (-weight(items[i]), key(items[i]))):
+        target = min(range(shard.count), key=lambda s: (loads[s], s))
+        loads[target] += max(1, weight(items[idx]))
+        if target == shard.index - 1:
+            mine.add(idx)
+    return [item for idx, item in enumerate(items) if idx in mine]
+
+
+def diff_entries(before: Dict[str, dict], after: Dict[str, dict]) -> Tuple[Dict[str, dict], List[str]]:
+    """Angelegte/geänderte Einträge und entfernte Keys zwischen zwei Store-Ständen."""
+    changed = {k: v for k, v in after.items() if before.get(k) != v}
+    removed = sorted(k for k in before if k not in after)
+    return changed, removed
+
+
+def write_partial(
+    shard_dir: pathlib.Path,
+    tool: str,
+    shard: Shard,
+    store_path: pathlib.Path,
+    store_version: int,
+    entries: Dict[str, dict],
+    removed: Iterable[str] = (),
+    items: int = 0,
+    weight: int = 0,
+) -> pathlib.Path:
+    """Schreibt das Teilergebnis eines Shards (atomar) und gibt den Pfad zurück."""
+    data = {
+        "version": PARTIAL_VERSION,
+        "tool": tool,
+        "shard": shard.index,
+        "count": shard.count,
+        "store": os.path.relpath(store_path.resolve(), pathlib.Path.cwd()),
+        "store_version": store_version,
+        "items": items,
+        "weight": weight,
+        "entries": {k: entries[k] for k in sorted(entries)},
+        "removed": sorted(removed),
+    }
+    path = shard_dir / shard.partial_name(tool)
+    _write_json(path, data)
+    print(
+        f"[OK] Shard {shard.label} ({tool}): {items} Einheit(en), ~{weight} Bytes Prompt, "
+        f"{len(entries)} Eintrag/Einträge -> {path}"
+    )
+    return path
+
+
+def _write_json(path: pathlib.Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+# ---------------------------------------------------------
+# Merge
+# ---------------------------------------------------------
+
+def _load_partials(shard_dir: pathlib.Path) -> Dict[str, List[dict]]:
+    by_tool: Dict[str, List[dict]] = {}
+    for path in sorted(shard_dir.glob("*-shard-*-of-*.json")):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            raise SystemExit(f"[ERROR] Teilergebnis {path} nicht lesbar: {e}")
+        if data.get("version") != PARTIAL_VERSION:
+            raise SystemExit(f"[ERROR] Teilergebnis {path} hat eine unbekannte Version.")
+        data["_file"] = str(path)
+        by_tool.setdefault(data["tool"], []).append(data)
+    return by_tool
+
+
+def _check_tool(tool: str, partials: List[dict]) -> List[str]:
+    """Vollständigkeit und Konflikte eines Tools; Rückgabe: Fehlermeldungen."""
+    errors: List[str] = []
+    counts = {p["count"] for p in partials}
+    stores = {p["store"] for p in partials}
+    if len(counts) != 1:
+        errors.append(f"{tool}: Shards mit unterschiedlichem N ({sorted(counts)})")
+        return errors
+    if len(stores) != 1:
+        errors.append(f"{tool}: Shards schreiben in unterschiedliche Stores ({sorted(stores)})")
+    count = counts.pop()
+    indices = sorted(p["shard"] for p in partials)
+    missing = sorted(set(range(1, count + 1)) - set(indices))
+    duplicates = sorted({i for i in indices if indices.count(i) > 1})
+    if missing:
+        errors.append(f"{tool}: Shard(s) fehlen: {', '.join(f'{i}/{count}' for i in missing)}")
+    if duplicates:
+        errors.append(f"{tool}: Shard(s) doppelt: {', '.join(f'{i}/{count}' for i in duplicates)}")
+
+    seen: Dict[str, Tuple[int, dict]] = {}
+    outputs: Dict[str, Tuple[int, str]] = {}
+    for p in sorted(partials, key=lambda p: p["shard"]):
+        for k, entry in p["entries"].items():
+            if k in seen and seen[k][1] != entry:
+                errors.append(f"{tool}: Konflikt für {k} (Shard {seen[k][0]} und {p['shard']})")
+            seen.setdefault(k, (p["shard"], entry))
+            output = entry.get("output") if isinstance(entry, dict) else None
+            if output:
+                if output in outputs and outputs[output][1] != k:
+                    errors.append(
+                        f"{tool}: Ausgabe {output} von {outputs[output][1]} (Shard {outputs[output][0]}) "
+                        f"und {k} (Shard {p['shard']})"
+                    )
+                outputs.setdefault(output, (p["shard"], k))
+    for p in partials:
+        for k in p["removed"]:
+            if k in seen and seen[k][0] != p["shard"]:
+                errors.append(f"{tool}: {k} in Shard {seen[k][0]} geschrieben, in Shard {p['shard']} entfernt")
+    return errors
+
+
+def _apply(partials: List[dict]) -> Tuple[pathlib.Path, int, int]:
+    """Schreibt die Einträge aller Shards in den Store; Rückgabe: Pfad, übernommen, entfernt."""
+    store = pathlib.Path(partials[0]["store"])
+    version = partials[0]["store_version"]
+    entries: Dict[str, dict] = {}
+    if store.exists():
+        try:
+            data = json.loads(store.read_text(encoding="utf-8"))
+            if data.get("version") == version:
+                entries = dict(data.get("entries") or {})
+        except (OSError, ValueError):
+            print(f"[WARN] Store {store} nicht lesbar, wird aus den Shards neu aufgebaut.")
+    merged = removed = 0
+    for p in sorted(partials, key=lambda p: p["shard"]):
+        for k in p["removed"]:
+            if entries.pop(k, None) is not None:
+                removed += 1
+        entries.update(p["entries"])
+        merged += len(p["entries"])
+    _write_json(store, {"version": version, "entries": {k: entries[k] for k in sorted(entries)}})
+    return store, merged, removed
+
+
+def merge(shard_dir: pathlib.Path) -> int:
+    by_tool = _load_partials(shard_dir)
+    if not by_tool:
+        print(f"[WARN] Keine Teilergebnisse unter {shard_dir} gefunden.")
+        return 0
+
+    errors = [e for tool in sorted(by_tool) for e in _check_tool(tool, by_tool[tool])]
+    if errors:
+        for e in errors:
+            print(f"[ERROR] {e}")
+        print(f"[ERROR] {len(errors)} Problem(e) – es wurde nichts zusammengeführt.")
+        return 1
+
+    print(f"{'Tool':<10} {'Shards':>6} {'Einheiten':>10} {'Min/Max Gewicht':>17} {'Einträge':>9} {'Entfernt':>9}  Store")
+    for tool in sorted(by_tool):
+        partials = by_tool[tool]
+        store, merged, removed = _apply(partials)
+        weights = [p["weight"] for p in partials]
+        balance = f"{min(weights)}/{max(weights)}"
+        items = sum(p["items"] for p in partials)
+        print(f"{tool:<10} {len(partials):>6} {items:>10} {balance:>17} {merged:>9} {removed:>9}  {store}")
+    print("[OK] Teilergebnisse zusammengeführt.")
+    return 0
+
+
+# ---------------------------------------------------------
+# Prozessweite Konfiguration für die Skripte
+# ---------------------------------------------------------
+
+def add_shard_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("Sharding")
+    group.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="I/N",
+        help="Nur den I-ten von N Teilen bearbeiten (balanciert nach Prompt-Größe) und ein Teilergebnis schreiben",
+    )
+    group.add_argument(
+        "--shard-dir",
+        default=os.environ.get("AI_SHARD_DIR") or DEFAULT_SHARD_DIR,
+        help=f"Verzeichnis für Teilergebnisse (Default: $AI_SHARD_DIR oder {DEFAULT_SHARD_DIR})",
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Teilergebnisse von --shard-Läufen zusammenführen.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    merge_parser = sub.add_parser("merge", help="Teilergebnisse prüfen und in die Stores schreiben")
+    merge_parser.add_argument(
+        "--shard-dir",
+        default=os.environ.get("AI_SHARD_DIR") or DEFAULT_SHARD_DIR,
+        help=f"Verzeichnis der Teilergebnisse (Default: $AI_SHARD_DIR oder {DEFAULT_SHARD_DIR})",
+    )
+    args = parser.parse_args(argv)
+    return merge(pathlib.Path(args.shard_dir))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
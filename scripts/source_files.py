@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+source_files.py
+
+Speicherschonendes Einsammeln von Quelldateien für die Generatoren.
+
+- iter_source_files() ist ein Generator über leichtgewichtige SourceFile-Handles
+  (Pfad + Größe). Der Inhalt wird erst gelesen, wenn ein Prompt-Builder ihn
+  wirklich braucht, und nicht am Handle gehalten – der Speicherbedarf hängt
+  damit vom Prompt ab, nicht von der Größe des Repos.
+- Build-Ausgaben und Abhängigkeiten (target/, build/, node_modules/, .git/ ...)
+  werden beim Durchlaufen gar nicht erst betreten.
+- In einem git-Checkout gelten zusätzlich .gitignore & Co.: die Kandidaten
+  kommen dann aus "git ls-files --cached --others --exclude-standard".
+  Ohne git (oder außerhalb eines Repos) wird das Verzeichnis direkt durchlaufen.
+- Die Reihenfolge ist deterministisch (sortiert nach Pfad bzw. beim direkten
+  Durchlaufen Verzeichnis für Verzeichnis), damit Prompts und Cache-Keys stabil bleiben.
+"""
+
+import os
+import pathlib
+import subprocess
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional
+
+# Verzeichnisse, die nie Quelltext für die Prompts enthalten
+EXCLUDED_DIRS = frozenset(
+    {
+        ".git",
+        ".idea",
+        ".gradle",
+        ".mvn",
+        ".ai-cache",
+        "__pycache__",
+        "node_modules",
+        "target",
+        "build",
+        "out",
+        "dist",
+    }
+)
+
+_BLANK_CHUNK = 64 * 1024
+
+
+@dataclass(frozen=True)
+class SourceFile:
+    """Handle auf eine Quelldatei; der Inhalt wird bei jedem read() frisch gelesen."""
+
+    path: pathlib.Path
+    size: int
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    def read(self) -> str:
+        try:
+            return self.path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return ""
+
+    def is_blank(self) -> bool:
+        """Leer oder nur Whitespace – liest höchstens bis zum ersten sichtbaren Zeichen."""
+        if self.size == 0:
+            return True
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                while True:
+                    chunk = f.read(_BLANK_CHUNK)
+                    if not chunk:
+                        return True
+                    if chunk.strip():
+                        return False
+        except (OSError, UnicodeDecodeError):
+            return True
+
+
+def _git_candidates(base_dir: pathlib.Path) -> Optional[List[str]]:
+    """Nicht ignorierte Dateien unterhalb von base_dir (relativ), None außerhalb eines git-Checkouts."""
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(base_dir), "ls-files", "-z", "--cached", "--others", "--exclude-standard", "--", "."],
+            capture_output=True,
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return [os.fsdecode(n) for n in result.stdout.split(b"\0") if n]
+
+
+def _walk_candidates(base_dir: pathlib.Path, excluded: Iterable[str]) -> Iterator[str]:
+    excluded = set(excluded)
+    for dirpath, dirnames, filenames in os.walk(base_dir):
+        dirnames[:] = sorted(d for d in dirnames if d not in excluded)
+        rel_dir = os.path.relpath(dirpath, base_dir)
+        for filename in sorted(filenames):
+            yield filename if rel_dir == "." else os.path.join(rel_dir, filename)
+
+
+def iter_source_files(
+    base_dir: pathlib.Path,
+    suffixes: Iterable[str],
+    excluded_dirs: Iterable[str] = EXCLUDED_DIRS,
+    respect_gitignore: bool = True,
+) -> Iterator[SourceFile]:
+    """
+    Alle Dateien mit einer der Endungen (z.B. ".java") unterhalb von base_dir, ohne
+    ausgeschlossene Verzeichnisse und (im git-Checkout) ohne ignorierte Pfade.
+    Nur ohne git (kein Checkout, git fehlt) wird das Verzeichnis direkt durchlaufen;
+    eine leere Liste von git (alles ignoriert) bleibt leer.
+    """
+    if not base_dir.is_dir():
+        return
+    suffixes = tuple(suffixes)
+    excluded = frozenset(excluded_dirs)
+
+    names = _git_candidates(base_dir) if respect_gitignore else None
+    if names is None:
+        candidates: Iterable[str] = _walk_candidates(base_dir, excluded)
+    else:
+        candidates = sorted(n for n in names if not excluded.intersection(pathlib.PurePath(n).parts[:-1]))
+
+    for rel in candidates:
+        if not rel.endswith(suffixes):
+            continue
+        path = base_dir / rel
+        try:
+            stat = path.stat()
+        except OSError:
+            continue  # im Index, aber im Working Tree gelöscht
+        yield SourceFile(path=path, size=stat.st_size)
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+telemetry.py
+
+Strukturierte Messwerte für die Generator-Skripte statt verstreuter print-Ausgaben.
+
+- Pro Modellaufruf ein Span (call): Latenz, Zeit bis zum ersten Byte (TTFB),
+  bei --stream die Zeit bis zum ersten Token (TTFT), HTTP-Status, Anzahl
+  Wiederholungen, Cache-Treffer/-Fehlschlag sowie prompt/completion/cached
+  Tokens aus dem "usage"-Feld der Antwort. Die Übersicht zeigt zusätzlich,
+  welcher Anteil der Prompt-Tokens beim Anbieter aus dessen Präfix-Cache kam.
+- Phasen (scan, prompt, network, postprocess, write) werden mit phase()
+  gemessen; Modellaufrufe zählen automatisch zur Phase "network".
+- "startup" ist die Zeit vom Prozessstart (Import dieses Moduls bzw. Start von
+  cli.py) bis configure_from_args(), also Importe plus Argument-Parsing.
+- Alle Datensätze gehen als JSON Lines in --telemetry
+  (Default: $AI_TELEMETRY oder target/ai-telemetry/<skript>.jsonl, pro Lauf neu),
+  am Ende des Laufs wird eine Übersichtstabelle ausgegeben.
+- Rohantworten werden nur noch stichprobenartig und gekürzt ausgegeben
+  (--debug-responses RATE, --debug-max-chars N).
+
+Der aktive Span hängt am Thread: rate_limit.py und llm_stream.py tragen
+Retries, Status, TTFB/TTFT und usage ein, ohne dass die Skripte etwas
+durchreichen müssen. Summen der Phasen laufen über alle Threads, können bei
+--jobs > 1 also größer als die Laufzeit sein.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import pathlib
+import random
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_TELEMETRY_DIR = "target/ai-telemetry"
+DEFAULT_DEBUG_MAX_CHARS = 2000
+PHASES = ("startup", "scan", "prompt", "network", "postprocess", "write")
+
+# Beginn des Prozesses aus Sicht der Skripte: Import dieses Moduls bzw. Start von cli.py
+_process_started = time.monotonic()
+
+
+@dataclass
+class CallSpan:
+    label: str
+    started: float
+    duration_s: float = 0.0
+    ttfb_s: Optional[float] = None
+    ttft_s: Optional[float] = None
+    status: Optional[int] = None
+    retries: int = 0
+    cache: str = "off"  # off | hit | miss
+    deployment: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    error: Optional[str] = None
+
+
+def extract_usage(resp: Any) -> Dict[str, int]:
+    """
+    Liest prompt/completion/cached Tokens aus einer Antwort.
+    Unterstützt REST-Responses (json()["usage"]), SDK-Objekte (resp.usage) und
+    bereits geparste usage-Dicts; Chat-Completions- und Responses-API-Namen.
+    """
+    usage: Any = None
+    if isinstance(resp, dict):
+        usage = resp.get("usage", resp)
+    elif getattr(resp, "usage", None) is not None and not callable(resp.usage):
+        usage = resp.usage
+    elif hasattr(resp, "json"):
+        try:
+            usage = resp.json().get("usage")
+        except Exception:
+            usage = None
+    if not usage:
+        return {}
+    if not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else vars(usage)
+
+    details = usage.get("prompt_tokens_details") or usage.get("input_tokens_details") or {}
+    if not isinstance(details, dict):
+        details = vars(details)
+    result = {
+        "prompt_tokens": usage.get("prompt_tokens", usage.get("input_tokens")),
+        "completion_tokens": usage.get("completion_tokens", usage.get("output_tokens")),
+        "total_tokens": usage.get("total_tokens"),
+        "cached_tokens": details.get("cached_tokens"),
+    }
+    return {k: int(v) for k, v in result.items() if v is not None}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Telemetry:
+    """Sammelt Spans und Phasen (thread-safe) und schreibt sie als JSON Lines."""
+
+    def __init__(
+        self,
+        path: Optional[pathlib.Path] = None,
+        enabled: bool = False,
+        debug_rate: float = 0.0,
+        debug_max_chars: int = DEFAULT_DEBUG_MAX_CHARS,
+    ) -> None:
+        self.path = path
+        self.enabled = enabled
+        self.debug_rate = debug_rate
+        self.debug_max_chars = debug_max_chars
+        self.run_id = uuid.uuid4().hex[:12]
+        self.script = pathlib.Path(sys.argv[0]).stem or "python"
+        self.started = time.monotonic()
+        self.calls: List[CallSpan] = []
+        self.phases: Dict[str, List[float]] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = None
+
+    # ---------- Export ----------
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if not self.enabled or self.path is None:
+            return
+        record = dict(record, run=self.run_id, script=self.script)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = self.path.open("w", encoding="utf-8")
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def event(self, kind: str, **fields: Any) -> None:
+        """Sonstiger Datensatz (z.B. "route" aus model_router.py) in die JSON Lines."""
+        self._write(dict(fields, type=kind))
+
+    # ---------- Phasen ----------
+
+    def _add_phase(self, name: str, duration: float, label: str = "") -> None:
+        with self._lock:
+            self.phases.setdefault(name, []).append(duration)
+        self._write({"type": "phase", "phase": name, "label": label, "duration_s": round(duration, 6)})
+
+    @contextmanager
+    def phase(self, name: str, label: str = "") -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._add_phase(name, time.monotonic() - start, label)
+
+    # ---------- Modellaufrufe ----------
+
+    def current(self) -> Optional[CallSpan]:
+        return getattr(self._local, "span", None)
+
+    @contextmanager
+    def bind(self, span: Optional[CallSpan]) -> Iterator[None]:
+        """Macht span zum aktiven Span dieses Threads (z.B. in den Threads von llm_hedge.py)."""
+        outer = self.current()
+        self._local.span = span
+        try:
+            yield
+        finally:
+            self._local.span = outer
+
+    @contextmanager
+    def call(self, label: str) -> Iterator[CallSpan]:
+        """Span für einen (ggf. gecachten) Modellaufruf; gilt für den aktuellen Thread."""
+        span = CallSpan(label=label, started=time.time())
+        outer = self.current()
+        self._local.span = span
+        start = time.monotonic()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            self._local.span = outer
+            span.duration_s = time.monotonic() - start
+            with self._lock:
+                self.calls.append(span)
+            if span.cache != "hit":
+                self._add_phase("network", span.duration_s, label)
+            record = {k: v for k, v in asdict(span).items() if v is not None}
+            record["duration_s"] = round(span.duration_s, 6)
+            self._write(dict(record, type="call"))
+
+    def record_response(self, resp: Any, usage: Optional[Dict[str, int]] = None) -> None:
+        """Trägt Status, TTFB und usage einer Antwort in den aktiven Span ein."""
+        span = self.current()
+        if span is None:
+            return
+        span.status = getattr(resp, "status_code", span.status)
+        try:
+            elapsed = getattr(resp, "elapsed", None)  # requests: bis Header; httpx: erst nach read()
+            if elapsed is not None:
+                span.ttfb_s = round(elapsed.total_seconds(), 6)
+        except Exception:
+            pass
+        self.record_usage(usage if usage is not None else extract_usage(resp))
+
+    def record_usage(self, usage: Dict[str, int]) -> None:
+        span = self.current()
+        if span is None or not usage:
+            return
+        span.prompt_tokens = usage.get("prompt_tokens", span.prompt_tokens)
+        span.completion_tokens = usage.get("completion_tokens", span.completion_tokens)
+        span.cached_tokens = usage.get("cached_tokens", span.cached_tokens)
+
+    # ---------- Debug-Ausgabe ----------
+
+    def debug_response(self, label: str, resp: Any) -> None:
+        """Gibt eine Rohantwort stichprobenartig (--debug-responses) und gekürzt aus."""
+        if self.debug_rate <= 0 or random.random() >= self.debug_rate:
+            return
+        text = repr(resp)
+        if len(text) > self.debug_max_chars:
+            text = text[: self.debug_max_chars] + f" ... [{len(text) - self.debug_max_chars} Zeichen gekürzt]"
+        print(f"[DEBUG] Rohantwort {label}: {text}")
+
+    # ---------- Zusammenfassung ----------
+
+    def summary(self) -> str:
+        with self._lock:
+            calls = list(self.calls)
+            phases = {k: list(v) for k, v in self.phases.items()}
+        wall = time.monotonic() - self.started
+        lines = [f"[INFO] Telemetrie (Lauf {self.run_id}, {wall:.1f}s){f' -> {self.path}' if self.path else ''}"]
+        lines.append(f"  {'Phase':<12} {'Anzahl':>7} {'Summe [s]':>10} {'Max [s]':>9}")
+        for name in list(PHASES) + sorted(set(phases) - set(PHASES)):
+            values = phases.get(name)
+            if values:
+                lines.append(f"  {name:<12} {len(values):>7} {sum(values):>10.2f} {max(values):>9.2f}")
+
+        if calls:
+            remote = [c for c in calls if c.cache != "hit"]
+            hits = len(calls) - len(remote)
+            errors = sum(1 for c in calls if c.error)
+            tokens = [
+                sum(getattr(c, name) or 0 for c in calls)
+                for name in ("prompt_tokens", "completion_tokens", "cached_tokens")
+            ]
+            lines.append(
+                f"  Modellaufrufe: {len(calls)} ({hits} Cache-Treffer, {len(remote)} Anfragen, "
+                f"{sum(c.retries for c in calls)} Retries, {errors} Fehler)"
+            )
+            lines.append(f"  Tokens prompt/completion/cached: {tokens[0]}/{tokens[1]}/{tokens[2]}")
+            remote_prompt = sum(c.prompt_tokens or 0 for c in remote)
+            if remote_prompt:
+                remote_cached = sum(c.cached_tokens or 0 for c in remote)
+                with_hit = sum(1 for c in remote if c.cached_tokens)
+                lines.append(
+                    f"  Prompt-Cache (Anbieter): {remote_cached}/{remote_prompt} Tokens "
+                    f"({100.0 * remote_cached / remote_prompt:.0f}%), {with_hit} von {len(remote)} Anfragen mit Treffer"
+                )
+            if remote:
+                latencies = [c.duration_s for c in remote]
+                line = f"  Latenz p50/p95/max: {_percentile(latencies, 0.5):.2f}/{_percentile(latencies, 0.95):.2f}/{max(latencies):.2f}s"
+                first = [c.ttft_s if c.ttft_s is not None else c.ttfb_s for c in remote]
+                first = [v for v in first if v is not None]
+                if first:
+                    line += f", erstes Byte/Token p50 {_percentile(first, 0.5):.2f}s"
+                lines.append(line)
+        return "\n".join(lines)
+
+
+# ---------------------------------------------------------
+# Prozessweite Konfiguration für die Skripte
+# ---------------------------------------------------------
+_telemetry = Telemetry()
+
+
+def _default_path() -> str:
+    return os.environ.get("AI_TELEMETRY") or f"{DEFAULT_TELEMETRY_DIR}/{pathlib.Path(sys.argv[0]).stem or 'python'}.jsonl"
+
+
+def add_telemetry_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("Telemetrie")
+    group.add_argument(
+        "--telemetry",
+        default=_default_path(),
+        help=f"JSON-Lines-Datei für Spans und Phasen (Default: $AI_TELEMETRY oder {DEFAULT_TELEMETRY_DIR}/<skript>.jsonl)",
+    )
+    group.add_argument(
+        "--no-telemetry",
+        action="store_true",
+        help="Keine Telemetrie-Datei schreiben und keine Übersicht ausgeben",
+    )
+    group.add_argument(
+        "--debug-responses",
+        type=float,
+        default=0.0,
+        metavar="RATE",
+        help="Anteil der Rohantworten, die gekürzt ausgegeben werden (0..1, Default: 0)",
+    )
+    group.add_argument(
+        "--debug-max-chars",
+        type=int,
+        default=DEFAULT_DEBUG_MAX_CHARS,
+        help=f"Maximale Länge einer ausgegebenen Rohantwort (Default: {DEFAULT_DEBUG_MAX_CHARS})",
+    )
+
+
+def configure_from_args(args: argparse.Namespace, export: bool = True) -> Telemetry:
+    """export=False (z.B. --dry-run): nur die Zusammenfassung, keine JSONL-Datei."""
+    global _telemetry
+    _telemetry = Telemetry(
+        pathlib.Path(args.telemetry) if export else None,
+        enabled=not args.no_telemetry,
+        debug_rate=args.debug_responses,
+        debug_max_chars=args.debug_max_chars,
+    )
+    _telemetry._add_phase("startup", time.monotonic() - _process_started)
+    atexit.register(_finish, _telemetry)
+    return _telemetry
+
+
+def mark_process_start(started: float) -> None:
+    """Früheren Startzeitpunkt (time.monotonic()) setzen, z.B. vor den Importen in cli.py."""
+    global _process_started
+    _process_started = min(_process_started, started)
+
+
+def _finish(telemetry: Telemetry) -> None:
+    telemetry.close()
+    if telemetry.enabled and (telemetry.calls or telemetry.phases):
+        print(telemetry.summary())
+
+
+def get_telemetry() -> Telemetry:
+    return _telemetry
+
+
+def current_span() -> Optional[CallSpan]:
+    return _telemetry.current()
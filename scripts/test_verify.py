@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+test_verify.py
+
+Gezielte Prüfung frisch generierter Tests (--verify) statt eines kompletten
+`mvn clean verify`:
+
+- Die Produktionsklassen werden aus target/classes genommen; fehlen sie oder
+  ist eine Quelldatei (bzw. pom.xml) neuer als die neueste .class-Datei, wird
+  vorher einmal inkrementell `mvn compile` ausgeführt.
+- Der Test-Classpath wird einmal per `mvn dependency:build-classpath` ermittelt
+  und unter target/ai-verify/classpath.txt gecacht; neu ermittelt wird nur,
+  wenn sich pom.xml ändert.
+- Alle geänderten Testdateien werden in EINEM javac-Aufruf übersetzt. Dateien
+  mit Fehlern werden herausgenommen und der Rest erneut übersetzt, so dass ein
+  kaputter Test die anderen nicht blockiert.
+- Nur die übersetzten Testklassen laufen im JUnit Console Launcher
+  (junit-platform-console-standalone, Default: $JUNIT_CONSOLE_JAR oder per
+  Maven nach target/ai-verify geladen); Fehlschläge werden über den
+  XML-Report der jeweiligen Klasse zugeordnet.
+
+Das Ergebnis ist pro Datei ein VerifyOutcome (ok / compile / test + Meldungen),
+das der Aufrufer meldet oder zurücknimmt (--verify-on-failure report|revert).
+"""
+
+import argparse
+import hashlib
+import os
+import pathlib
+import re
+import shutil
+import subprocess
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_WORK_DIR = "target/ai-verify"
+DEFAULT_TIMEOUT = 600
+# passend zu spring-boot-starter-parent 3.3.x (JUnit Jupiter 5.10)
+JUNIT_PLATFORM_VERSION = "1.10.3"
+MAX_DIAGNOSTIC_LINES = 40
+
+_DIAGNOSTIC_RE = re.compile(r"^(?P<path>.+?\.java):(?P<line>\d+): (?P<kind>error|warning): ")
+
+
+@dataclass
+class VerifyTarget:
+    """Eine frisch geschriebene Testdatei und ihr voll qualifizierter Klassenname."""
+
+    path: pathlib.Path
+    class_name: str
+
+
+@dataclass
+class VerifyOutcome:
+    path: pathlib.Path
+    class_name: str
+    ok: bool
+    stage: str = ""  # "" | "compile" | "test"
+    diagnostics: str = ""
+
+
+def parse_javac_errors(output: str) -> Dict[pathlib.Path, List[str]]:
+    """Ordnet javac-Fehlermeldungen (inkl. Folgezeilen mit Code und ^) den Dateien zu."""
+    errors: Dict[pathlib.Path, List[str]] = {}
+    current: Optional[List[str]] = None
+    for line in output.splitlines():
+        m = _DIAGNOSTIC_RE.match(line)
+        if m:
+            if m.group("kind") == "error":
+                current = errors.setdefault(pathlib.Path(m.group("path")).resolve(), [])
+                current.append(line)
+            else:
+                current = None
+            continue
+        if re.match(r"^\d+ (errors?|warnings?)$", line.strip()):
+            current = None
+            continue
+        if current is not None:
+            current.append(line)
+    return errors
+
+
+def parse_junit_report(report_dir: pathlib.Path) -> Dict[str, List[str]]:
+    """Fehlgeschlagene Testfälle pro Klasse aus den Legacy-XML-Reports des Console Launchers."""
+    failures: Dict[str, List[str]] = {}
+    for report in sorted(report_dir.glob("TEST-*.xml")):
+        try:
+            root = ET.parse(report).getroot()
+        except (OSError, ET.ParseError):
+            continue
+        for case in root.iter("testcase"):
+            for tag in ("failure", "error"):
+                node = case.find(tag)
+                if node is None:
+                    continue
+                message = (node.get("message") or node.get("type") or tag).strip()
+                failures.setdefault(case.get("classname", ""), []).append(f"{case.get('name')}: {message}")
+    return failures
+
+
+def _short(lines: Sequence[str]) -> str:
+    lines = list(lines)
+    if len(lines) > MAX_DIAGNOSTIC_LINES:
+        lines = lines[:MAX_DIAGNOSTIC_LINES] + [f"... ({len(lines) - MAX_DIAGNOSTIC_LINES} weitere Zeilen)"]
+    return "\n".join(lines)
+
+
+class TestVerifier:
+    """Übersetzt und startet eine Auswahl von Testklassen ohne kompletten Maven-Lauf."""
+
+    def __init__(
+        self,
+        project_dir: pathlib.Path,
+        test_dir: pathlib.Path,
+        work_dir: pathlib.Path,
+        launcher_jar: Optional[pathlib.Path] = None,
+        mvn: str = "mvn",
+        timeout: int = DEFAULT_TIMEOUT,
+    ) -> None:
+        self.project_dir = project_dir
+        self.test_dir = test_dir
+        self.work_dir = work_dir
+        self.launcher_jar = launcher_jar
+        self.mvn = mvn
+        self.timeout = timeout
+        self.classes_dir = project_dir / "target" / "classes"
+
+    def _run(self, cmd: List[str], what: str) -> subprocess.CompletedProcess:
+        try:
+            return subprocess.run(
+                cmd, cwd=str(self.project_dir), capture_output=True, text=True, timeout=self.timeout
+            )
+        except FileNotFoundError:
+            raise RuntimeError(f"{what}: '{cmd[0]}' nicht gefunden")
+        except subprocess.TimeoutExpired:
+            raise RuntimeError(f"{what}: Zeitüberschreitung nach {self.timeout}s")
+
+    def _mvn(self, *goals: str) -> None:
+        result = self._run([self.mvn, "-B", "-ntp", "-q", *goals], f"mvn {goals[0]}")
+        if result.returncode != 0:
+            tail = "\n".join((result.stdout + result.stderr).strip().splitlines()[-20:])
+            raise RuntimeError(f"mvn {' '.join(goals)} fehlgeschlagen:\n{tail}")
+
+    # ---------- Voraussetzungen ----------
+
+    def ensure_main_classes(self) -> None:
+        """Übersetzt die Produktionsklassen, falls target/classes fehlt oder veraltet ist."""
+        newest_class = max((p.stat().st_mtime for p in self.classes_dir.rglob("*.class")), default=None)
+        if newest_class is None:
+            print("[INFO] Verifikation: target/classes fehlt – führe 'mvn compile' aus ...")
+            self._mvn("compile")
+            return
+        sources = [self.project_dir / "pom.xml", *(self.project_dir / "src" / "main").rglob("*")]
+        if any(p.is_file() and p.stat().st_mtime > newest_class for p in sources):
+            print("[INFO] Verifikation: target/classes ist älter als die Quellen – führe 'mvn compile' aus ...")
+            self._mvn("compile")
+
+    def test_classpath(self) -> str:
+        """Test-Classpath aus Maven, gecacht solange pom.xml unverändert ist."""
+        cp_file = self.work_dir / "classpath.txt"
+        sha_file = self.work_dir / "classpath.sha256"
+        pom_sha = hashlib.sha256((self.project_dir / "pom.xml").read_bytes()).hexdigest()
+        if cp_file.exists() and sha_file.exists() and sha_file.read_text().strip() == pom_sha:
+            return cp_file.read_text(encoding="utf-8").strip()
+        print("[INFO] Verifikation: ermittle Test-Classpath (einmalig pro pom.xml) ...")
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self._mvn(
+            "dependency:build-classpath",
+            "-Dmdep.includeScope=test",
+            f"-Dmdep.outputFile={cp_file}",
+        )
+        sha_file.write_text(pom_sha + "\n")
+        return cp_file.read_text(encoding="utf-8").strip()
+
+    def launcher(self) -> pathlib.Path:
+        if self.launcher_jar is not None:
+            if not self.launcher_jar.exists():
+                raise RuntimeError(f"JUnit Console Launcher nicht gefunden: {self.launcher_jar}")
+            return self.launcher_jar
+        jar = self.work_dir / f"junit-platform-console-standalone-{JUNIT_PLATFORM_VERSION}.jar"
+        if not jar.exists():
+            print(f"[INFO] Verifikation: lade junit-platform-console-standalone {JUNIT_PLATFORM_VERSION} ...")
+            self._mvn(
+                "dependency:copy",
+                f"-Dartifact=org.junit.platform:junit-platform-console-standalone:{JUNIT_PLATFORM_VERSION}",
+                f"-DoutputDirectory={self.work_dir}",
+            )
+        return jar
+
+    # ---------- Übersetzen ----------
+
+    def compile(self, files: List[pathlib.Path], classpath: str) -> Dict[pathlib.Path, str]:
+        """
+        Übersetzt files gemeinsam nach <work-dir>/test-classes. Dateien mit Fehlern werden
+        entfernt und der Rest erneut übersetzt. Rückgabe: Fehlermeldungen je Datei.
+        """
+        out_dir = self.work_dir / "test-classes"
+        shutil.rmtree(out_dir, ignore_errors=True)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        remaining = [f.resolve() for f in files]
+        failed: Dict[pathlib.Path, str] = {}
+
+        while remaining:
+            cmd = [
+                "javac",
+                "-d", str(out_dir),
+                "-cp", os.pathsep.join(p for p in (str(self.classes_dir), classpath) if p),
+                "-sourcepath", str(self.test_dir),
+                "-implicit:class",
+                "-encoding", "UTF-8",
+                "-proc:none",
+                "-Xmaxerrs", "10000",
+                *map(str, remaining),
+            ]
+            result = self._run(cmd, "javac")
+            if result.returncode == 0:
+                break
+            errors = parse_javac_errors(result.stdout + result.stderr)
+            broken = [f for f in remaining if f in errors]
+            if not broken:
+                # Fehler ohne Zuordnung (z.B. in einer Hilfsklasse oder Classpath-Problem)
+                message = _short((result.stdout + result.stderr).strip().splitlines())
+                for f in remaining:
+                    failed[f] = message
+                break
+            for f in broken:
+                failed[f] = _short(errors[f])
+            remaining = [f for f in remaining if f not in errors]
+        return failed
+
+    # ---------- Ausführen ----------
+
+    def run_tests(self, class_names: List[str], classpath: str) -> Dict[str, str]:
+        """Startet nur die angegebenen Klassen; Rückgabe: Fehlschläge je Klasse."""
+        if not class_names:
+            return {}
+        report_dir = self.work_dir / "reports"
+        shutil.rmtree(report_dir, ignore_errors=True)
+        cmd = [
+            "java", "-jar", str(self.launcher()), "execute",
+            "--class-path",
+            os.pathsep.join(p for p in (str(self.work_dir / "test-classes"), str(self.classes_dir), classpath) if p),
+            "--disable-banner",
+            "--details=none",
+            f"--reports-dir={report_dir}",
+            *[f"--select-class={name}" for name in class_names],
+        ]
+        result = self._run(cmd, "JUnit Console Launcher")
+        failures = {name: _short(lines) for name, lines in parse_junit_report(report_dir).items()}
+        if result.returncode not in (0, 1) and not failures:
+            # Launcher selbst gescheitert (kein Report) – alle Klassen als fehlgeschlagen melden
+            message = _short((result.stdout + result.stderr).strip().splitlines())
+            failures = {name: message for name in class_names}
+        return failures
+
+    def verify(self, targets: List[VerifyTarget]) -> List[VerifyOutcome]:
+        self.ensure_main_classes()
+        classpath = self.test_classpath()
+        compile_errors = self.compile([t.path for t in targets], classpath)
+
+        outcomes: List[VerifyOutcome] = []
+        runnable: List[VerifyTarget] = []
+        for t in targets:
+            error = compile_errors.get(t.path.resolve())
+            if error is not None:
+                outcomes.append(VerifyOutcome(t.path, t.class_name, ok=False, stage="compile", diagnostics=error))
+            else:
+                runnable.append(t)
+
+        failures = self.run_tests([t.class_name for t in runnable], classpath)
+        for t in runnable:
+            failure = failures.get(t.class_name)
+            if failure is not None:
+                outcomes.append(VerifyOutcome(t.path, t.class_name, ok=False, stage="test", diagnostics=failure))
+            else:
+                outcomes.append(VerifyOutcome(t.path, t.class_name, ok=True))
+        return sorted(outcomes, key=lambda o: str(o.path))
+
+
+def find_project_dir(start: pathlib.Path) -> pathlib.Path:
+    """Nächstes Verzeichnis oberhalb von start mit pom.xml (sonst das aktuelle Verzeichnis)."""
+    for candidate in [start, *start.parents]:
+        if (candidate / "pom.xml").exists():
+            return candidate
+    return pathlib.Path.cwd()
+
+
+def add_verify_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("Verifikation")
+    group.add_argument(
+        "--verify",
+        action="store_true",
+        help="Nur die in diesem Lauf geschriebenen Tests übersetzen und ausführen (javac + JUnit Console Launcher)",
+    )
+    group.add_argument(
+        "--verify-on-failure",
+        choices=("report", "revert"),
+        default="report",
+        help="report = Fehler melden (Exit-Code 1), revert = fehlerhafte Tests zurücknehmen (Default: report)",
+    )
+    group.add_argument(
+        "--verify-work-dir",
+        default=DEFAULT_WORK_DIR,
+        help=f"Arbeitsverzeichnis für Classpath-Cache, Klassen und Reports (Default: {DEFAULT_WORK_DIR})",
+    )
+    group.add_argument(
+        "--junit-console-jar",
+        default=os.environ.get("JUNIT_CONSOLE_JAR"),
+        help="Pfad zu junit-platform-console-standalone.jar (Default: $JUNIT_CONSOLE_JAR, sonst per Maven laden)",
+    )
+    group.add_argument(
+        "--verify-timeout",
+        type=int,
+        default=DEFAULT_TIMEOUT,
+        help=f"Zeitlimit je Maven-/javac-/JUnit-Aufruf in Sekunden (Default: {DEFAULT_TIMEOUT})",
+    )
+
+
+def verifier_from_args(args: argparse.Namespace, test_dir: pathlib.Path) -> TestVerifier:
+    project_dir = find_project_dir(test_dir.resolve())
+    return TestVerifier(
+        project_dir=project_dir,
+        test_dir=test_dir,
+        work_dir=(project_dir / args.verify_work_dir).resolve(),
+        launcher_jar=pathlib.Path(args.junit_console_jar).resolve() if args.junit_console_jar else None,
+        timeout=args.verify_timeout,
+    )